@@ -1,13 +1,15 @@
 import numpy as np
 from state_estimation import StateEstimator
+from behavior_planning import batched
 import time
 import heapq
-import visualization
+from collections import deque
+import sim_core
 
 class Agent:
     used_colors = set()
 
-    def __init__(self, grid, global_explored_cells, reroute_threshold, start_pos=None, agents=None, behavior_planner=None):
+    def __init__(self, grid, global_explored_cells, reroute_threshold, start_pos=None, agents=None, behavior_planner=None, state_estimator=None, reservation_table=None, distance_maps=None):
         self.grid = grid
         self.agents = agents if agents is not None else []  # List of all agents
         self.x, self.y = start_pos
@@ -19,12 +21,20 @@ class Agent:
         self.cells_travelled = 0  # counter
         self.visited_cells = set()  # Track visited cells
         self.agents_actual_visited_cells = []  # Track agent's actual visited cells
+        self.visit_ticks = []  # Tick of each entry in agents_actual_visited_cells
         self.revisit_count = 0  # Count total revisits
+        self.reroute_count = 0  # Detours and reroutes taken when blocked
         self.global_explored_cells = global_explored_cells
         self.color = self.assign_color()  # Assign a unique color
         self.behavior_planner = behavior_planner  # Injected planner       
+        self.state_estimator = state_estimator if state_estimator is not None else StateEstimator(grid)  # Shared across agents when injected
+        self.reservation_table = reservation_table  # Shared space-time reservations; None plans against static agents
+        self.distance_maps = distance_maps  # Shared distance-map cache; None falls back to per-agent searches
+        self.path_ticks = []  # Tick each path_queue step is reserved for, when planned against the reservation table
         self.is_frozen = False  # Used to freeze an agent mid-simulation
         self.blocked_cell_attempts = {}  # (x, y): count of failed checks
+        self.waiting_on = None  # Agent blocking this agent's intended next cell this tick (wait-for graph edge)
+        self.give_way_to = None  # Agent that asked this idle agent to move out of its way
         self.local_time = 0
         self.update_position(self.x, self.y)  # Mark the initial cell
         self.wait_until_frame = 1
@@ -42,48 +52,41 @@ class Agent:
         import heapq
 
         grid_w, grid_h = self.grid.size
-        explored = self.global_explored_cells
         start = (self.x, self.y)
 
-        def get_cells_needing_work(col_x):
-            return [
-                (col_x, y)
-                for y in range(grid_w)
-                if (col_x, y) not in explored
-            ]
-
-        unexplored_unoccupied_columns = [
-            x for x in range(grid_h)
-            if len(get_cells_needing_work(x)) > 0
-            and not any(a.x == x and a != self for a in self.agents)
-        ]
-
-        unexplored_targets = [
-            (x, y)
-            for x in unexplored_unoccupied_columns
-            for y in range(grid_w)
-            if 0 <= x < grid_h and 0 <= y < grid_w
-            and (x, y) not in explored
-            and not self.is_cell_occupied(x, y)
-        ]
-
-
-        if not unexplored_targets:
+        # Columns with cells this agent can reach that its map lacks, from the tick's shared world
+        # state; cells in other components or obstacles are never targets
+        world_state = batched(self.behavior_planner).world_state(self.grid, self.agents)
+        work = world_state.work(self)[1]
+        columns = np.flatnonzero((work > 0) & ~world_state.occupied_columns(self)).tolist()
+        if not columns:
             # fallback to explore occupied columns with unfinished work
-            explored = self.global_explored_cells
-            fallback_targets = [
-                (x, y)
-                for x in range(grid_h)
-                for y in range(grid_w)
-                if (x, y) not in explored and not self.is_cell_occupied(x, y)
-            ]
-            unexplored_targets = fallback_targets
+            columns = np.flatnonzero(work > 0).tolist()
+        allowed = set(columns)
+        occupied = self.other_agent_cells()
+        column_targets = {}  # Column -> its target cells, filled as the search reaches it
+
+        def targets_in(col_x):
+            if col_x not in column_targets:
+                column_targets[col_x] = {cell for cell in world_state.cells_needing_work(self, col_x) if cell not in occupied}
+            return column_targets[col_x]
+
+        def is_target(cell):
+            return cell[0] in allowed and cell in targets_in(cell[0])
+
+        if self.reservation_table is not None:
+            return self.plan_reserved_path(is_target, sim_core.viz_while_loop_counter + 1)
+        if self.distance_maps is not None:
+            unexplored_targets = [cell for x in columns for cell in sorted(targets_in(x), key=lambda cell: cell[1])]
+            if not unexplored_targets:
+                return None
+            return self.distance_maps.path(start, unexplored_targets, self.other_agent_cells())
 
         def neighbors(x, y):
             for dx, dy, direction in [(-1, 0, 'left'), (1, 0, 'right'), (0, -1, 'up'), (0, 1, 'down')]:
                 nx, ny = x + dx, y + dy
                 if 0 <= nx < grid_h and 0 <= ny < grid_w:
-                    if not self.is_cell_occupied(nx, ny) and not self.grid.is_boundary(x, y, direction):
+                    if not self.is_cell_occupied(nx, ny) and not self.grid.is_boundary(x, y, direction) and not self.grid.is_obstacle(nx, ny):
                         yield nx, ny
 
         frontier = []
@@ -94,7 +97,7 @@ class Agent:
 
         while frontier:
             _, current = heapq.heappop(frontier)
-            if current in unexplored_targets:
+            if is_target(current):
                 goal = current
                 break
 
@@ -129,6 +132,7 @@ class Agent:
         if is_first_update or (new_x, new_y) != (self.x, self.y):
             self.cells_travelled += 1
             self.agents_actual_visited_cells.append((new_x, new_y))
+            self.visit_ticks.append(sim_core.viz_while_loop_counter)
 
             if (new_x, new_y) in self.visited_cells:
                 self.revisit_count += 1
@@ -144,7 +148,149 @@ class Agent:
     def is_cell_occupied(self, x, y):
         return any(agent.x == x and agent.y == y and agent != self for agent in self.agents)
 
+    def other_agent_cells(self):
+        return {(agent.x, agent.y) for agent in self.agents if agent is not self}
+
+    def frozen_cells(self):
+        """Cells held by broken-down agents, which routes must avoid."""
+        return {(agent.x, agent.y) for agent in self.agents if agent is not self and agent.is_frozen}
+
+    def agent_at(self, x, y):
+        for agent in self.agents:
+            if agent is not self and agent.x == x and agent.y == y:
+                return agent
+        return None
+
+    def wait_for_cycle(self, blocker):
+        """Follow the wait-for graph from the blocking agent; return the cycle through self, or [] if there is none."""
+        chain = [self]
+        current = blocker
+        while current is not None and current not in chain:
+            chain.append(current)
+            current = current.waiting_on
+        return chain if current is self else []
+
+    def is_idle(self):
+        """True when the agent's planner had nothing for it last turn and it is not farming."""
+        return self.done and not self.path_queue and self.wait_until_frame <= sim_core.viz_while_loop_counter
+
+    def plan_reserved_path(self, is_goal, start_tick, heuristic=None):
+        """Plan a conflict-free route against the reservation table and reserve it; returns the path or None."""
+        steps = self.reservation_table.plan(self, (self.x, self.y), start_tick, is_goal, heuristic)
+        if not steps:
+            return None
+        self.reservation_table.reserve_path(self, (self.x, self.y), steps)
+        self.path_ticks = [tick for _, tick in steps]
+        return [cell for cell, _ in steps]
+
+    def release_path(self):
+        """Abandon the current path and its reservations."""
+        self.path_queue = []
+        self.path_ticks = []
+        if self.reservation_table is not None:
+            self.reservation_table.release(self)
+
+    def find_detour(self, goal):
+        """Shortest path to goal that avoids other agents and boundaries, or None."""
+        if self.reservation_table is not None:
+            return self.plan_reserved_path(lambda cell: cell == goal, sim_core.viz_while_loop_counter + 1,
+                                           lambda cell: abs(cell[0] - goal[0]) + abs(cell[1] - goal[1]))
+        if self.distance_maps is not None:
+            return self.distance_maps.path((self.x, self.y), [goal], self.other_agent_cells())
+        grid_h, grid_w = self.grid.size
+        start = (self.x, self.y)
+        came_from = {start: None}
+        frontier = deque([start])
+        while frontier:
+            current = frontier.popleft()
+            if current == goal:
+                path = []
+                while current != start:
+                    path.append(current)
+                    current = came_from[current]
+                return path[::-1]
+            x, y = current
+            for direction, (dx, dy) in {'left': (-1, 0), 'right': (1, 0), 'up': (0, -1), 'down': (0, 1)}.items():
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < grid_w and 0 <= ny < grid_h) or (nx, ny) in came_from:
+                    continue
+                if self.grid.is_boundary(x, y, direction) or self.grid.is_obstacle(nx, ny) or self.is_cell_occupied(nx, ny):
+                    continue
+                came_from[(nx, ny)] = current
+                frontier.append((nx, ny))
+        return None
+
+    def give_way_direction(self, other):
+        """Direction to a free neighboring cell, preferring to leave the other agent's line, or None."""
+        options = []
+        for direction, (dx, dy) in {'left': (-1, 0), 'right': (1, 0), 'up': (0, -1), 'down': (0, 1)}.items():
+            nx, ny = self.x + dx, self.y + dy
+            if not (0 <= nx < self.grid.size[1] and 0 <= ny < self.grid.size[0]):
+                continue
+            if self.is_cell_occupied(nx, ny) or self.grid.is_boundary(self.x, self.y, direction) or self.grid.is_obstacle(nx, ny):
+                continue
+            in_line = nx == other.x or ny == other.y
+            options.append((in_line, -(abs(nx - other.x) + abs(ny - other.y)), direction))
+        return min(options)[2] if options else None
+
+    def break_cycle(self, blocker):
+        """Step aside if this agent is the one to give way in its wait-for cycle; True if it moved.
+
+        The agent spawned last gives way, or, if it is boxed in (e.g. in a dead end between
+        obstacles), the last spawned one that has a free cell to step into.
+        """
+        cycle = self.wait_for_cycle(blocker)
+        movable = [agent for agent in cycle if agent.give_way_direction(blocker if agent is self else agent.waiting_on) is not None]
+        if not movable or self is not max(movable, key=self.agents.index):
+            return False
+        direction = self.give_way_direction(blocker)
+        dx, dy = {'left': (-1, 0), 'right': (1, 0), 'up': (0, -1), 'down': (0, 1)}[direction]
+        self.release_path()
+        self.waiting_on = None
+        self.update_position(self.x + dx, self.y + dy)
+        return True
+
+    def handle_blocked_cell(self, key, goal=None):
+        """Wait for the agent on key, resolving blocking that cannot clear by itself at once.
+
+        The wait-for graph is formed by each agent's waiting_on edge for the current tick:
+        - a frozen blocker is detoured around towards goal, or rerouted around if there is no goal
+        - an idle blocker is asked to give way and steps aside on its next turn
+        - in a wait-for cycle the agent spawned last gives way, the others keep waiting
+        Anything else waits, with reroute_threshold as a fallback.
+        """
+        blocker = self.agent_at(*key)
+        self.waiting_on = blocker
+        self.blocked_cell_attempts[key] = self.blocked_cell_attempts.get(key, 0) + 1
+
+        if blocker is not None and blocker.is_frozen:
+            detour = self.find_detour(goal) if goal is not None else None
+            if detour:
+                self.blocked_cell_attempts.pop(key, None)
+                self.path_queue = detour
+                self.reroute_count += 1
+            else:
+                self.reroute_around(key)
+            return sim_core.waiting_time_step
+
+        if blocker is not None and blocker.is_idle():
+            blocker.give_way_to = self
+            return sim_core.waiting_time_step
+
+        if blocker is not None and self.wait_for_cycle(blocker):
+            if self.break_cycle(blocker):
+                self.blocked_cell_attempts.pop(key, None)
+                return sim_core.movement_time_step
+            return sim_core.waiting_time_step
+
+        if self.blocked_cell_attempts[key] >= self.reroute_threshold:
+            # Fallback for blocking the graph cannot classify, e.g. a blocker that keeps changing its mind
+            self.reroute_around(key)
+        return sim_core.waiting_time_step
+
     def reroute_around(self, blocked_cell):
+        self.reroute_count += 1
+        self.release_path()
         path = self.astar_to_next_unexplored_column()
         if path:
             target = path[-1]
@@ -155,7 +301,7 @@ class Agent:
                 # print(f"[{self.color}] Rerouting target {target} is out of bounds! Ignoring reroute.")
         else:
             # print(f"[{self.color}] Couldn't find any valid reroute from {blocked_cell}")
-            self.path_queue = []  # discard stale reroute steps
+            self.release_path()  # discard stale reroute steps
 
 
     def move(self, direction):
@@ -165,7 +311,7 @@ class Agent:
             return
         
         self.busy = True
-        self.wait_until_frame = visualization.viz_while_loop_counter + visualization.MOVEMENT_FRAMES
+        self.wait_until_frame = sim_core.viz_while_loop_counter + sim_core.MOVEMENT_FRAMES
 
 
         moves = {'up': (0, -1), 'down': (0, 1), 'left': (-1, 0), 'right': (1, 0)}
@@ -191,7 +337,7 @@ class Agent:
             best_path_length = float('inf')
 
             for bypass_x, bypass_y in bypass_points:
-                if 0 <= bypass_y < self.grid.size[0]:
+                if 0 <= bypass_y < self.grid.size[0] and not self.grid.is_obstacle(bypass_x, bypass_y):
                     path = find_path_to_point(start, (bypass_x, bypass_y))
                     if path:
                         total_path = path + [(bypass_x, bypass_y)]
@@ -206,6 +352,22 @@ class Agent:
                 # print("A* failed to find path")
                 return None
 
+        def reserved_a_star(start, direction):
+            """Space-time A* around the boundary, reserved so other agents route around it."""
+            boundary_extent = find_boundary_extent(start[0], start[1], direction)
+            if not boundary_extent:
+                return None
+            bypass_points = [(start[0], y) for y in (boundary_extent[0] - 1, boundary_extent[1] + 1)
+                             if 0 <= y < self.grid.size[0] and not self.grid.is_obstacle(start[0], y)]
+            if not bypass_points:
+                return None
+            path = self.plan_reserved_path(lambda cell: cell in bypass_points, sim_core.viz_while_loop_counter,
+                                           lambda cell: min(heuristic(*cell, *point) for point in bypass_points))
+            if path is None:
+                return None
+            self.path_ticks.pop(0)  # The first step is taken right away
+            return path
+
         def find_boundary_extent(start_x, start_y, direction):
             moves = {'up': (0, -1), 'down': (0, 1), 'left': (-1, 0), 'right': (1, 0)}
             dx, dy = moves[direction]
@@ -227,34 +389,11 @@ class Agent:
                 return None
 
         def find_path_to_point(start, end):
-            moves = {'up': (0, -1), 'down': (0, 1), 'left': (-1, 0), 'right': (1, 0)}
-
-            def heuristic(x, y, goal_x, goal_y):
-                return abs(x - goal_x) + abs(y - goal_y)
-
-            open_set = []
-            heapq.heappush(open_set, (0, start[0], start[1], []))
-            g_costs = {start: 0}
-            visited = set()
-
-            while open_set:
-                f, x, y, path = heapq.heappop(open_set)
-                if (x, y) == end:
-                    return path
-                visited.add((x, y))
-
-                for dir, (dx, dy) in moves.items():
-                    new_x, new_y = x + dx, y + dy
-                    if not (0 <= new_x < self.grid.size[1] and 0 <= new_y < self.grid.size[0]) or (new_x, new_y) in visited:
-                        continue
-                    if self.grid.is_boundary(x, y, dir):
-                        continue
-                    new_g = g_costs[(x, y)] + 1
-                    if (new_x, new_y) not in g_costs or new_g < g_costs[(new_x, new_y)]:
-                        g_costs[(new_x, new_y)] = new_g
-                        f_score = new_g + heuristic(new_x, new_y, end[0], end[1])
-                        heapq.heappush(open_set, (f_score, new_x, new_y, path + [(x, y)]))
-            return None
+            """Cells from start up to (not including) end, routed over the grid's corridor graph."""
+            path = self.grid.shortest_path(start, end)
+            if path is None:
+                return None
+            return [start] + path[:-1]
         
         # If there's a path in the queue, follow it
         if self.path_queue:
@@ -263,20 +402,20 @@ class Agent:
             
             if self.is_cell_occupied(step_x, step_y):
                 # Track blocked attempts even during reroute path
-                self.blocked_cell_attempts[key] = self.blocked_cell_attempts.get(key, 0) + 1
-                # print(f"[{self.color}] Waiting on reroute step {key} - attempt {self.blocked_cell_attempts[key]}")
-
-                if self.blocked_cell_attempts[key] >= self.reroute_threshold:
-                    # print(f"[{self.color}] Rerouting from blocked reroute step {key}")
-                    self.reroute_around(key)
-                return visualization.waiting_time_step
+                return self.handle_blocked_cell(key, goal=self.path_queue[-1] if len(self.path_queue) > 1 else None)
 
             else:
                 # print(f"[{self.color}] Executing reroute step {key}")
                 self.blocked_cell_attempts.pop(key, None)
                 self.path_queue.pop(0)
+                if len(self.path_ticks) > len(self.path_queue):
+                    # Keep the reservations in step with the agent when it runs early or late
+                    delay = sim_core.viz_while_loop_counter - self.path_ticks.pop(0)
+                    if delay:
+                        self.reservation_table.shift(self, delay)
+                        self.path_ticks = [tick + delay for tick in self.path_ticks]
                 self.update_position(step_x, step_y)
-                return visualization.movement_time_step
+                return sim_core.movement_time_step
 
         if direction in moves:
             new_x, new_y = self.x + moves[direction][0], self.y + moves[direction][1]
@@ -286,37 +425,46 @@ class Agent:
                 return
 
             if self.is_cell_occupied(new_x, new_y):
-                key = (new_x, new_y)
-                self.blocked_cell_attempts[key] = self.blocked_cell_attempts.get(key, 0) + 1
+                return self.handle_blocked_cell((new_x, new_y))
 
-                if self.blocked_cell_attempts[key] >= self.reroute_threshold:  # Threshold to reroute
-                    # print(f"[{self.color}] Waiting on cell {key} - attempt {self.blocked_cell_attempts[key]}")
-                    # print(f"[{self.color}] Rerouting from blocked cell {key}")
-                    self.reroute_around(key)
-                # else:
-                    # print(f"[{self.color}] Waiting on cell {key} - attempt {self.blocked_cell_attempts[key]}")
-                return visualization.waiting_time_step
+            if self.grid.is_obstacle(new_x, new_y):
+                # Obstacles never clear; head for the nearest reachable unexplored cell instead
+                self.reroute_around((new_x, new_y))
+                return sim_core.waiting_time_step
+
+            if self.reservation_table is not None:
+                # Stay out of cells another agent's route is about to pass through
+                now = sim_core.viz_while_loop_counter
+                owner = self.reservation_table.owner_during((new_x, new_y), now, now + 1, self)
+                if owner is not None:
+                    self.waiting_on = owner
+                    if self.wait_for_cycle(owner) and self.break_cycle(owner):
+                        return sim_core.movement_time_step
+                    return sim_core.waiting_time_step
 
 
             # Check for boundary and run A* if needed
             if self.grid.is_boundary(self.x, self.y, direction):
                 # print(f"Boundary detected, running A*")
-                path = a_star((self.x, self.y), direction)
+                if self.reservation_table is not None:
+                    path = reserved_a_star((self.x, self.y), direction)
+                else:
+                    path = a_star((self.x, self.y), direction)
 
                 if path is not None:
                     self.path_queue = path[1:]  # Store all steps except the current position
                     self.update_position(*path[0])
-                    return visualization.movement_time_step
+                    return sim_core.movement_time_step
                 else:
                     # print("A* returned None, agent stays still")
-                    return visualization.waiting_time_step
+                    return sim_core.waiting_time_step
 
             if 0 <= new_x < self.grid.size[1] and 0 <= new_y < self.grid.size[0]:
                 self.update_position(new_x, new_y)
             if (new_x, new_y) != (self.x, self.y):
                 self.blocked_cell_attempts.pop((new_x, new_y), None)  # Clear retry count
             
-            return visualization.movement_time_step
+            return sim_core.movement_time_step
 
 
     def plant(self):
@@ -324,7 +472,7 @@ class Agent:
         cell_info = self.grid.get_cell_info(self.x, self.y)
         if cell_info['crop_status'] == 0:
             self.busy = True
-            self.wait_until_frame = visualization.viz_while_loop_counter + visualization.PLANTING_FRAMES 
+            self.wait_until_frame = sim_core.viz_while_loop_counter + sim_core.PLANTING_FRAMES 
             self.grid.update_cell(self.x, self.y, [cell_info['soil_type'], cell_info['moisture_level'], 1])
 
     def water(self):
@@ -332,11 +480,12 @@ class Agent:
         cell_info = self.grid.get_cell_info(self.x, self.y)
         if cell_info['moisture_level'] == 0:
             self.busy = True
-            self.wait_until_frame = visualization.viz_while_loop_counter + visualization.WATERING_FRAMES
+            self.wait_until_frame = sim_core.viz_while_loop_counter + sim_core.WATERING_FRAMES
             self.grid.update_cell(self.x, self.y, [cell_info['soil_type'], 1, cell_info['crop_status']])
 
     def execute_action(self, action):
         """Perform the selected action."""
+        self.waiting_on = None  # Set again by move() if still blocked this tick
 
         if self.is_frozen or action is None:
             self.done = True
@@ -350,10 +499,10 @@ class Agent:
 
         elif action == 'plant':
             self.plant()
-            return visualization.planting_time_step
+            return sim_core.planting_time_step
         elif action == 'water':
             self.water()
-            return visualization.watering_time_step
+            return sim_core.watering_time_step
             # Ensure watered cell is updated
             self.grid.update_cell(self.x, self.y, [self.grid.get_cell_info(self.x, self.y)['soil_type'],
                                                    1,  
@@ -364,40 +513,55 @@ class Agent:
             self.done = True
 
 
-    def select_action(self):
+    def select_action(self, perception=None, planner=None):
+        """Next action: a local task, else the planner's move. planner is the run's planner as the
+        simulation loop obtained it from behavior_planning.batched; by default the agent's own."""
+        if self.is_frozen:
+            if self.reservation_table is not None:
+                self.reservation_table.release(self)  # Its route will not be used
+            return None  # Broken down; set by fault injection or by hand
+
         if self.busy:
-            if visualization.viz_while_loop_counter < self.wait_until_frame:
+            if sim_core.viz_while_loop_counter < self.wait_until_frame:
                 return None  # still waiting
             else:
                 self.busy = False  # done waiting
 
-        perception = StateEstimator(self.grid).perceive_environment(self)
+        # Batched perception is passed in by the simulation loop; fall back to a single-cell read
+        if perception is None:
+            perception = self.state_estimator.perceive_environment(self)
 
-        if perception['current']['moisture_level'] == 0 and perception['current']['crop_status'] == 1:
+        if perception['current']['moisture_level'] == 0 and perception['current']['crop_status'] >= 1:
             return 'water'
         elif perception['current']['crop_status'] == 0:
             return 'plant'
 
-        # if self.color == "purple" and (self.x, self.y) == (3, 6):
-        #     self.is_frozen = True
-        #     return 0.0
-        # if self.is_frozen:
-        #     return 0.0
-        
-        # if self.color == "blue" and (self.x, self.y) == (0, 2):
-        #     self.is_frozen = True
-        #     return 0.0
-        # if self.is_frozen:
-        #     return 0.0
-
+        # If no local task, ask the planner for this agent's move, through the batched API
+        action = None
+        if planner is None and self.behavior_planner is not None:
+            planner = batched(self.behavior_planner)
+        if planner is not None:
+            world_state = planner.world_state(self.grid, self.agents)
+            world_state.perceptions[self] = perception
+            action = planner.select_movement_actions([self], world_state)[0]
 
-        # If no local task, delegate to the injected behavior planner
-        if hasattr(self, 'behavior_planner'):
-            return self.behavior_planner.select_movement_action(self, perception, self.agents)
+        # An idle agent asked to give way steps aside, unless the request is stale
+        requester, self.give_way_to = self.give_way_to, None
+        if action is None and requester is not None and requester.waiting_on is self:
+            action = self.give_way_direction(requester)
+        return action
 
 
     def _move_towards_target(self, target_x, target_y):
         """Move towards the target cell with updated logic for last 2 columns."""
+        if self.distance_maps is not None:
+            # Follow the true path distance, preferring the straight-line step on ties
+            horizontal = 'left' if target_x < self.x else 'right'
+            vertical = 'up' if target_y < self.y else 'down'
+            prefer = [horizontal, vertical] + [d for d in ('left', 'right', 'up', 'down') if d not in (horizontal, vertical)]
+            direction = self.distance_maps.step_towards((self.x, self.y), [(target_x, target_y)], self.frozen_cells(), prefer)
+            if direction is not None:
+                return direction
         if target_x < self.x:
             return 'left'
         elif target_x > self.x:
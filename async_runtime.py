@@ -0,0 +1,268 @@
+import asyncio
+import heapq
+import json
+import random
+import sim_core
+from behavior_planning import batched
+
+
+class LocalBackend:
+    """Executes actions directly on the simulated agents."""
+
+    def execute(self, index, agent, action):
+        agent.execute_action(action)
+        return None  # Nothing to wait for
+
+    async def close(self):
+        pass
+
+
+class ControllerBackend:
+    """Sends each action to a robot controller over TCP, mirroring it on the simulated agent.
+
+    Commands and replies are JSON lines. The simulated agent applies the action at once, so
+    planning never waits on the network; the agent awaits the controller's reply before its
+    next action, which lets replies overlap with the action's simulated duration. A 'fault'
+    reply freezes the agent, like fault injection.
+    """
+
+    def __init__(self, host='127.0.0.1', port=5556):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.replies = {}  # Command id -> future of the controller's reply
+        self.next_id = 0
+        self.round_trips = 0
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self._listener = asyncio.ensure_future(self._listen())
+        return self
+
+    async def _listen(self):
+        async for line in self.reader:
+            reply = json.loads(line)
+            future = self.replies.pop(reply['id'], None)
+            if future is not None and not future.done():
+                future.set_result(reply)
+
+    def execute(self, index, agent, action):
+        agent.execute_action(action)
+        if action is None:
+            return None  # Idle ticks are not sent
+        command_id = self.next_id
+        self.next_id += 1
+        future = self.replies[command_id] = asyncio.get_running_loop().create_future()
+        self.writer.write((json.dumps({'id': command_id, 'agent': index, 'action': action,
+                                       'position': [agent.x, agent.y],
+                                       'tick': sim_core.viz_while_loop_counter}) + '\n').encode())
+        return self._settle(agent, future)
+
+    async def _settle(self, agent, future):
+        reply = await future
+        self.round_trips += 1
+        if reply.get('status') == 'fault':
+            agent.is_frozen = True
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+            await self._listener
+
+
+class RobotControllerServer:
+    """Local stand-in for the field controller: acknowledges commands after a real latency.
+
+    latency is in seconds; each command faults with fault_probability, after which that agent
+    keeps getting 'fault' replies.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, fault_probability=0.0, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.fault_probability = fault_probability
+        self.rng = random.Random(seed)
+        self.faulted = set()
+        self.commands = 0
+        self.server = None
+        self.clients = {}  # Writer -> handler task of each connected client
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.address = self.server.sockets[0].getsockname()[:2]
+        return self
+
+    async def _handle(self, reader, writer):
+        self.clients[writer] = asyncio.current_task()
+        try:
+            async for line in reader:
+                command = json.loads(line)
+                self.commands += 1
+                if command['agent'] not in self.faulted and self.rng.random() < self.fault_probability:
+                    self.faulted.add(command['agent'])
+                status = 'fault' if command['agent'] in self.faulted else 'ok'
+                asyncio.ensure_future(self._reply(writer, {'id': command['id'], 'status': status}))
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
+
+    async def _reply(self, writer, reply):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if not writer.is_closing():
+            writer.write((json.dumps(reply) + '\n').encode())
+
+    async def close(self):
+        if self.clients:
+            await asyncio.wait(list(self.clients.values()), timeout=1.0)  # Let clients hang up first
+        for writer in list(self.clients):
+            writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class AsyncRuntime:
+    """Runs each agent as a coroutine that awaits its action durations in virtual time.
+
+    The clock is the tick counter in sim_core. An agent sleeps for the frames its action takes
+    and is resumed only on the tick it wakes, so busy agents cost nothing while they work.
+    Agents due on the same tick act one at a time in agent order, on perceptions gathered at
+    the start of the tick, which keeps runs identical to sim_core.run_simulation. No real time
+    passes except while a backend waits on I/O.
+    """
+
+    def __init__(self, grid, agents, state_estimator, behavior_planner, backend=None, tick_hooks=()):
+        self.grid = grid
+        self.agents = agents if isinstance(agents, list) else [agents]
+        self.state_estimator = state_estimator
+        self.behavior_planner = behavior_planner
+        self.planner = batched(behavior_planner)  # Agents ask it for their moves through the batched API
+        self.backend = backend or LocalBackend()
+        self.tick_hooks = tick_hooks
+        self.wakeups = []  # Heap of (tick, agent index), one entry per sleeping agent
+        self.resume = {}  # Agent index -> future its coroutine is suspended on
+        self.perceptions = {}  # Agent index -> perception for the current tick
+        self.yielded = None  # Future set when the running agent suspends again
+        self.resumptions = 0
+
+    def _sleep(self, index, frames):
+        """Suspend agent index for frames ticks and hand control back to the runtime."""
+        heapq.heappush(self.wakeups, (sim_core.viz_while_loop_counter + frames, index))
+        wake = self.resume[index] = asyncio.get_running_loop().create_future()
+        if self.yielded is not None and not self.yielded.done():
+            self.yielded.set_result(None)
+        return wake
+
+    async def _run_agent(self, index):
+        agent = self.agents[index]
+        reply = None
+        try:
+            await self._sleep(index, 0)
+            while True:
+                if reply is not None:
+                    await reply  # The previous command's controller reply
+                reply = self.backend.execute(index, agent, agent.select_action(self.perceptions.pop(index), self.planner))
+                # Polling a busy agent only marks it done; after that first poll it sleeps out the action
+                frames = 1
+                if agent.busy and agent.done:
+                    frames = max(1, agent.wait_until_frame - sim_core.viz_while_loop_counter)
+                await self._sleep(index, frames)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as error:
+            if self.yielded is not None and not self.yielded.done():
+                self.yielded.set_exception(error)
+            raise
+
+    async def run(self, max_ticks=None, verbose=True):
+        """Run until the mission completes or max_ticks is reached; returns the simulated time."""
+        loop = asyncio.get_running_loop()
+        sim_core.simulation_time = 0.00
+        sim_core.viz_while_loop_counter = 0
+        tasks = []
+        for index in range(len(self.agents)):
+            self.yielded = loop.create_future()
+            tasks.append(asyncio.ensure_future(self._run_agent(index)))
+            await self.yielded
+
+        try:
+            while max_ticks is None or sim_core.viz_while_loop_counter < max_ticks:
+                tick = sim_core.viz_while_loop_counter
+                for hook in self.tick_hooks:
+                    hook(tick)
+
+                due = []
+                while self.wakeups and self.wakeups[0][0] <= tick:
+                    due.append(heapq.heappop(self.wakeups)[1])
+                due.sort()
+                if due:
+                    perceptions = self.state_estimator.perceive_all([self.agents[index] for index in due])
+                    for index, perception in zip(due, perceptions):
+                        self.perceptions[index] = perception
+                    for index in due:
+                        self.yielded = loop.create_future()
+                        self.resume.pop(index).set_result(None)
+                        await self.yielded
+                        self.resumptions += 1
+
+                sim_core.viz_while_loop_counter += 1
+                sim_core.simulation_time = sim_core.viz_while_loop_counter * sim_core.time_step
+
+                if sim_core.check_mission_complete(self.grid, self.agents, self.behavior_planner):
+                    if all(agent.done or agent.is_frozen for agent in self.agents):
+                        if verbose:
+                            print("[SIM] Grid fully explored. All agents have completed final tasks.")
+                        break
+
+                if not due and not self.tick_hooks and self.wakeups:
+                    # Nothing changes until the next agent wakes. The completion check still runs
+                    # at the jumped-to tick, since planners may cache state on it
+                    next_tick = self.wakeups[0][0] if max_ticks is None else min(self.wakeups[0][0], max_ticks)
+                    if next_tick > sim_core.viz_while_loop_counter:
+                        sim_core.viz_while_loop_counter = next_tick
+                        sim_core.simulation_time = sim_core.viz_while_loop_counter * sim_core.time_step
+                        sim_core.check_mission_complete(self.grid, self.agents, self.behavior_planner)
+        except sim_core.RunStopped as stop:
+            if verbose:
+                print(f"[SIM] Run stopped at tick {sim_core.viz_while_loop_counter}: {stop.outcome}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return sim_core.simulation_time
+
+
+def run_simulation_async(grid, agents, state_estimator, behavior_planner, max_ticks=None, tick_hooks=(), verbose=True, backend=None):
+    """Drop-in for sim_core.run_simulation that runs the agents on the asyncio runtime."""
+    async def main():
+        runtime = AsyncRuntime(grid, agents, state_estimator, behavior_planner, backend, tick_hooks)
+        try:
+            return await runtime.run(max_ticks, verbose)
+        finally:
+            await runtime.backend.close()
+    return asyncio.run(main())
+
+
+def main():
+    """Run a mission against the stand-in robot controller."""
+    import simulation
+
+    async def demo():
+        server = await RobotControllerServer(latency=0.001, fault_probability=0.002, seed=0).start()
+        backend = await ControllerBackend(*server.address).connect()
+        grid, agents, state_estimator, behavior_planner = simulation.build_run('LP', ((0, 0), (1, 0), (2, 0)))
+        runtime = AsyncRuntime(grid, agents, state_estimator, behavior_planner, backend)
+        sim_time = await runtime.run(max_ticks=2000)
+        await backend.close()
+        await server.close()
+        print(f"[ASYNC] {sim_core.viz_while_loop_counter} ticks ({sim_time:.1f} sim time), "
+              f"{server.commands} controller commands, {len(server.faulted)} robots faulted")
+
+    asyncio.run(demo())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,138 @@
-import visualization
+import numpy as np
+from collections import deque
+import sim_core
+from world_state import WorldState
+
+
+def move_to_orphaned_cells(agent, world_state, column_owners):
+    """Step towards the nearest unexplored cell that its column's owner cannot reach, or None.
+
+    Column assignments ignore walls and obstacles, so part of a column may lie in a component
+    its owner never enters. Any agent that can reach such cells finishes them once its own
+    columns are done. column_owners holds the owning agent of each column, or None.
+    """
+    targets = world_state.orphaned(agent, column_owners)
+    if not targets:
+        return None
+    if agent.distance_maps is not None:
+        direction = agent.distance_maps.step_towards((agent.x, agent.y), targets, agent.frozen_cells())
+        if direction is not None:
+            return direction
+    return agent._move_towards_target(*min(targets, key=lambda cell: abs(cell[0] - agent.x) + abs(cell[1] - agent.y)))
+
+
+def beyond_obstacles(agent, targets):
+    """True when the agent is in the column of targets but obstacles cut it off from all of them."""
+    if targets[0][0] != agent.x:
+        return False
+    segment = agent.grid.segment_id(agent.x, agent.y)
+    return all(agent.grid.segment_id(x, y) != segment for x, y in targets)
+
+
+def sweep_step(agent, targets, direction):
+    """Action towards the next of a column's targets in a sweep going direction ('down' or 'up').
+
+    In its column, the agent sweeps the targets of its own segment (see Grid.corridors) first;
+    segments cut off by obstacles are swept after, entered by a detour out of the column.
+    """
+    if targets[0][0] == agent.x:
+        segment = agent.grid.segment_id(agent.x, agent.y)
+        targets = [cell for cell in targets if agent.grid.segment_id(*cell) == segment] or targets
+    sorted_targets = sorted(targets, key=lambda p: p[1]) if direction == 'down' else sorted(targets, key=lambda p: -p[1])
+    return agent._move_towards_target(*sorted_targets[0])
+
+
+def step_off_grid(agent, col):
+    """Action towards a column beyond the agent's grid, which in a partitioned run lies in a neighboring strip.
+
+    The agent heads for the grid's edge column on that side, where it is handed off to the strip
+    that owns the column.
+    """
+    grid_h, grid_w = agent.grid.size
+    edge = 0 if col < 0 else grid_w - 1
+    targets = [(edge, y) for y in range(grid_h)]
+    if agent.distance_maps is not None:
+        direction = agent.distance_maps.step_towards((agent.x, agent.y), targets, agent.frozen_cells())
+        if direction is not None:
+            return direction
+    return agent._move_towards_target(*min(targets, key=lambda cell: abs(cell[1] - agent.y)))
+
+
+def column_owners(world_state):
+    """Agent of the team that each column is assigned to, or None."""
+    owners = [None] * world_state.grid.size[1]
+    for other in world_state.team:
+        for col in getattr(other, 'assigned_columns_set', ()):
+            if 0 <= col < len(owners):
+                owners[col] = other
+    return owners
+
+
+def assign_team(planner, world_state):
+    """Set the planner state from planner.assignments on every agent of the team that has no columns yet."""
+    team = world_state.team
+    for other, state in zip(team, planner.assignments(world_state.grid, [(a.x, a.y) for a in team])):
+        if not hasattr(other, 'assigned_columns'):
+            for key, value in state.items():
+                setattr(other, key, value)
+
+
+class BatchedPlanner:
+    """Base for planners that decide for a batch of agents from one shared WorldState.
+
+    Subclasses implement select_movement_actions(agents, world_state), returning one action
+    per agent; decisions in one call all see the same state. The simulation loops take the
+    planner through batched() and agents request their moves from it in turn, after the
+    agents before them have acted, so the tick's WorldState is built once and kept current as
+    agents move. select_movement_action is kept for callers of the single-agent API.
+    """
+
+    _world_state = None
+
+    def world_state(self, grid, agents):
+        """The WorldState of the current tick, built on the first request in the tick."""
+        state = self._world_state
+        if state is None or state.tick != sim_core.viz_while_loop_counter or state.grid is not grid or state.agents is not agents:
+            state = self._world_state = WorldState(grid, agents)
+        return state
 
-class LocalPlanner:
     def select_movement_action(self, agent, perception_data, agents):
+        world_state = self.world_state(agent.grid, agents)
+        world_state.perceptions[agent] = perception_data
+        return self.select_movement_actions([agent], world_state)[0]
+
+
+class BatchAdapter(BatchedPlanner):
+    """Gives a planner with only select_movement_action(agent, perception, agents) the batched API.
+
+    Agents are passed to the wrapped planner one at a time, with their perception from the
+    world state. Every other attribute (mission_complete, refresh_tasks, ...) is the wrapped
+    planner's.
+    """
+
+    def __init__(self, planner):
+        self.planner = planner
+
+    def __getattr__(self, name):
+        if name == 'planner':
+            raise AttributeError(name)  # Not set yet, e.g. while unpickling
+        return getattr(self.planner, name)
+
+    def select_movement_actions(self, agents, world_state):
+        return [self.planner.select_movement_action(agent, world_state.perceptions.get(agent), world_state.agents)
+                for agent in agents]
+
+
+def batched(planner):
+    """The planner itself if it decides in batches, otherwise a BatchAdapter around it."""
+    return planner if hasattr(planner, 'select_movement_actions') else BatchAdapter(planner)
+
+
+class LocalPlanner(BatchedPlanner):
+    def select_movement_actions(self, agents, world_state):
+        return [self._select(agent, world_state) for agent in agents]
+
+    def _select(self, agent, world_state):
         # Initialize state variables if not already set
         if not hasattr(agent, 'committed_column'):
             agent.committed_column = None
@@ -12,19 +143,18 @@ class LocalPlanner:
 
         grid_w = agent.grid.size[1]
         grid_h = agent.grid.size[0]
-        explored = agent.global_explored_cells
 
-        # Returns unexplored cells in a column
+        # Unexplored cells the agent can reach, and the columns other agents stand in, shared by the tick
+        work = world_state.work(agent)[1]
+
         def get_cells_needing_work(col_x):
-            return [(col_x, y) for y in range(grid_h) if (col_x, y) not in explored]
+            return world_state.cells_needing_work(agent, col_x) if work[col_x] else []
 
-        # Identify columns that are both unexplored and unoccupied
-        unexplored_unoccupied_columns = [
-            x for x in range(grid_w)
-            if len(get_cells_needing_work(x)) > 0
-            and not any(a.x == x and a != agent for a in agents)
-        ]
-        allow_help_anywhere = len(unexplored_unoccupied_columns) == 0
+        occupied_columns = world_state.occupied_columns(agent)
+        interior_occupied_columns = world_state.occupied_columns(agent, interior=True)
+
+        # Help anywhere once no column is both unexplored and unoccupied
+        allow_help_anywhere = not np.any((work > 0) & ~occupied_columns)
 
         # Decide default sweeping direction based on initial position
         if not hasattr(agent, 'sweep_direction'):
@@ -36,9 +166,17 @@ class LocalPlanner:
         else:
             ordered_columns = list(range(agent.x, grid_w)) + list(range(agent.x - 1, -1, -1))
 
+        # Finish a column whose cells lie beyond obstacles first: the detour leaves the column,
+        # and re-choosing by occupancy on the way would send agents back and forth
+        if agent.committed_column is not None:
+            targets = get_cells_needing_work(agent.committed_column)
+            if targets:
+                return sweep_step(agent, targets, agent.column_sweep_direction[agent.committed_column])
+            agent.committed_column = None
+
         # Non-helper column sweep
         for x in ordered_columns:
-            occupied = any(a.x == x and a.y not in [0, grid_h-1] and a != agent for a in agents)
+            occupied = interior_occupied_columns[x]
             if occupied and not allow_help_anywhere:
                 continue
             targets = get_cells_needing_work(x)
@@ -46,8 +184,9 @@ class LocalPlanner:
                 if x not in agent.column_sweep_direction:
                     agent.column_sweep_direction[x] = 'down' if agent.y <= grid_h // 2 else 'up'
                 direction = agent.column_sweep_direction[x]
-                sorted_targets = sorted(targets, key=lambda p: p[1]) if direction == 'down' else sorted(targets, key=lambda p: -p[1])
-                return agent._move_towards_target(*sorted_targets[0])
+                if beyond_obstacles(agent, targets):
+                    agent.committed_column = x
+                return sweep_step(agent, targets, direction)
 
         # Helper mode: assist other agents after own work is done
         if allow_help_anywhere:
@@ -57,24 +196,19 @@ class LocalPlanner:
                 if targets:
                     direction = agent.column_sweep_direction.get(col, 'down' if agent.y <= grid_h // 2 else 'up')
                     agent.column_sweep_direction[col] = direction
-                    sorted_targets = sorted(targets, key=lambda p: p[1]) if direction == 'down' else sorted(targets, key=lambda p: -p[1])
-                    return agent._move_towards_target(*sorted_targets[0])
+                    return sweep_step(agent, targets, direction)
                 else:
                     agent.helper_column = None  # Finished helping in that column
 
             # Select new column to assist in
-            candidate_cols = [
-                x for x in range(grid_w)
-                if any(a.x == x and a != agent for a in agents)
-                and len(get_cells_needing_work(x)) > 0
-            ]
+            candidate_cols = np.flatnonzero(occupied_columns & (work > 0)).tolist()
             if candidate_cols:
-                best_col = max(candidate_cols, key=lambda c: len(get_cells_needing_work(c)))
+                best_col = max(candidate_cols, key=lambda c: work[c])
                 agent.helper_column = best_col
 
                 # Choose entry side based on edge proximity
-                top_unexplored = (best_col, 0) not in explored
-                bottom_unexplored = (best_col, grid_h - 1) not in explored
+                top_unexplored = (best_col, 0) in get_cells_needing_work(best_col)
+                bottom_unexplored = (best_col, grid_h - 1) in get_cells_needing_work(best_col)
                 if top_unexplored and not bottom_unexplored:
                     entry_y = 0
                     agent.column_sweep_direction[best_col] = 'down'
@@ -94,64 +228,99 @@ class LocalPlanner:
         return None
 
 
-class PreassignedPlanner:
-    def select_movement_action(self, agent, perception_data, agents):
-        # Assign agent to columns using round-robin method
+class PreassignedPlanner(BatchedPlanner):
+    @staticmethod
+    def assignments(grid, positions):
+        """Planner state of each agent spawned at positions: its round-robin share of the columns."""
+        grid_w = grid.size[1]
+        total_agents = len(positions)
+        states = []
+        for agent_index in range(total_agents):
+            assigned_columns = [col for col in range(grid_w) if col % total_agents == agent_index]
+            states.append({
+                'assigned_columns': assigned_columns,
+                'assigned_columns_set': set(assigned_columns),
+                'sweep_index': 0,
+                'column_sweep_direction': {},
+            })
+        return states
+
+    def select_movement_actions(self, agents, world_state):
+        return [self._select(agent, world_state) for agent in agents]
+
+    def _select(self, agent, world_state):
+        # Assign the team to columns using round-robin method; ghosts of other strips hold none
         if not hasattr(agent, 'assigned_columns'):
-            agent_index = agents.index(agent)
-            total_agents = len(agents)
-            grid_w = agent.grid.size[1]
-            agent.assigned_columns = [col for col in range(grid_w) if col % total_agents == agent_index]
-            agent.column_sweep_direction = {}
+            assign_team(self, world_state)
 
-        grid_h = agent.grid.size[0]
-        explored = agent.global_explored_cells
+        grid_h, grid_w = agent.grid.size
+        work = world_state.work(agent)[1]
 
         def get_cells_needing_work(col_x):
-            return [(col_x, y) for y in range(grid_h) if (col_x, y) not in explored]
+            return world_state.cells_needing_work(agent, col_x) if work[col_x] else []
 
-        # Sweep assigned columns top-to-bottom or bottom-to-top
-        for x in agent.assigned_columns:
+        # Sweep assigned columns top-to-bottom or bottom-to-top, in order; explored columns stay explored
+        while agent.sweep_index < len(agent.assigned_columns):
+            x = agent.assigned_columns[agent.sweep_index]
+            if not 0 <= x < grid_w:
+                return step_off_grid(agent, x)
             targets = get_cells_needing_work(x)
             if targets:
                 if x not in agent.column_sweep_direction:
                     agent.column_sweep_direction[x] = 'down' if agent.y < grid_h // 2 else 'up'
                 direction = agent.column_sweep_direction[x]
-                sorted_targets = sorted(targets, key=lambda p: p[1]) if direction == 'down' else sorted(targets, key=lambda p: -p[1])
-                return agent._move_towards_target(*sorted_targets[0])
+                return sweep_step(agent, targets, direction)
+            agent.sweep_index += 1
 
-        return None  # All assigned columns complete
+        # All assigned columns complete; help with cells their owners cannot reach
+        return move_to_orphaned_cells(agent, world_state, column_owners(world_state))
 
 
-class PreassignedSweepFromSpawnPlanner:
-    def select_movement_action(self, agent, perception_data, agents):
-        # Assign a continuous block of columns to each agent
-        if not hasattr(agent, 'assigned_columns'):
-            agent_index = agents.index(agent)
-            total_agents = len(agents)
-            grid_w = agent.grid.size[1]
-            block_size = grid_w // total_agents
+class PreassignedSweepFromSpawnPlanner(BatchedPlanner):
+    @staticmethod
+    def assignments(grid, positions):
+        """Planner state of each agent spawned at positions: its block of columns and the order to sweep them."""
+        grid_w = grid.size[1]
+        block_size = grid_w // len(positions)
+        states = []
+        for agent_index, (spawn_x, _) in enumerate(positions):
             start_col = agent_index * block_size
             end_col = start_col + block_size
-            agent.assigned_columns = list(range(start_col, end_col))
-            agent.assigned_columns.sort()
-            agent.assigned_columns_set = set(agent.assigned_columns)
-
-            # Sweep order starts at spawn, then spreads outward
-            agent.spawn_column = agent.x
-            agent.current_column = agent.spawn_column
-            center_idx = agent.assigned_columns.index(agent.spawn_column)
-            left = agent.assigned_columns[:center_idx][::-1]
-            right = agent.assigned_columns[center_idx+1:]
-            agent.sweep_order = [agent.spawn_column] + left + right
-            agent.sweep_index = 0
-            agent.column_sweep_direction = {}
+            assigned_columns = list(range(start_col, end_col))
 
-        grid_h = agent.grid.size[0]
-        explored = agent.global_explored_cells
+            # Sweep order starts at spawn, then spreads outward; an agent spawned outside its
+            # block starts from the block's column nearest to it
+            sweep_order = []
+            if assigned_columns:
+                start_col = min(assigned_columns, key=lambda col: abs(col - spawn_x))
+                center_idx = assigned_columns.index(start_col)
+                left = assigned_columns[:center_idx][::-1]
+                right = assigned_columns[center_idx+1:]
+                sweep_order = [start_col] + left + right
+            states.append({
+                'assigned_columns': assigned_columns,
+                'assigned_columns_set': set(assigned_columns),
+                'spawn_column': spawn_x,
+                'current_column': spawn_x,
+                'sweep_order': sweep_order,
+                'sweep_index': 0,
+                'column_sweep_direction': {},
+            })
+        return states
+
+    def select_movement_actions(self, agents, world_state):
+        return [self._select(agent, world_state) for agent in agents]
+
+    def _select(self, agent, world_state):
+        # Assign a continuous block of columns to each agent of the team; ghosts of other strips hold none
+        if not hasattr(agent, 'assigned_columns'):
+            assign_team(self, world_state)
+
+        grid_h, grid_w = agent.grid.size
+        work = world_state.work(agent)[1]
 
         def get_cells_needing_work(col_x):
-            return [(col_x, y) for y in range(grid_h) if (col_x, y) not in explored]
+            return world_state.cells_needing_work(agent, col_x) if work[col_x] else []
 
         # Follow sweep order one column at a time
         while agent.sweep_index < len(agent.sweep_order):
@@ -159,6 +328,8 @@ class PreassignedSweepFromSpawnPlanner:
             if col not in agent.assigned_columns_set:
                 agent.sweep_index += 1
                 continue
+            if not 0 <= col < grid_w:
+                return step_off_grid(agent, col)
 
             targets = get_cells_needing_work(col)
             if not targets:
@@ -168,13 +339,343 @@ class PreassignedSweepFromSpawnPlanner:
             if col not in agent.column_sweep_direction:
                 agent.column_sweep_direction[col] = 'down' if agent.y <= grid_h // 2 else 'up'
 
-            # Move to column
-            if agent.x != col:
-                return 'right' if agent.x < col else 'left'
+            # Move to column, entering at its nearest unexplored cell by path distance; the same
+            # holds for a part of the column beyond obstacles
+            if agent.x != col or beyond_obstacles(agent, targets):
+                if agent.distance_maps is not None:
+                    direction = agent.distance_maps.step_towards((agent.x, agent.y), targets, agent.frozen_cells())
+                    if direction is not None:
+                        return direction
+                if agent.x != col:
+                    return 'right' if agent.x < col else 'left'
 
             # Then sweep within the column
             direction = agent.column_sweep_direction[col]
-            sorted_targets = sorted(targets, key=lambda p: p[1]) if direction == 'down' else sorted(targets, key=lambda p: -p[1])
-            return agent._move_towards_target(*sorted_targets[0])
+            return sweep_step(agent, targets, direction)
+
+        # All assigned columns complete; help with cells their owners cannot reach
+        return move_to_orphaned_cells(agent, world_state, column_owners(world_state))
+
+
+
+class _Spawn:
+    """Stands in for an agent that does not exist yet when blocks are planned for its spawn."""
+
+    is_frozen = False
+
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
 
-        return None  # All assigned columns complete
+class MakespanColumnPlanner(BatchedPlanner):
+    """Splits the field into contiguous column blocks that minimize the latest agent finish time."""
+
+    def __init__(self):
+        self.blocks = {}  # agent -> (first_col, last_col), or None for an empty block
+        self.makespan = None  # Estimated finish time of the slowest agent, in frames
+        self._frozen = frozenset()  # Agents that were frozen when the blocks were computed
+
+    @classmethod
+    def assignments(cls, grid, positions):
+        """Planner state of each agent spawned at positions: its block of a plan over the whole, unexplored field."""
+        spawns = [_Spawn(x, y) for x, y in positions]
+        cls().plan(grid, spawns, set())
+        return [{'assigned_columns': spawn.assigned_columns, 'sweep_index': 0, 'column_sweep_direction': {}}
+                for spawn in spawns]
+
+    def column_work(self, grid, explored, reachable=None):
+        """Frames of sweeping and task work left in each column, counting only the reachable cells.
+
+        reachable is a flat mask as from Grid.reachable; None counts every passable cell. This
+        reads the whole field, so it runs only when the blocks are planned: at the start and
+        when an agent freezes or recovers, not every tick.
+        """
+        grid_h, grid_w = grid.size
+        reachable = (grid.passable() if reachable is None else reachable).reshape(grid_h, grid_w)
+        targets = np.count_nonzero(reachable, axis=0)
+        if hasattr(explored, 'column_counts'):
+            unexplored = targets - explored.column_counts()
+        else:
+            unexplored = targets.copy()
+            for x, _ in explored:
+                unexplored[x] -= 1
+        unexplored = np.maximum(unexplored, 0)
+        dry = np.count_nonzero((grid.grid['moisture_level'] == 0) & reachable, axis=0)
+        unplanted = np.count_nonzero((grid.grid['crop_status'] == 0) & reachable, axis=0)
+        return (unexplored * sim_core.MOVEMENT_FRAMES
+                + dry * sim_core.WATERING_FRAMES
+                + unplanted * sim_core.PLANTING_FRAMES)
+
+    def travel_costs(self, grid, agents):
+        """Cost matrix of moving each agent from its cell to each column, in frames."""
+        grid_h, grid_w = grid.size
+        xs = np.array([a.x for a in agents])[:, None]
+        ys = np.array([a.y for a in agents])[:, None]
+        cols = np.arange(grid_w)[None, :]
+
+        # Crossing columns requires reaching the open first or last row
+        rows = np.where(ys <= (grid_h - 1) // 2, 0, grid_h - 1)
+        to_open_row = np.abs(ys - rows) * (cols != xs)
+        moves = np.abs(cols - xs) + to_open_row
+
+        # Agents farm every cell they pass, so add the task work on the open row between spawn and column
+        cells = grid.grid[[0, grid_h - 1]]
+        row_tasks = ((cells['moisture_level'] == 0) * sim_core.WATERING_FRAMES
+                     + (cells['crop_status'] == 0) * sim_core.PLANTING_FRAMES)
+        row_prefix = np.concatenate((np.zeros((2, 1), dtype=row_tasks.dtype), np.cumsum(row_tasks, axis=1)), axis=1)
+        row_prefix = row_prefix[(rows == grid_h - 1).astype(int)[:, 0]]  # Prefix sums of each agent's row
+        low = np.minimum(cols, xs)
+        high = np.maximum(cols, xs)
+        passed = np.take_along_axis(row_prefix, high, axis=1) - np.take_along_axis(row_prefix, np.broadcast_to(low + 1, high.shape), axis=1)
+        passed = np.maximum(passed, 0)
+        return moves * sim_core.MOVEMENT_FRAMES + passed
+
+    def plan(self, grid, agents, explored):
+        """Assign contiguous column blocks to the active agents, balancing their finish times."""
+        active = sorted((a for a in agents if not a.is_frozen), key=lambda a: (a.x, agents.index(a)))
+        self.blocks = {a: None for a in agents}
+        self._frozen = frozenset(a for a in agents if a.is_frozen)
+        if not active:
+            return
+
+        grid_w = grid.size[1]
+        reachable = grid.reachable([(a.x, a.y) for a in active])
+        work = np.concatenate(([0], np.cumsum(self.column_work(grid, explored, reachable))))
+        travel = self.travel_costs(grid, active)
+        cols = np.arange(grid_w)
+
+        def block_costs(i, start):
+            """Finish time of agent i for every block [start, end] as a vector over end."""
+            ends = cols[start:]
+            reach = np.minimum(travel[i, start], travel[i, start:])  # Enter at the nearer end
+            return reach + (ends - start) * sim_core.MOVEMENT_FRAMES + work[ends + 1] - work[start]
+
+        def split(limit):
+            """Greedily give each agent the widest block it can finish within the limit."""
+            blocks = []
+            start = 0
+            for i in range(len(active)):
+                if start == grid_w:
+                    blocks.append(None)
+                    continue
+                fits = np.flatnonzero(block_costs(i, start) <= limit)
+                if fits.size == 0:
+                    blocks.append(None)
+                    continue
+                end = start + fits[-1]
+                blocks.append((start, end))
+                start = end + 1
+            return start == grid_w, blocks
+
+        # Binary search for the smallest makespan the greedy split can meet
+        low = 0
+        high = int(travel.max() + work[-1] + grid_w * sim_core.MOVEMENT_FRAMES)
+        best = split(high)[1]
+        while low < high:
+            mid = (low + high) // 2
+            covered, blocks = split(mid)
+            if covered:
+                high = mid
+                best = blocks
+            else:
+                low = mid + 1
+        self.makespan = high
+
+        for agent, block in zip(active, best):
+            self.blocks[agent] = block
+            if not hasattr(agent, 'column_sweep_direction'):
+                agent.column_sweep_direction = {}
+            agent.sweep_index = 0
+            if block is None:
+                agent.assigned_columns = []
+                continue
+            first_col, last_col = block
+            agent.assigned_columns = list(range(first_col, last_col + 1))
+            # Sweep from the end of the block nearest the agent
+            if abs(agent.x - last_col) < abs(agent.x - first_col):
+                agent.assigned_columns.reverse()
+
+    def select_movement_actions(self, agents, world_state):
+        return [self._select(agent, world_state) for agent in agents]
+
+    def _select(self, agent, world_state):
+        team = world_state.team
+        # Compute the split at the start, unless the agents came with their blocks (see
+        # assignments), and recompute it whenever an agent freezes or recovers
+        frozen = frozenset(a for a in team if a.is_frozen)
+        if frozen != self._frozen or not hasattr(agent, 'assigned_columns'):
+            self.plan(agent.grid, team, agent.global_explored_cells)
+
+        grid_h, grid_w = agent.grid.size
+        work = world_state.work(agent)[1]
+
+        def get_cells_needing_work(col_x):
+            return world_state.cells_needing_work(agent, col_x) if work[col_x] else []
+
+        # Sweep the block in order; explored columns stay explored
+        while agent.sweep_index < len(agent.assigned_columns):
+            col = agent.assigned_columns[agent.sweep_index]
+            if not 0 <= col < grid_w:
+                return step_off_grid(agent, col)
+            targets = get_cells_needing_work(col)
+            if not targets:
+                agent.sweep_index += 1
+                continue
+
+            if col not in agent.column_sweep_direction:
+                agent.column_sweep_direction[col] = 'down' if agent.y <= grid_h // 2 else 'up'
+
+            # Move to column, entering at its nearest unexplored cell by path distance; the same
+            # holds for a part of the column beyond obstacles
+            if agent.x != col or beyond_obstacles(agent, targets):
+                if agent.distance_maps is not None:
+                    direction = agent.distance_maps.step_towards((agent.x, agent.y), targets, agent.frozen_cells())
+                    if direction is not None:
+                        return direction
+                if agent.x != col:
+                    return 'right' if agent.x < col else 'left'
+
+            # Then sweep within the column
+            direction = agent.column_sweep_direction[col]
+            return sweep_step(agent, targets, direction)
+
+        # All assigned columns complete; help with cells their owners cannot reach
+        owners = [None] * agent.grid.size[1]
+        for other, block in self.blocks.items():
+            if block is not None:
+                owners[block[0]:block[1] + 1] = [other] * (block[1] - block[0] + 1)
+        return move_to_orphaned_cells(agent, world_state, owners)
+
+
+class TaskAwarePlanner:
+    """Sends agents only to cells that need watering or planting, nearest open column first.
+
+    Tasks appear anywhere on the field (see field_dynamics), so the task index is rebuilt from
+    the whole field every tick. On a TiledGrid that writes back the dirty tiles and scans the
+    memmap each tick; use the column planners on fields too large for that.
+    """
+
+    def __init__(self):
+        self.task_mask = None  # Flat mask of cells that are dry or unplanted
+        self.task_index = None  # np.flatnonzero of task_mask
+        self.column_tasks = None  # Open task count per column
+        self.claims = {}  # agent -> column it is working through
+        self.next_steps = {}  # agent -> cell it is trying to move into this tick
+        self._indexed_tick = None
+
+    def refresh_tasks(self, grid, agents=()):
+        """Rebuild the task index from the grid arrays, keeping the tasks the agents can reach."""
+        cells = grid.grid.reshape(-1)
+        self.task_mask = (cells['moisture_level'] == 0) | (cells['crop_status'] == 0)
+        if agents:
+            self.task_mask &= grid.reachable([(a.x, a.y) for a in agents])
+        else:
+            self.task_mask &= grid.passable().reshape(-1)
+        self.task_index = np.flatnonzero(self.task_mask)
+        self.column_tasks = np.bincount(self.task_index % grid.size[1], minlength=grid.size[1])
+        self._indexed_tick = sim_core.viz_while_loop_counter
+
+    def mission_complete(self, grid, agents=()):
+        """The mission ends once no reachable cell needs water or planting."""
+        self.refresh_tasks(grid, agents)
+        return len(self.task_index) == 0
+
+    def select_movement_action(self, agent, perception_data, agents):
+        grid = agent.grid
+        grid_w = grid.size[1]
+        grid_h = grid.size[0]
+
+        # Index tasks once per tick; every agent in the tick shares it
+        if self._indexed_tick != sim_core.viz_while_loop_counter:
+            self.refresh_tasks(grid, agents)
+
+        # Release columns that are finished or held by agents that can no longer act
+        for other in list(self.claims):
+            if other.is_frozen or self.column_tasks[self.claims[other]] == 0:
+                del self.claims[other]
+
+        self.next_steps.pop(agent, None)
+        if len(self.task_index) == 0:
+            self.claims.pop(agent, None)
+            return self._make_way(agent, agents)
+
+        held = self.claims.get(agent)
+        taken = {col for other, col in self.claims.items() if other is not agent}
+        blocked = {(a.x, a.y) for a in agents if a is not agent and a.is_frozen}
+
+        # Nearest task in the held column; otherwise the nearest task in a column nobody holds,
+        # falling back to the nearest task anywhere so idle agents help finish busy columns
+        start = (agent.x, agent.y)
+        goal = None
+        fallback = None
+        for x, y, came_from in self._search(grid, start, blocked):
+            if not self.task_mask[y * grid_w + x]:
+                continue
+            if held is not None:
+                if x == held:
+                    goal = (x, y)
+                    break
+            elif x not in taken:
+                goal = (x, y)
+                break
+            if fallback is None:
+                fallback = (x, y)
+
+        if goal is None:
+            self.claims.pop(agent, None)
+            goal = fallback
+        elif held is None:
+            self.claims[agent] = goal[0]
+
+        if goal is None:
+            return self._make_way(agent, agents)  # Remaining tasks are unreachable
+        if goal == start:
+            return None  # Task is under the agent; it is handled on its next perception
+
+        # Walk back to the first step of the path
+        step = goal
+        while came_from[step] != start:
+            step = came_from[step]
+        self.next_steps[agent] = step
+        return agent._move_towards_target(*step)
+
+    def _search(self, grid, start, blocked):
+        """Breadth-first search over the boundary graph, yielding cells in order of distance."""
+        grid_h, grid_w = grid.size
+        came_from = {start: None}
+        frontier = deque([start])
+        while frontier:
+            x, y = frontier.popleft()
+            yield x, y, came_from
+            for dx, dy, direction in [(0, -1, 'up'), (0, 1, 'down'), (-1, 0, 'left'), (1, 0, 'right')]:
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < grid_w and 0 <= ny < grid_h) or (nx, ny) in came_from:
+                    continue
+                if grid.is_boundary(x, y, direction) or grid.is_obstacle(nx, ny) or (nx, ny) in blocked:
+                    continue
+                came_from[(nx, ny)] = (x, y)
+                frontier.append((nx, ny))
+
+    def _make_way(self, agent, agents):
+        """Step an idle agent out of the way of an agent trying to move into its cell."""
+        pushers = [other for other, step in self.next_steps.items() if step == (agent.x, agent.y) and other is not agent]
+        if not pushers:
+            return None
+
+        pusher = pushers[0]
+        grid = agent.grid
+        occupied = {(a.x, a.y) for a in agents if a is not agent}
+        options = []
+        for dx, dy, direction in [(-1, 0, 'left'), (1, 0, 'right'), (0, -1, 'up'), (0, 1, 'down')]:
+            nx, ny = agent.x + dx, agent.y + dy
+            if not (0 <= nx < grid.size[1] and 0 <= ny < grid.size[0]) or (nx, ny) in occupied:
+                continue
+            if grid.is_boundary(agent.x, agent.y, direction) or grid.is_obstacle(nx, ny):
+                continue
+            # Prefer sidestepping off the pusher's line, then moving directly away from it
+            away = abs(nx - pusher.x) + abs(ny - pusher.y)
+            sidestep = nx != pusher.x and ny != pusher.y
+            options.append((not sidestep, -away, direction))
+        if not options:
+            return None
+        return min(options)[2]
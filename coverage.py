@@ -0,0 +1,164 @@
+import numpy as np
+
+
+class CoverageMap:
+    """Explored cells of a field as per-chunk bitsets, a drop-in for the set of (x, y) tuples.
+
+    Chunks are allocated on first write, so unexplored areas cost nothing; a fully explored
+    field costs one bit per cell.
+    """
+
+    def __init__(self, size, chunk_shape=(64, 64)):
+        self.size = size  # (h, w) like Grid.size
+        self.chunk_shape = chunk_shape
+        grid_h, grid_w = size
+        chunk_h, chunk_w = chunk_shape
+        self.chunk_rows = -(-grid_h // chunk_h)
+        self.chunk_cols = -(-grid_w // chunk_w)
+        self.chunks = {}  # (chunk_row, chunk_col) -> bytearray with one bit per cell, row-major in the chunk
+        self._count = 0
+        self.journal = None  # When a list, flat indices (y * w + x) of newly explored cells are appended to it
+
+    def _locate(self, cell):
+        x, y = cell
+        chunk_h, chunk_w = self.chunk_shape
+        key = (y // chunk_h, x // chunk_w)
+        return key, (y - key[0] * chunk_h) * chunk_w + (x - key[1] * chunk_w)
+
+    def __contains__(self, cell):
+        x, y = cell
+        if not (0 <= x < self.size[1] and 0 <= y < self.size[0]):
+            return False
+        key, bit = self._locate(cell)
+        bits = self.chunks.get(key)
+        return bits is not None and bool(bits[bit >> 3] & (1 << (bit & 7)))
+
+    def add(self, cell):
+        x, y = cell
+        if not (0 <= x < self.size[1] and 0 <= y < self.size[0]):
+            raise ValueError("Coordinates out of bounds")
+        key, bit = self._locate(cell)
+        bits = self.chunks.get(key)
+        if bits is None:
+            bits = self.chunks[key] = bytearray((self.chunk_shape[0] * self.chunk_shape[1] + 7) // 8)
+        mask = 1 << (bit & 7)
+        if bits[bit >> 3] & mask:
+            return
+        bits[bit >> 3] |= mask
+        self._count += 1
+        if self.journal is not None:
+            self.journal.append(y * self.size[1] + x)
+
+    def add_indices(self, indices):
+        """Mark cells given as sorted, unique flat indices (y * w + x); returns the indices that were new.
+
+        Bits are set chunk by chunk through views of the bitsets, without building cell tuples.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if not indices.size:
+            return indices
+        chunk_h, chunk_w = self.chunk_shape
+        ys, xs = np.divmod(indices, self.size[1])
+        keys = (ys // chunk_h) * self.chunk_cols + xs // chunk_w
+        bits = (ys % chunk_h) * chunk_w + xs % chunk_w
+        order = np.argsort(keys, kind='stable')
+        keys, bits, indices = keys[order], bits[order], indices[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        added = []
+        for start, stop in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(keys)]))):
+            flat_key = int(keys[start])
+            key = divmod(flat_key, self.chunk_cols)
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                chunk = self.chunks[key] = bytearray((chunk_h * chunk_w + 7) // 8)
+            view = np.frombuffer(chunk, dtype=np.uint8)
+            chunk_bits = bits[start:stop]
+            masks = np.left_shift(1, chunk_bits & 7).astype(np.uint8)
+            new = (view[chunk_bits >> 3] & masks) == 0
+            if new.any():
+                np.bitwise_or.at(view, chunk_bits[new] >> 3, masks[new])
+                added.append(indices[start:stop][new])
+        if not added:
+            return indices[:0]
+        added = np.sort(np.concatenate(added))
+        self._count += len(added)
+        if self.journal is not None:
+            self.journal.extend(added.tolist())
+        return added
+
+    def __len__(self):
+        return self._count
+
+    def _chunk_mask(self, key):
+        """Explored mask of a chunk, clipped to the field."""
+        chunk_h, chunk_w = self.chunk_shape
+        bits = self.chunks.get(key)
+        rows = min(chunk_h, self.size[0] - key[0] * chunk_h)
+        cols = min(chunk_w, self.size[1] - key[1] * chunk_w)
+        if bits is None:
+            return np.zeros((rows, cols), dtype=bool)
+        mask = np.unpackbits(np.frombuffer(bits, dtype=np.uint8), bitorder='little')[:chunk_h * chunk_w]
+        return mask.reshape(chunk_h, chunk_w)[:rows, :cols].astype(bool)
+
+    def __iter__(self):
+        chunk_h, chunk_w = self.chunk_shape
+        for key in sorted(self.chunks):
+            ys, xs = np.nonzero(self._chunk_mask(key))
+            for x, y in zip((xs + key[1] * chunk_w).tolist(), (ys + key[0] * chunk_h).tolist()):
+                yield x, y
+
+    def update(self, other):
+        """Merge in every cell explored in another map of the same size and chunk shape; returns cells added.
+
+        Merged cells are not written to the journal.
+        """
+        added = 0
+        for key, theirs in other.chunks.items():
+            mine = self.chunks.get(key)
+            if mine is None:
+                mine = self.chunks[key] = bytearray(len(theirs))
+            view = np.frombuffer(mine, dtype=np.uint8)
+            new = np.frombuffer(theirs, dtype=np.uint8) & ~view
+            count = int(np.unpackbits(new).sum())
+            if count:
+                view |= new
+                added += count
+        self._count += added
+        return added
+
+    def indices(self):
+        """Sorted flat indices (y * w + x) of all explored cells."""
+        chunk_h, chunk_w = self.chunk_shape
+        parts = []
+        for key in self.chunks:
+            ys, xs = np.nonzero(self._chunk_mask(key))
+            parts.append((ys + key[0] * chunk_h) * self.size[1] + xs + key[1] * chunk_w)
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def column_counts(self):
+        """Explored cells in each column of the field."""
+        counts = np.zeros(self.size[1], dtype=np.int64)
+        chunk_w = self.chunk_shape[1]
+        for key in self.chunks:
+            mask = self._chunk_mask(key)
+            counts[key[1] * chunk_w:key[1] * chunk_w + mask.shape[1]] += mask.sum(axis=0)
+        return counts
+
+    def column(self, x):
+        """Explored mask of column x, top to bottom, read from the chunks the column crosses."""
+        chunk_h, chunk_w = self.chunk_shape
+        mask = np.zeros(self.size[0], dtype=bool)
+        chunk_col, col = divmod(x, chunk_w)
+        for chunk_row in range(self.chunk_rows):
+            bits = self.chunks.get((chunk_row, chunk_col))
+            if bits is None:
+                continue
+            top = chunk_row * chunk_h
+            rows = min(chunk_h, self.size[0] - top)
+            positions = np.arange(rows) * chunk_w + col
+            mask[top:top + rows] = (np.frombuffer(bits, dtype=np.uint8)[positions >> 3] & (1 << (positions & 7))) > 0
+        return mask
+
+    def nbytes(self):
+        """Memory used by the bitsets."""
+        return sum(len(bits) for bits in self.chunks.values())
@@ -0,0 +1,214 @@
+import numpy as np
+from bisect import bisect_right
+from coverage import CoverageMap
+
+RUNS, BITSET = 0, 1  # Delta encodings, stored in the first header byte
+HEADER_BYTES = 5  # Encoding (1 byte) and cell count (4 bytes)
+
+
+def _index_dtype(num_cells):
+    return np.uint16 if num_cells <= 0xFFFF else np.uint32
+
+
+def encode_delta(indices, num_cells, encoding='auto'):
+    """Encode sorted, unique flat cell indices as a message payload (bytes).
+
+    RUNS stores (gap since the previous run, run length) pairs; BITSET stores the first
+    index and one bit per cell up to the last. 'auto' picks whichever is smaller.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    dtype = _index_dtype(num_cells)
+    if encoding in ('auto', 'runs'):
+        starts = np.flatnonzero(np.diff(indices, prepend=-2) != 1)
+        ends = np.append(starts[1:], len(indices))[:len(starts)]
+        run_starts = indices[starts]
+        gaps = np.diff(run_starts, prepend=0) - np.concatenate(([0], ends[:-1] - starts[:-1]))
+        runs = np.empty(2 * len(starts), dtype=dtype)
+        runs[0::2], runs[1::2] = gaps, ends - starts
+        runs_payload = runs.tobytes()
+    if encoding in ('auto', 'bitset'):
+        first = indices[0] if len(indices) else 0
+        flags = np.zeros(int(indices[-1] - first + 1) if len(indices) else 0, dtype=bool)
+        flags[indices - first] = True
+        bitset_payload = np.array([first], dtype=dtype).tobytes() + np.packbits(flags, bitorder='little').tobytes()
+    if encoding == 'runs' or (encoding == 'auto' and len(runs_payload) <= len(bitset_payload)):
+        kind, payload = RUNS, runs_payload
+    else:
+        kind, payload = BITSET, bitset_payload
+    return bytes([kind]) + len(indices).to_bytes(4, 'little') + payload
+
+
+def decode_delta(message, num_cells):
+    """Sorted flat cell indices of an encoded delta."""
+    kind = message[0]
+    count = int.from_bytes(message[1:HEADER_BYTES], 'little')
+    dtype = _index_dtype(num_cells)
+    payload = np.frombuffer(message, dtype=np.uint8, offset=HEADER_BYTES)
+    if kind == BITSET:
+        first = int(payload[:dtype().itemsize].view(dtype)[0])
+        flags = np.unpackbits(payload[dtype().itemsize:], bitorder='little')
+        return np.flatnonzero(flags)[:count] + first
+    runs = payload.view(dtype).astype(np.int64)
+    gaps, lengths = runs[0::2], runs[1::2]
+    run_starts = np.cumsum(gaps + np.concatenate(([0], lengths[:-1])))
+    # Each index is its run's start plus its offset within the run
+    offsets = np.arange(count) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(run_starts, lengths) + offsets
+
+
+class CoverageNetwork:
+    """Tick hook that gives each agent its own coverage map, kept in sync by broadcast deltas.
+
+    Every interval ticks each working agent broadcasts the cells its map gained since its last
+    broadcast (its own discoveries, plus cells it received when relay is set), encoded compactly.
+    The broadcast reaches agents within comm_range (Euclidean, in cells; None means anywhere)
+    and is capped at budget_bytes per message; cells that do not fit wait for the next one.
+    With resync, a broadcast also repeats the cells sent while any of its receivers was out of
+    range, so coming back into range catches up on what was missed; broadcasts every working
+    receiver has heard since are dropped, and an agent that recovers after missing dropped ones
+    gets the sender's whole map instead. Frozen agents neither send nor receive. Only coverage goes over the network: agents still see each other's positions
+    directly, as if by onboard sensing.
+    """
+
+    def __init__(self, interval=1, comm_range=None, budget_bytes=None, relay=False, resync=True, encoding='auto'):
+        self.interval = interval
+        self.comm_range = comm_range
+        self.budget_bytes = budget_bytes
+        self.relay = relay
+        self.resync = resync
+        self.encoding = encoding
+        self.agents = []
+        self.messages = 0
+        self.bytes_sent = 0  # One transmission per broadcast, whatever the number of receivers
+        self.bytes_delivered = 0
+        self.cells_sent = 0
+        self.cells_merged = 0  # Cells new to their receiver
+
+    def bind(self, grid, agents):
+        self.grid = grid
+        self.num_cells = grid.size[0] * grid.size[1]
+        self.agents = agents
+        self.pending = [np.zeros(0, dtype=np.int64) for _ in agents]  # Cells not yet broadcast, sorted
+        self.sent = [[] for _ in agents]  # Cells of each broadcast not yet heard by every receiver, oldest first
+        self.sent_ticks = [[] for _ in agents]  # Tick of each of those broadcasts
+        self.pruned = np.full(len(agents), -1)  # [sender] -> tick of its latest dropped broadcast
+        self.last_broadcast = np.full(len(agents), -1)
+        self.last_heard = np.full((len(agents), len(agents)), -1)  # [sender, receiver] -> tick
+        for agent in agents:
+            own = CoverageMap(grid.size)
+            own.journal = []
+            for cell in agent.visited_cells:
+                own.add(cell)
+            agent.global_explored_cells = own
+
+    def _missed(self, sender, receivers):
+        """Cells the sender broadcast while any of receivers was out of range."""
+        since = self.last_heard[sender, receivers].min()
+        if since >= self.last_broadcast[sender]:
+            return None
+        if since < self.pruned[sender]:
+            # Broadcasts it missed were dropped; the sender's map holds every cell it ever sent
+            return self.agents[sender].global_explored_cells.indices()
+        return np.concatenate(self.sent[sender][bisect_right(self.sent_ticks[sender], since):])
+
+    def _prune(self, working):
+        """Drop the broadcasts that every other working agent has heard since."""
+        for sender in working:
+            if not self.sent_ticks[sender]:
+                continue
+            heard = self.last_heard[sender, [index for index in working if index != sender]].min()
+            count = bisect_right(self.sent_ticks[sender], heard)
+            if count:
+                self.pruned[sender] = self.sent_ticks[sender][count - 1]
+                del self.sent[sender][:count], self.sent_ticks[sender][:count]
+
+    def _take(self, sender, missed=None):
+        """Encoded delta of a sender's pending cells, as much as fits the budget, or None."""
+        explored = self.agents[sender].global_explored_cells
+        pending = self.pending[sender]
+        if explored.journal or missed is not None:
+            pending = np.unique(np.concatenate([pending, explored.journal, missed if missed is not None else []]))
+            explored.journal.clear()
+        if not len(pending):
+            return None
+        count = len(pending)
+        message = encode_delta(pending, self.num_cells, self.encoding)
+        if self.budget_bytes is not None and len(message) > self.budget_bytes:
+            # Longest prefix that fits, by bisection on the cell count
+            low, high = 0, len(pending)
+            while low < high:
+                middle = (low + high + 1) // 2
+                if len(encode_delta(pending[:middle], self.num_cells, self.encoding)) <= self.budget_bytes:
+                    low = middle
+                else:
+                    high = middle - 1
+            count = low
+            message = encode_delta(pending[:count], self.num_cells, self.encoding) if count else None
+        self.pending[sender] = pending[count:]
+        self.cells_sent += count
+        return message
+
+    def __call__(self, tick):
+        if tick % self.interval:
+            return
+        working = [index for index, agent in enumerate(self.agents) if not agent.is_frozen]
+        if len(working) < 2:
+            return
+        positions = np.array([(self.agents[index].x, self.agents[index].y) for index in working], dtype=float)
+        if self.comm_range is not None:
+            distances = np.hypot(*(positions[:, None, :] - positions[None, :, :]).transpose(2, 0, 1))
+            in_range = distances <= self.comm_range
+        else:
+            in_range = np.ones((len(working), len(working)), dtype=bool)
+        np.fill_diagonal(in_range, False)
+
+        inbox = [[] for _ in working]  # Decoded deltas per receiver, merged in one pass each
+        for i, sender in enumerate(working):
+            listeners = np.flatnonzero(in_range[i])
+            if not len(listeners):
+                continue  # Nobody listening; the delta waits
+            receivers = np.array(working)[listeners]
+            message = self._take(sender, self._missed(sender, receivers) if self.resync else None)
+            if message is None:
+                continue
+            cells = decode_delta(message, self.num_cells)  # Decoded once, shared by all receivers
+            if self.resync:
+                self.sent[sender].append(cells)
+                self.sent_ticks[sender].append(tick)
+            self.last_broadcast[sender] = tick
+            self.last_heard[sender, receivers] = tick
+            self.messages += 1
+            self.bytes_sent += len(message)
+            self.bytes_delivered += len(message) * len(listeners)
+            for j in listeners:
+                inbox[j].append(cells)
+
+        for receiver, deltas in zip(working, inbox):
+            if not deltas:
+                continue
+            cells = deltas[0] if len(deltas) == 1 else np.unique(np.concatenate(deltas))
+            explored = self.agents[receiver].global_explored_cells
+            journal = explored.journal
+            if not self.relay:
+                explored.journal = None  # Received cells are not forwarded
+            self.cells_merged += len(explored.add_indices(cells))
+            explored.journal = journal
+
+        if self.resync:
+            self._prune(working)
+
+    def union(self):
+        """Cells explored by any agent, as one CoverageMap."""
+        merged = CoverageMap(self.grid.size)
+        for agent in self.agents:
+            merged.update(agent.global_explored_cells)
+        return merged
+
+    def stats(self):
+        return {
+            'messages': self.messages,
+            'bytes_sent': self.bytes_sent,
+            'bytes_delivered': self.bytes_delivered,
+            'cells_sent': self.cells_sent,
+            'cells_merged': self.cells_merged,
+        }
@@ -0,0 +1,139 @@
+import numpy as np
+from collections import OrderedDict
+
+DIRECTIONS = ['left', 'right', 'up', 'down']  # Column order of Grid.neighbor_table()
+
+
+class DistanceMapCache:
+    """Shared BFS distance fields over the boundary graph, keyed by target set, with LRU eviction.
+
+    A field holds every cell's step distance to the nearest target, -1 where unreachable, as a
+    flat array indexed y * w + x. Blocked cells (e.g. frozen agents) are impassable. A cached
+    field is reused when the blocked cells change in ways that cannot alter it, and patched
+    or recomputed otherwise. Returned arrays are shared; callers must not modify them.
+    """
+
+    def __init__(self, grid, capacity=256):
+        self.grid = grid
+        self.capacity = capacity
+        self.entries = OrderedDict()  # frozenset of target cells -> (field, blocked cells)
+        self.hits = 0
+        self.misses = 0
+        self._neighbor_table = None
+
+    def _neighbors(self):
+        # Rebuilt, and the cache emptied, whenever the grid's boundaries change
+        table = self.grid.neighbor_table()
+        if table is not self._neighbor_table:
+            self._neighbor_table = table
+            self.entries.clear()
+        return table
+
+    def _index(self, cells):
+        grid_w = self.grid.size[1]
+        return np.fromiter((y * grid_w + x for x, y in cells), dtype=np.intp, count=len(cells))
+
+    def _compute(self, targets, blocked):
+        """Multi-source BFS from targets, one vectorized frontier expansion per distance."""
+        table = self._neighbors()
+        num_cells = len(table)
+        field = np.full(num_cells + 1, -1, dtype=np.int32)
+        unvisited = np.ones(num_cells + 1, dtype=bool)
+        unvisited[num_cells] = False  # Sentinel for missing neighbors
+        if blocked:
+            unvisited[self._index(blocked)] = False
+
+        frontier = self._index(targets)
+        frontier = frontier[unvisited[frontier]]
+        field[frontier] = 0
+        unvisited[frontier] = False
+        distance = 0
+        while frontier.size:
+            distance += 1
+            reached = table[frontier].ravel()
+            frontier = np.unique(reached[unvisited[reached]])
+            field[frontier] = distance
+            unvisited[frontier] = False
+        return field[:num_cells]
+
+    def _still_valid(self, field, old_blocked, blocked):
+        """Patch field in place for changed blocked cells, or return False if it must be recomputed."""
+        table = self._neighbors()
+        grid_w = self.grid.size[1]
+        for x, y in blocked - old_blocked:
+            cell = y * grid_w + x
+            if field[cell] < 0:
+                continue
+            around = table[cell][table[cell] < len(field)]
+            if np.any(field[around] == field[cell] + 1):
+                return False  # Some cell may have been reached through it
+            field[cell] = -1
+        for x, y in old_blocked - blocked:
+            cell = y * grid_w + x
+            around = [n for n in table[cell] if n < len(field) and (n % grid_w, n // grid_w) not in blocked]
+            reachable = [field[n] for n in around if field[n] >= 0]
+            distance = min(reachable) + 1 if reachable else -1
+            if any(field[n] < 0 or field[n] > distance + 1 for n in around):
+                return False  # The freed cell shortens or opens other routes
+            field[cell] = distance
+        return True
+
+    def distances(self, targets, blocked=frozenset()):
+        """Distance field to the nearest of targets, treating blocked cells as walls."""
+        key = frozenset(targets)
+        blocked = frozenset(blocked) - key
+        self._neighbors()
+        entry = self.entries.get(key)
+        if entry is not None:
+            field, old_blocked = entry
+            if old_blocked == blocked or self._still_valid(field, old_blocked, blocked):
+                self.entries[key] = (field, blocked)
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return field
+
+        self.misses += 1
+        field = self._compute(key, blocked)
+        self.entries[key] = (field, blocked)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return field
+
+    def distance(self, cell, targets, blocked=frozenset()):
+        """Steps from cell to the nearest target, or -1 if none is reachable."""
+        x, y = cell
+        return int(self.distances(targets, blocked)[y * self.grid.size[1] + x])
+
+    def step_towards(self, cell, targets, blocked=frozenset(), prefer=None):
+        """Direction of a first step on a shortest path from cell to the nearest target.
+
+        Ties go to the earliest direction in prefer. Returns None at a target or when none is reachable.
+        """
+        field = self.distances(targets, blocked)
+        table = self._neighbors()
+        x, y = cell
+        here = field[y * self.grid.size[1] + x]
+        if here <= 0:
+            return None
+        neighbors = table[y * self.grid.size[1] + x]
+        for direction in prefer or DIRECTIONS:
+            neighbor = neighbors[DIRECTIONS.index(direction)]
+            if neighbor < len(field) and field[neighbor] == here - 1:
+                return direction
+        return None
+
+    def path(self, cell, targets, blocked=frozenset()):
+        """Cells of a shortest path from cell (exclusive) to the nearest target, or None."""
+        field = self.distances(targets, blocked)
+        table = self._neighbors()
+        grid_w = self.grid.size[1]
+        current = cell[1] * grid_w + cell[0]
+        if field[current] < 0:
+            return None
+        path = []
+        while field[current] > 0:
+            neighbors = table[current]
+            current = next(n for n in neighbors if n < len(field) and field[n] == field[current] - 1)
+            path.append((int(current % grid_w), int(current // grid_w)))
+        return path
@@ -0,0 +1,152 @@
+import numpy as np
+import simulation
+
+
+class FaultEvent:
+    """One agent breaking down at a tick, or on reaching a cell, and optionally recovering later."""
+
+    def __init__(self, agent_index, tick=None, cell=None, recover_after=None):
+        self.agent_index = agent_index
+        self.tick = tick  # Freeze at this tick
+        self.cell = cell  # ...or when the agent first stands on this (x, y) cell
+        self.recover_after = recover_after  # Ticks frozen before recovering; None means never
+
+    def __repr__(self):
+        trigger = f"tick={self.tick}" if self.cell is None else f"cell={self.cell}"
+        return f"FaultEvent(agent={self.agent_index}, {trigger}, recover_after={self.recover_after})"
+
+
+class FaultInjector:
+    """Tick hook that freezes and recovers agents according to a list of FaultEvents."""
+
+    def __init__(self, events):
+        self.events = list(events)
+        self.bind(None, None)  # run_headless binds it to the run's agents
+
+    def bind(self, grid, agents):
+        self.agents = agents
+        self.log = []  # (tick, agent_index, 'freeze' | 'recover')
+        self._pending = list(self.events)
+        self._recoveries = {}  # tick -> agent indices
+
+    def result(self):
+        """The breakdowns and recoveries that fired in the run, for run_headless's result."""
+        return {'fault_log': list(self.log)}
+
+    def __call__(self, tick):
+        for index in self._recoveries.pop(tick, ()):
+            self.agents[index].is_frozen = False
+            self.log.append((tick, index, 'recover'))
+
+        for event in list(self._pending):
+            agent = self.agents[event.agent_index]
+            if event.cell is None:
+                triggered = tick >= event.tick
+            else:
+                triggered = (agent.x, agent.y) == tuple(event.cell)
+            if not triggered:
+                continue
+
+            self._pending.remove(event)
+            agent.is_frozen = True
+            self.log.append((tick, event.agent_index, 'freeze'))
+            if event.recover_after is not None:
+                self._recoveries.setdefault(tick + event.recover_after, []).append(event.agent_index)
+
+
+class FaultModel:
+    """Distributions for which agents break down, when, and whether and when they recover.
+
+    Distributions are given as (numpy Generator method, *args), e.g. ('uniform', 0, 300)
+    or ('exponential', 100), and are sampled in ticks.
+    """
+
+    def __init__(self, failure_probability=0.5, breakdown_time=('uniform', 0, 300),
+                 recovery_probability=0.0, repair_time=('exponential', 100), max_failures=None):
+        self.failure_probability = failure_probability  # Per agent, per scenario
+        self.breakdown_time = breakdown_time
+        self.recovery_probability = recovery_probability
+        self.repair_time = repair_time
+        self.max_failures = max_failures  # Cap on breakdowns per scenario, None for no cap
+
+    def _draw(self, rng, distribution, size):
+        name, *args = distribution
+        return getattr(rng, name)(*args, size=size)
+
+    def sample(self, rng, num_agents):
+        """Sample the fault events of one scenario."""
+        failing = np.flatnonzero(rng.random(num_agents) < self.failure_probability)
+        if self.max_failures is not None and len(failing) > self.max_failures:
+            failing = np.sort(rng.choice(failing, self.max_failures, replace=False))
+
+        onsets = np.maximum(np.rint(self._draw(rng, self.breakdown_time, len(failing))), 0).astype(int)
+        recovers = rng.random(len(failing)) < self.recovery_probability
+        repairs = np.maximum(np.rint(self._draw(rng, self.repair_time, len(failing))), 1).astype(int)
+        return [FaultEvent(int(index), tick=int(onset), recover_after=int(repair) if recover else None)
+                for index, onset, recover, repair in zip(failing, onsets, recovers, repairs)]
+
+
+def run_campaign(planner, fault_model, num_scenarios=1000, base_config=None, seed=None, vary_grid=True, processes=None):
+    """Run num_scenarios sampled failure scenarios for one planner through the parallel headless path.
+
+    Scenario i runs with seed + i (seed defaults to base_config's, 42) and samples its breakdowns
+    from that seed's 'faults' stream in the worker, so any run can be reproduced alone from its
+    result's seed. Without vary_grid every run keeps the field of seed itself.
+    """
+    config = {'agent_positions': ((0, 0), (1, 0), (2, 0)), 'size': (7, 15), 'max_ticks': 3000}
+    config.update(base_config or {})
+    config['planner'] = planner
+    config['faults'] = dict(vars(fault_model))
+    first_seed = int(config.get('seed', 42) if seed is None else seed)
+    if not vary_grid:
+        config['grid_seed'] = first_seed
+
+    configs = [dict(config, seed=first_seed + i) for i in range(num_scenarios)]
+    return simulation.run_many(configs, processes=processes)
+
+
+def summarize(results):
+    """Completion-time and coverage distributions of a campaign.
+
+    Runs count as faulted only if a breakdown fired, by their fault_log; a sampled breakdown
+    due after the run ended does not count.
+    """
+    ticks = np.array([r['ticks'] for r in results])
+    coverage = np.array([r['coverage'] for r in results])
+    completed = np.array([r['completed'] for r in results])
+    failed = np.array([any(kind == 'freeze' for _, _, kind in r['fault_log']) for r in results])
+    quantiles = [5, 25, 50, 75, 95]
+    return {
+        'runs': len(results),
+        'runs_with_faults': int(failed.sum()),
+        'completion_rate': completed.mean(),
+        'completion_rate_with_faults': completed[failed].mean() if failed.any() else float('nan'),
+        'ticks_completed': dict(zip(quantiles, np.percentile(ticks[completed], quantiles))) if completed.any() else {},
+        'ticks_mean_completed': ticks[completed].mean() if completed.any() else float('nan'),
+        'coverage_mean': coverage.mean(),
+        'coverage': dict(zip(quantiles, np.percentile(coverage, quantiles))),
+    }
+
+
+def print_summary(planner, summary):
+    print(f"--- {planner} ---")
+    print(f"  Runs: {summary['runs']} ({summary['runs_with_faults']} with breakdowns)")
+    print(f"  Completion rate: {summary['completion_rate'] * 100:.1f}% "
+          f"({summary['completion_rate_with_faults'] * 100:.1f}% with breakdowns)")
+    if summary['ticks_completed']:
+        ticks = ", ".join(f"p{q}={v:.0f}" for q, v in summary['ticks_completed'].items())
+        print(f"  Completion ticks: mean={summary['ticks_mean_completed']:.1f}, {ticks}")
+    coverage = ", ".join(f"p{q}={v * 100:.1f}%" for q, v in summary['coverage'].items())
+    print(f"  Coverage: mean={summary['coverage_mean'] * 100:.1f}%, {coverage}")
+
+
+def main():
+    # One breakdown per scenario at a uniformly random tick, no recovery
+    fault_model = FaultModel(failure_probability=1.0, breakdown_time=('uniform', 0, 300), max_failures=1)
+    for planner in ['LP', 'PCP']:
+        results = run_campaign(planner, fault_model, num_scenarios=2000, seed=0)
+        print_summary(planner, summarize(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import numpy as np
+
+MATURE_STAGE = 3  # crop_status: 0 empty, 1 planted, up to MATURE_STAGE fully grown
+
+
+class FieldDynamics:
+    """Tick hook that changes the field between agent actions: drying, rain and crop growth.
+
+    Per-cell events are drawn as a binomial count of affected cells followed by that many
+    random cells, so a tick costs a fixed number of NumPy calls and work proportional to the
+    events drawn, not to the field size. Probabilities are per cell per tick.
+    """
+
+    def __init__(self, grid=None, seed=None, drying_probability=0.002, rain_probability=0.002,
+                 rain_radius=(1, 4), growth_probability=0.01):
+        self.grid = grid
+        self.rng = np.random.default_rng(seed)  # seed may be a Generator, e.g. run_streams(seed)['dynamics']
+        self.drying_probability = drying_probability  # A wet cell turns dry
+        self.rain_probability = rain_probability  # Per tick: a rain shower wets a square of cells
+        self.rain_radius = rain_radius  # (min, max) half-width of a shower, in cells
+        self.growth_probability = growth_probability  # A planted, watered crop grows one stage
+        self.dried = 0
+        self.showers = 0
+        self.grown = 0
+
+    def bind(self, grid, agents):
+        self.grid = grid
+
+    def _sample_cells(self, probability):
+        """Flat indices of the cells hit by an independent per-cell event, duplicates merged."""
+        num_cells = self.grid.size[0] * self.grid.size[1]
+        hits = self.rng.binomial(num_cells, probability)
+        return np.unique(self.rng.integers(num_cells, size=hits))
+
+    def __call__(self, tick):
+        grid_h, grid_w = self.grid.size
+        cells = self.grid.grid
+        moisture = cells['moisture_level'].reshape(-1)
+        crops = cells['crop_status'].reshape(-1)
+
+        # Stochastic drying of wet cells
+        drying = self._sample_cells(self.drying_probability)
+        drying = drying[moisture[drying] > 0]
+        moisture[drying] = 0
+        self.dried += len(drying)
+
+        # Crops grow one stage at a time while their cell stays wet
+        growing = self._sample_cells(self.growth_probability)
+        growing = growing[(crops[growing] > 0) & (crops[growing] < MATURE_STAGE) & (moisture[growing] > 0)]
+        crops[growing] += 1
+        self.grown += len(growing)
+
+        # A rain shower wets a square patch
+        shower = None
+        if self.rng.random() < self.rain_probability:
+            radius = self.rng.integers(self.rain_radius[0], self.rain_radius[1] + 1)
+            x, y = self.rng.integers(grid_w), self.rng.integers(grid_h)
+            cells['moisture_level'][max(y - radius, 0):y + radius + 1, max(x - radius, 0):x + radius + 1] = 1
+            self.showers += 1
+            shower = (int(x), int(y), int(radius))
+
+        if hasattr(self.grid, 'invalidate_tiles'):
+            # The field was written through grid.grid; drop only the cached tiles that changed
+            changed = set(self.grid.tiles_of(np.concatenate((drying, growing))))
+            if shower is not None:
+                changed.update(self.grid.tiles_around(*shower))
+            self.grid.invalidate_tiles(changed)
@@ -1,22 +1,32 @@
 import numpy as np
+import heapq
+import json
+import os
+from bisect import bisect_left
+from collections import OrderedDict
+
+CELL_DTYPE = np.dtype([('soil_type', 'i4'), ('moisture_level', 'i4'), ('crop_status', 'i4')])
+OBSTACLE = 2  # soil_type of cells agents cannot enter
 
 class Grid:
-    def __init__(self, size=(7, 15)):
+    def __init__(self, size=(7, 15), rng=None):
         self.size = size
-        self.grid = np.zeros((size[0], size[1]), dtype=[('soil_type', 'i4'), ('moisture_level', 'i4'), ('crop_status', 'i4')])
+        self.rng = np.random.default_rng(rng)  # A Generator, or a seed for one; None draws fresh OS entropy
+        self.grid = np.zeros((size[0], size[1]), dtype=CELL_DTYPE)
         self.boundaries = np.zeros((size[0], size[1]-1), dtype=bool)  # Boundary exists between columns
         self.initialize_grid()
 
     def initialize_grid(self):
         """Initialize the grid with random values and obstacles."""
         # self.grid['soil_type'] = np.random.choice([0, 1], size=self.size)  # 0 = poor, 1 = fertile
-        self.grid['moisture_level'] = np.random.choice([0, 1], size=self.size)  # 0 = dry, 1 = wet
-        self.grid['crop_status'] = np.random.choice([0, 1], size=self.size)  # 0 = empty, 1 = planted
+        self.grid['moisture_level'] = self.rng.integers(0, 2, size=self.size)  # 0 = dry, 1 = wet
+        self.grid['crop_status'] = self.rng.integers(0, 2, size=self.size)  # 0 = empty, 1 = planted
         
         for y in range(self.size[0]):  # Iterate through rows
             for x in range(1, self.size[1]):  # Exclude first column for boundaries
                 if y != 0 and y != self.size[0] - 1:  # Not the first or last row
                     self.boundaries[y, x - 1] = True  # Mark boundary between columns (excluding first and last rows)
+        self.invalidate_corridors()  # Boundaries were edited in place
     
 
     # def initialize_grid(self):
@@ -40,7 +50,258 @@ class Grid:
     #             if y != 0 and y != self.size[0] - 1:
     #                 self.boundaries[y, x - 1] = True
 
-    
+    @classmethod
+    def from_arrays(cls, cells, boundaries):
+        """A Grid holding copies of the given cell and boundary arrays, without random initialization."""
+        grid = cls.__new__(cls)
+        grid.size = tuple(cells.shape)
+        grid.rng = None
+        grid.grid = np.array(cells, dtype=CELL_DTYPE)
+        grid.boundaries = np.array(boundaries, dtype=bool)
+        return grid
+
+    @property
+    def boundaries(self):
+        return self._boundaries
+
+    @boundaries.setter
+    def boundaries(self, value):
+        self._boundaries = value
+        self.invalidate_corridors()
+
+    def invalidate_corridors(self):
+        """Drop the corridor graph, neighbor table and reachability; call after editing boundaries or obstacles in place."""
+        self._corridors = None
+        self._neighbor_table = None
+        self._passable = None
+        self._components = None
+        self._reachable = {}
+
+    def passable(self):
+        """(h, w) mask of the cells agents can enter: everything but obstacles (soil_type 2)."""
+        if self._passable is None:
+            self._passable = self.grid['soil_type'] != OBSTACLE
+        return self._passable
+
+    def is_obstacle(self, x, y):
+        return not self.passable()[y, x]
+
+    def neighbor_table(self):
+        """Flat cell indices (y * w + x) of each cell's left, right, up and down neighbors.
+
+        Shape (h * w, 4); missing neighbors, across a boundary, off the field or into an
+        obstacle, hold h * w. Obstacle cells have no neighbors.
+        """
+        if self._neighbor_table is None:
+            grid_h, grid_w = self.size
+            num_cells = grid_h * grid_w
+            index = np.arange(num_cells).reshape(grid_h, grid_w)
+            table = np.full((grid_h, grid_w, 4), num_cells, dtype=np.intp)
+            table[:, 1:, 0] = np.where(self.boundaries, num_cells, index[:, :-1])
+            table[:, :-1, 1] = np.where(self.boundaries, num_cells, index[:, 1:])
+            table[1:, :, 2] = index[:-1, :]
+            table[:-1, :, 3] = index[1:, :]
+            table = table.reshape(num_cells, 4)
+            blocked = np.append(~self.passable().reshape(-1), False)
+            table[blocked[table]] = num_cells
+            table[blocked[:num_cells]] = num_cells
+            self._neighbor_table = table
+        return self._neighbor_table
+
+    def components(self):
+        """Connected component of each cell over the neighbor table, flat; -1 on obstacles.
+
+        A component is labelled by its lowest flat index. Components are merged by hooking the
+        higher root of every edge onto the lower one, then compressing paths, which takes a few
+        vectorized rounds. Labels are kept until boundaries or obstacles change.
+        """
+        if self._components is None:
+            table = self.neighbor_table()
+            num_cells = len(table)
+            cells = np.repeat(np.arange(num_cells), 2)
+            neighbors = table[:, [1, 3]].reshape(-1)  # Right and down cover every edge once
+            edges = neighbors < num_cells
+            cells, neighbors = cells[edges], neighbors[edges]
+            labels = np.arange(num_cells)
+            while True:
+                a, b = labels[cells], labels[neighbors]
+                split = a != b
+                if not split.any():
+                    break
+                np.minimum.at(labels, np.maximum(a, b)[split], np.minimum(a, b)[split])
+                while True:
+                    roots = labels[labels]
+                    if np.array_equal(roots, labels):
+                        break
+                    labels = roots
+            labels[~self.passable().reshape(-1)] = -1
+            self._components = labels
+        return self._components
+
+    def reachable(self, cells):
+        """Flat mask of the cells in the same component as any of the given (x, y) cells.
+
+        Masks are cached per set of components; callers must not modify them.
+        """
+        components = self.components()
+        grid_w = self.size[1]
+        key = frozenset(int(components[y * grid_w + x]) for x, y in cells) - {-1}
+        mask = self._reachable.get(key)
+        if mask is None:
+            mask = self._reachable[key] = np.isin(components, list(key))
+        return mask
+
+    def reachable_count(self, cells):
+        """Number of cells in the same component as any of the given (x, y) cells."""
+        return int(self.reachable(cells).sum())
+
+    def corridors(self):
+        """Abstract graph of the field's corridors, built from boundaries and obstacles on first use.
+
+        Corridors are segments: runs of passable cells within a column, which always connect
+        vertically. Segments only connect sideways where a boundary is missing. The cells with
+        an open side are the entry points; each is a node, linked to the next entries up and
+        down its segment (the intra-corridor distance) and to the open neighbors beside it.
+        Without obstacles every column is one segment.
+        """
+        if self._corridors is None:
+            grid_h, grid_w = self.size
+            passable = self.passable()
+            open_right = np.zeros((grid_h, grid_w), dtype=bool)
+            open_right[:, :-1] = ~self.boundaries & passable[:, :-1] & passable[:, 1:]
+            open_left = np.zeros((grid_h, grid_w), dtype=bool)
+            open_left[:, 1:] = open_right[:, :-1]
+            entries = open_left | open_right
+
+            # Segment ids in column-major order, -1 on obstacles
+            starts = passable.copy()
+            starts[1:] &= ~passable[:-1]
+            segment_ids = np.cumsum(starts.T).reshape(grid_w, grid_h).T - 1
+            segment_ids[~passable] = -1
+            num_segments = int(starts.sum())
+
+            node_y, node_x = np.nonzero(entries.T)[::-1]  # Column-major, so each segment's entries are contiguous
+            node_ids = np.full((grid_h, grid_w), -1, dtype=np.intp)
+            node_ids[node_y, node_x] = np.arange(len(node_x))
+            node_segments = segment_ids[node_y, node_x]
+            segment_starts = np.searchsorted(node_segments, np.arange(num_segments + 1))
+
+            neighbors = [[] for _ in range(len(node_x))]
+            for node in range(len(node_x) - 1):
+                if node_segments[node + 1] == node_segments[node]:
+                    cost = int(node_y[node + 1] - node_y[node])
+                    neighbors[node].append((node + 1, cost))
+                    neighbors[node + 1].append((node, cost))
+            for y, x in zip(*np.nonzero(open_right)):
+                a, b = node_ids[y, x], node_ids[y, x + 1]
+                neighbors[a].append((b, 1))
+                neighbors[b].append((a, 1))
+
+            self._corridors = {
+                'node_x': node_x.tolist(),
+                'node_y': node_y.tolist(),
+                'node_ids': node_ids,
+                'segment_ids': segment_ids,
+                'segment_rows': [node_y[segment_starts[i]:segment_starts[i + 1]].tolist() for i in range(num_segments)],
+                'segment_starts': segment_starts.tolist(),
+                'neighbors': neighbors,
+            }
+        return self._corridors
+
+    def segment_id(self, x, y):
+        """Corridor segment (see corridors) holding the cell (x, y), -1 on an obstacle."""
+        return self.corridors()['segment_ids'][y, x]
+
+    def nearest_target(self, start, targets):
+        """Closest of the target (x, y) cells to start over the corridor graph.
+
+        Returns (target, distance, waypoints) or None if no target is reachable. Consecutive
+        waypoints share a segment or are side by side; refine_route() expands them into cells.
+        """
+        corridors = self.corridors()
+        node_x, node_y = corridors['node_x'], corridors['node_y']
+        neighbors = corridors['neighbors']
+        segment_ids = corridors['segment_ids']
+
+        target_rows = {}  # Segment -> sorted target rows
+        for x, y in targets:
+            if segment_ids[y, x] >= 0:
+                target_rows.setdefault(segment_ids[y, x], []).append(y)
+        for rows in target_rows.values():
+            rows.sort()
+
+        def closest_in_segment(x, y):
+            rows = target_rows.get(segment_ids[y, x])
+            if not rows:
+                return None
+            i = bisect_left(rows, y)
+            return min(rows[max(i - 1, 0):i + 1], key=lambda row: abs(row - y))
+
+        # A target in the start's own segment is reached straight along it
+        best = None  # (distance, target, node the route leaves the graph at)
+        sx, sy = start
+        row = closest_in_segment(sx, sy)
+        if row is not None:
+            best = (abs(row - sy), (sx, row), None)
+
+        # Enter the graph at the nearest entries above and below the start
+        segment = segment_ids[sy, sx]
+        rows = corridors['segment_rows'][segment] if segment >= 0 else []
+        first = corridors['segment_starts'][segment] if segment >= 0 else 0
+        i = bisect_left(rows, sy)
+        distances = {}
+        came_from = {}
+        frontier = []
+        for j in {max(i - 1, 0), min(i, len(rows) - 1)} if rows else ():
+            node = first + j
+            distances[node] = abs(rows[j] - sy)
+            came_from[node] = None
+            frontier.append((distances[node], node))
+        heapq.heapify(frontier)
+
+        while frontier:
+            distance, node = heapq.heappop(frontier)
+            if best is not None and distance >= best[0]:
+                break
+            if distance > distances[node]:
+                continue
+            row = closest_in_segment(node_x[node], node_y[node])
+            if row is not None and (best is None or distance + abs(row - node_y[node]) < best[0]):
+                best = (distance + abs(row - node_y[node]), (node_x[node], row), node)
+            for neighbor, cost in neighbors[node]:
+                if distance + cost < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = distance + cost
+                    came_from[neighbor] = node
+                    heapq.heappush(frontier, (distance + cost, neighbor))
+
+        if best is None:
+            return None
+        distance, target, node = best
+        waypoints = [target]
+        while node is not None:
+            waypoints.append((node_x[node], node_y[node]))
+            node = came_from[node]
+        waypoints.append(start)
+        return target, distance, waypoints[::-1]
+
+    def refine_route(self, waypoints):
+        """Lazily expand corridor waypoints into the cells walked, excluding the first waypoint."""
+        x, y = waypoints[0]
+        for next_x, next_y in waypoints[1:]:
+            while (x, y) != (next_x, next_y):
+                if y != next_y:
+                    y += 1 if next_y > y else -1
+                else:
+                    x += 1 if next_x > x else -1
+                yield x, y
+
+    def shortest_path(self, start, goal):
+        """Cells from start (exclusive) to goal over the corridor graph, or None if unreachable."""
+        route = self.nearest_target(start, [goal])
+        if route is None:
+            return None
+        return list(self.refine_route(route[2]))
+
     def is_boundary(self, x, y, direction):
         """Check if there's a boundary in the direction the agent wants to move."""
         if direction == 'right' and x < self.size[1] - 1:
@@ -72,3 +333,180 @@ class Grid:
             if agent != current_agent and agent.x == x and agent.y == y:
                 return True
         return False
+
+
+class TiledGrid(Grid):
+    """Grid whose field state lives in np.memmap files on disk, accessed through an LRU cache of tiles.
+
+    A field directory holds meta.json, cells.dat (the row-major structured cell array) and
+    boundaries.dat. Opening one maps the files without reading them, so it takes the same time
+    for any field size. get_cell_info and update_cell work on cached copies of fixed-size
+    tiles, written back to the memmap when evicted or when the whole field is read through
+    grid. Writes made directly through grid need invalidate_tiles() afterwards.
+
+    The field has no obstacles and its first and last rows are open, as create() writes it,
+    so it is one component and every column is one corridor segment. The reachability and
+    corridor queries below answer from that instead of building Grid's whole-field indexes,
+    which at 8 bytes per cell would not fit in memory for the fields this class is for.
+    """
+
+    def __init__(self, path, cache_tiles=64, mode='r+'):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.path = path
+        self.size = tuple(meta['size'])
+        self.tile_shape = tuple(meta['tile_shape'])
+        self.cache_tiles = cache_tiles  # Tiles held in memory at most
+        self.tiles = OrderedDict()  # (tile_row, tile_col) -> in-memory copy of the tile, least recent first
+        self.dirty = set()  # Cached tiles with writes not yet in the memmap
+        self.tile_loads = 0
+        # mode='c' keeps a run's writes in memory and leaves the files untouched
+        self._cells = np.memmap(os.path.join(path, 'cells.dat'), dtype=CELL_DTYPE, mode=mode, shape=self.size)
+        self.boundaries = np.memmap(os.path.join(path, 'boundaries.dat'), dtype=bool, mode=mode,
+                                    shape=(self.size[0], self.size[1] - 1))
+
+    @classmethod
+    def create(cls, path, size, tile_shape=(64, 64), cache_tiles=64, band_rows=1024, rng=None):
+        """Write a new randomly initialized field to path, band_rows rows at a time, and open it."""
+        rng = np.random.default_rng(rng)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'size': list(size), 'tile_shape': list(tile_shape)}, f)
+
+        grid_h, grid_w = size
+        cells = np.memmap(os.path.join(path, 'cells.dat'), dtype=CELL_DTYPE, mode='w+', shape=size)
+        boundaries = np.memmap(os.path.join(path, 'boundaries.dat'), dtype=bool, mode='w+', shape=(grid_h, grid_w - 1))
+        for top in range(0, grid_h, band_rows):
+            rows = min(band_rows, grid_h - top)
+            # Same layout as Grid.initialize_grid: random moisture and crops, walls except the first and last rows
+            band = cells[top:top + rows]
+            band['moisture_level'] = rng.integers(0, 2, size=(rows, grid_w))
+            band['crop_status'] = rng.integers(0, 2, size=(rows, grid_w))
+            row_numbers = np.arange(top, top + rows)
+            boundaries[top:top + rows] = ((row_numbers != 0) & (row_numbers != grid_h - 1))[:, None]
+        cells.flush()
+        boundaries.flush()
+        del cells, boundaries
+        return cls(path, cache_tiles)
+
+    @property
+    def grid(self):
+        """The whole field as a memmap, after writing back dirty tiles."""
+        self.flush()
+        return self._cells
+
+    def _tile(self, x, y):
+        """Cached tile holding (x, y) and the cell's row and column inside it."""
+        tile_h, tile_w = self.tile_shape
+        key = (y // tile_h, x // tile_w)
+        tile = self.tiles.get(key)
+        if tile is None:
+            top, left = key[0] * tile_h, key[1] * tile_w
+            tile = np.array(self._cells[top:top + tile_h, left:left + tile_w])
+            self.tile_loads += 1
+            self.tiles[key] = tile
+            while len(self.tiles) > self.cache_tiles:
+                self._write_back(*self.tiles.popitem(last=False))
+        else:
+            self.tiles.move_to_end(key)
+        return key, tile, y - key[0] * tile_h, x - key[1] * tile_w
+
+    def _write_back(self, key, tile):
+        if key in self.dirty:
+            top, left = key[0] * self.tile_shape[0], key[1] * self.tile_shape[1]
+            self._cells[top:top + tile.shape[0], left:left + tile.shape[1]] = tile
+            self.dirty.discard(key)
+
+    def tiles_around(self, x, y, radius=0):
+        """Keys of the tiles touched by the square of cells within radius of (x, y)."""
+        tile_h, tile_w = self.tile_shape
+        rows = range(max(y - radius, 0) // tile_h, min(y + radius, self.size[0] - 1) // tile_h + 1)
+        cols = range(max(x - radius, 0) // tile_w, min(x + radius, self.size[1] - 1) // tile_w + 1)
+        return [(row, col) for row in rows for col in cols]
+
+    def flush(self):
+        """Write dirty tiles back to the memmap."""
+        for key in list(self.dirty):
+            self._write_back(key, self.tiles[key])
+
+    def sync(self):
+        """Write dirty tiles back and flush the memmaps to disk."""
+        self.flush()
+        self._cells.flush()
+        self.boundaries.flush()
+
+    def tiles_of(self, index):
+        """Keys of the tiles holding the cells at an array of flat indices (y * w + x)."""
+        ys, xs = np.divmod(np.asarray(index), self.size[1])
+        keys = np.unique((ys // self.tile_shape[0]) * self.size[1] + xs // self.tile_shape[1])
+        return [(int(key // self.size[1]), int(key % self.size[1])) for key in keys]
+
+    def invalidate_tiles(self, keys=None):
+        """Drop cached tiles after the field was changed through grid; unflushed writes to them are lost.
+
+        keys, e.g. from tiles_of or tiles_around, limits this to the tiles that were changed.
+        """
+        if keys is None:
+            self.tiles.clear()
+            self.dirty.clear()
+            return
+        for key in keys:
+            self.tiles.pop(key, None)
+            self.dirty.discard(key)
+
+    def cells_at(self, index):
+        """Records of the cells at an array of flat indices (y * w + x), read through the tile cache."""
+        index = np.asarray(index)
+        tile_h, tile_w = self.tile_shape
+        ys, xs = np.divmod(index, self.size[1])
+        keys = (ys // tile_h) * self.size[1] + xs // tile_w
+        cells = np.empty(index.shape, dtype=CELL_DTYPE)
+        for key in np.unique(keys):
+            in_tile = keys == key
+            x, y = xs[in_tile], ys[in_tile]
+            _, tile, row, col = self._tile(int(x[0]), int(y[0]))
+            cells[in_tile] = tile[y - (y[0] - row), x - (x[0] - col)]
+        return cells
+
+    def passable(self):
+        """Every cell, as a read-only broadcast view that takes no memory."""
+        return np.broadcast_to(True, self.size)
+
+    def is_obstacle(self, x, y):
+        return False
+
+    def components(self):
+        return np.broadcast_to(0, (self.size[0] * self.size[1],))
+
+    def reachable(self, cells):
+        return np.broadcast_to(True, (self.size[0] * self.size[1],))
+
+    def reachable_count(self, cells):
+        return self.size[0] * self.size[1]
+
+    def segment_id(self, x, y):
+        return x
+
+    def shortest_path(self, start, goal):
+        """Cells from start (exclusive) to goal; straight along the segment when both are in one column."""
+        if start[0] != goal[0]:
+            return super().shortest_path(start, goal)  # Builds the whole corridor graph
+        step = 1 if goal[1] > start[1] else -1
+        return [(start[0], y) for y in range(start[1] + step, goal[1] + step, step)]
+
+    def get_cell_info(self, x, y):
+        """Return the state of a specific cell."""
+        if 0 <= x < self.size[1] and 0 <= y < self.size[0]:
+            _, tile, row, col = self._tile(x, y)
+            return tile[row, col]
+        else:
+            raise ValueError("Coordinates out of bounds")
+
+    def update_cell(self, x, y, new_values):
+        """Update the properties of a cell."""
+        if 0 <= x < self.size[1] and 0 <= y < self.size[0]:
+            key, tile, row, col = self._tile(x, y)
+            tile[row, col] = tuple(new_values)
+            self.dirty.add(key)
+        else:
+            raise ValueError("Coordinates out of bounds")
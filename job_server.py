@@ -0,0 +1,247 @@
+import argparse
+import itertools
+import json
+import socket
+import socketserver
+import threading
+import time
+import traceback
+import uuid
+import simulation
+
+
+def expand_sweep(spec):
+    """Expand a sweep spec into run configs, one per planner x agent count x seed.
+
+    spec keys: planners, agent_counts, seeds (a list, or a count), and optionally size, comms, runtime, metrics_port,
+    scenario, scenario_store, max_ticks, max_wall_time, stall_ticks, trails, faults and reservations, which are copied into every config. Agents spawn along the
+    top row like main.py.
+    """
+    seeds = spec['seeds'] if isinstance(spec['seeds'], list) else list(range(spec['seeds']))
+    configs = []
+    for planner, num_agents, seed in itertools.product(spec['planners'], spec['agent_counts'], seeds):
+        config = {key: spec[key] for key in ('size', 'max_ticks', 'reservations', 'comms', 'runtime', 'metrics_port', 'scenario', 'scenario_store', 'max_wall_time', 'stall_ticks', 'trails', 'faults') if key in spec}
+        config.update(planner=planner, agent_positions=[(i, 0) for i in range(num_agents)], seed=seed)
+        configs.append(config)
+    return configs
+
+
+def _send(stream, message):
+    stream.write((json.dumps(message, default=lambda value: value.item()) + '\n').encode())
+    stream.flush()
+
+
+class Coordinator:
+    """Serves run configs to workers over TCP as JSON lines and collects their results.
+
+    A job handed out is leased to its worker for lease_timeout seconds; workers extend the
+    lease with heartbeats while they run it. Expired leases and runs that raised are requeued,
+    so jobs held by dead workers run again elsewhere, until a job has been handed out
+    max_attempts times; it then gets a result with outcome 'error' (see failed_result) instead.
+    The first result for a job wins.
+    """
+
+    def __init__(self, configs, host='127.0.0.1', port=0, lease_timeout=60.0, max_attempts=3):
+        self.configs = list(configs)
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.pending = list(range(len(self.configs)))  # Job ids not yet leased, next first
+        self.leases = {}  # job id -> (worker id, lease expiry time)
+        self.attempts = {}  # job id -> times handed out
+        self.results = {}  # job id -> result dict
+        self.requeued = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        if not self.configs:
+            self.finished.set()
+
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    _send(self.wfile, coordinator.handle(json.loads(line)))
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.address = self.server.server_address
+
+    def failed_result(self, job_id, error, worker=None):
+        """Result recorded for a job that failed on every attempt, keyed like run_headless's."""
+        config = self.configs[job_id]
+        return {
+            'planner': config.get('planner', 'LP'),
+            'num_agents': len(config.get('agent_positions', ())),
+            'seed': config.get('seed', 42),
+            'completed': False,
+            'outcome': 'error',
+            'error': error,
+            'attempts': self.attempts.get(job_id, 0),
+            'worker': worker,
+        }
+
+    def _retry_or_fail(self, job_id, error, worker=None):
+        if self.attempts.get(job_id, 0) < self.max_attempts:
+            self.pending.append(job_id)
+            self.requeued += 1
+            return
+        self.results.setdefault(job_id, self.failed_result(job_id, error, worker))
+        self.failed += 1
+        print(f"[JOBS] Job {job_id} failed after {self.attempts[job_id]} attempts: {error.strip().splitlines()[-1]}")
+        if len(self.results) == len(self.configs):
+            self.finished.set()
+
+    def _requeue_expired(self, now):
+        for job_id, (worker, expiry) in list(self.leases.items()):
+            if expiry < now:
+                del self.leases[job_id]
+                self._retry_or_fail(job_id, f"Lease of worker {worker} expired", worker)
+
+    def handle(self, message):
+        """Answer one worker message."""
+        now = time.monotonic()
+        with self.lock:
+            self._requeue_expired(now)
+            op = message.get('op')
+            if op == 'get':
+                if self.pending:
+                    job_id = self.pending.pop(0)
+                    self.leases[job_id] = (message.get('worker'), now + self.lease_timeout)
+                    self.attempts[job_id] = self.attempts.get(job_id, 0) + 1
+                    return {'op': 'job', 'job_id': job_id, 'config': self.configs[job_id],
+                            'lease_timeout': self.lease_timeout}
+                if self.leases:
+                    return {'op': 'wait', 'retry_after': min(1.0, self.lease_timeout / 4)}
+                return {'op': 'done'}
+            if op == 'heartbeat':
+                lease = self.leases.get(message['job_id'])
+                if lease is None or lease[0] != message.get('worker'):
+                    return {'op': 'lost'}  # Requeued or finished meanwhile
+                self.leases[message['job_id']] = (lease[0], now + self.lease_timeout)
+                return {'op': 'ok'}
+            if op == 'result':
+                job_id = message['job_id']
+                if job_id in self.results:
+                    return {'op': 'ok'}
+                if 'error' in message:
+                    # The run raised; retry it elsewhere unless this worker's lease was already requeued
+                    lease = self.leases.get(job_id)
+                    if lease is not None and lease[0] == message.get('worker'):
+                        del self.leases[job_id]
+                        self._retry_or_fail(job_id, message['error'], message.get('worker'))
+                    return {'op': 'ok'}
+                self.leases.pop(job_id, None)
+                if job_id in self.pending:
+                    self.pending.remove(job_id)
+                self.results[job_id] = message['result']
+                if len(self.results) == len(self.configs):
+                    self.finished.set()
+                return {'op': 'ok'}
+            return {'op': 'error', 'error': f"unknown op {op!r}"}
+
+    def start(self):
+        """Serve in a background thread; returns self."""
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def wait(self, timeout=None):
+        """Block until every job has a result; returns results in config order, or None on timeout."""
+        if not self.finished.wait(timeout):
+            return None
+        return [self.results[job_id] for job_id in range(len(self.configs))]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _request(address, message):
+    """One-off request on a fresh connection, used for heartbeats."""
+    with socket.create_connection(address) as connection:
+        stream = connection.makefile('rwb')
+        _send(stream, message)
+        return json.loads(stream.readline())
+
+
+def run_worker(host='127.0.0.1', port=5555, worker_id=None, max_jobs=None):
+    """Pull jobs from a coordinator and run them headless until it reports done; returns jobs run."""
+    worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+    address = (host, port)
+    jobs_run = 0
+    with socket.create_connection(address) as connection:
+        stream = connection.makefile('rwb')
+        while max_jobs is None or jobs_run < max_jobs:
+            _send(stream, {'op': 'get', 'worker': worker_id})
+            reply = json.loads(stream.readline())
+            if reply['op'] == 'done':
+                break
+            if reply['op'] == 'wait':
+                time.sleep(reply['retry_after'])
+                continue
+
+            # Keep the lease alive from a side thread while the run is in progress
+            running = threading.Event()
+            running.set()
+
+            def heartbeat(job_id=reply['job_id'], interval=reply['lease_timeout'] / 3):
+                while running.is_set():
+                    time.sleep(interval)
+                    if running.is_set():
+                        try:
+                            _request(address, {'op': 'heartbeat', 'job_id': job_id, 'worker': worker_id})
+                        except OSError:
+                            return
+
+            threading.Thread(target=heartbeat, daemon=True).start()
+            try:
+                result = simulation.run_headless(reply['config'])
+            except Exception:
+                # Report the failure rather than die, so one bad config cannot take down every worker
+                error = traceback.format_exc()
+                print(f"[JOBS] Job {reply['job_id']} raised: {error.strip().splitlines()[-1]}")
+                _send(stream, {'op': 'result', 'job_id': reply['job_id'], 'worker': worker_id, 'error': error})
+                stream.readline()
+                jobs_run += 1
+                continue
+            finally:
+                running.clear()
+            result['worker'] = worker_id
+            _send(stream, {'op': 'result', 'job_id': reply['job_id'], 'worker': worker_id, 'result': result})
+            stream.readline()
+            jobs_run += 1
+    return jobs_run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distribute headless simulation sweeps over TCP.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help="serve the jobs of a sweep spec and write their results")
+    serve.add_argument('spec', help="JSON sweep spec, see expand_sweep")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=5555)
+    serve.add_argument('--lease-timeout', type=float, default=60.0)
+    serve.add_argument('--max-attempts', type=int, default=3, help="times a job is handed out before it is recorded as failed")
+    serve.add_argument('--out', default='sweep_results.json')
+    work = commands.add_parser('work', help="run jobs from a coordinator")
+    work.add_argument('--host', default='127.0.0.1')
+    work.add_argument('--port', type=int, default=5555)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        with open(args.spec) as f:
+            configs = expand_sweep(json.load(f))
+        coordinator = Coordinator(configs, args.host, args.port, args.lease_timeout, args.max_attempts).start()
+        print(f"[JOBS] Serving {len(configs)} jobs on {coordinator.address[0]}:{coordinator.address[1]}")
+        results = coordinator.wait()
+        coordinator.close()
+        with open(args.out, 'w') as f:
+            json.dump(results, f, default=lambda value: value.item())
+        print(f"[JOBS] Wrote {len(results)} results to {args.out} ({coordinator.requeued} requeued, {coordinator.failed} failed)")
+    else:
+        jobs_run = run_worker(args.host, args.port)
+        print(f"[JOBS] Worker finished after {jobs_run} jobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 from grid import Grid
 from agent import Agent
 from state_estimation import StateEstimator
-from behavior_planning import LocalPlanner, PreassignedPlanner, PreassignedSweepFromSpawnPlanner
-import visualization
+from reservation_table import ReservationTable
+from distance_maps import DistanceMapCache
+from coverage import CoverageMap
+from field_dynamics import FieldDynamics
+import metrics
+from stall_watchdog import Watchdog
+import sim_core
+from behavior_planning import LocalPlanner, PreassignedPlanner, PreassignedSweepFromSpawnPlanner, TaskAwarePlanner, MakespanColumnPlanner
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="tkinter")
 
@@ -10,9 +16,8 @@ import numpy as np
 import time
 
 def create_seeded_grid(size=(7, 15), seed=42):
-    """Create a grid with fixed seed for consistent randomized initialization."""
-    np.random.seed(seed)
-    grid = Grid(size=size)
+    """Create a grid from the run's own random stream, the same field simulation.build_run makes for seed."""
+    grid = Grid(size=size, rng=sim_core.run_streams(seed)['grid'])
     return grid
 
 def print_stats_main(run, agents):
@@ -31,8 +36,17 @@ def main():
     # Planner and experiment configuration:
     # - use_preassigned: selects strict static column assignment
     # - use_preassigned_block: selects sweeping strategy starting from spawn point
+    # - use_task_aware: visits only cells that need watering or planting
+    # - use_makespan: balanced column blocks that minimize the latest finish time
     use_preassigned = False
     use_preassigned_block = True 
+    use_task_aware = False
+    use_makespan = False
+    use_reservations = True  # Agents plan routes against a shared space-time reservation table
+    use_field_dynamics = False  # Cells dry out, rain falls and crops grow while agents work
+    metrics_port = None  # e.g. 9108 to publish live metrics at http://127.0.0.1:9108/metrics
+    max_ticks = None  # Tick budget per run; None runs until the mission completes
+    stall_ticks = 500  # End a run as stalled when it makes no progress for this many ticks; None disables it
     no_of_agents = 3
 
     # Predefined agent spawn locations for different agent counts
@@ -51,22 +65,32 @@ def main():
     elif no_of_agents == 4:
         agent_positions = agent_pos_4
 
+    import visualization  # Plotting is loaded only here, so importing main stays headless
+
     for run in range(runs):
-        base_grid = create_seeded_grid(size=(7, 15), seed=seed + run)
+        # Initialize the farm grid; each run depends only on its own seed
+        grid = create_seeded_grid(size=(7, 15), seed=seed + run)
+        streams = sim_core.run_streams(seed + run)
 
         start_time = time.time()
-        global_explored_cells = set()
 
+        sim_core.reset_clock()  # Agents stamp their spawn cell with the current tick
         Agent.used_colors.clear()
         agents = []
 
-        # Initialize the farm grid
-        grid = Grid(size=(7, 15))
-        grid.boundaries = base_grid.boundaries.copy()
+        global_explored_cells = CoverageMap(grid.size)
 
         # Select planning strategy
         state_estimator = StateEstimator(grid)
-        if use_preassigned:
+        reservation_table = ReservationTable(grid) if use_reservations else None
+        distance_maps = DistanceMapCache(grid)  # Shared by agents and planners for the whole run
+        if use_task_aware:
+            behavior_planner = TaskAwarePlanner()
+            reroute_threshold = 3
+        elif use_makespan:
+            behavior_planner = MakespanColumnPlanner()
+            reroute_threshold = 200
+        elif use_preassigned:
             behavior_planner = PreassignedPlanner()
             reroute_threshold = 200
         elif not use_preassigned and not use_preassigned_block:
@@ -77,12 +101,25 @@ def main():
             reroute_threshold = 200
 
         # Instantiate agents and assign shared memory
-        agents = [Agent(grid, global_explored_cells, reroute_threshold, pos, [], behavior_planner=behavior_planner) for pos in agent_positions]
+        agents = [Agent(grid, global_explored_cells, reroute_threshold, pos, [], behavior_planner=behavior_planner, state_estimator=state_estimator, reservation_table=reservation_table, distance_maps=distance_maps) for pos in agent_positions]
         for agent in agents:
             agent.agents = agents  # Share reference to all agents
 
         print(f"\n--- run {run+1} ---")
-        sim_time = visualization.display_grid(grid, agents, state_estimator, behavior_planner)
+        tick_hooks = [FieldDynamics(grid, seed=streams['dynamics'])] if use_field_dynamics else []
+        if metrics_port is not None:
+            metrics.serve(metrics_port)
+            metrics_hook = metrics.MetricsHook(run=run + 1, every=1)
+            metrics_hook.bind(grid, agents)
+            tick_hooks.append(metrics_hook)
+        watchdog = None
+        if stall_ticks is not None:
+            watchdog = Watchdog(stall_ticks=stall_ticks)
+            watchdog.bind(grid, agents)
+            tick_hooks.append(watchdog)
+        sim_time = visualization.display_grid(grid, agents, state_estimator, behavior_planner, tick_hooks=tick_hooks, max_ticks=max_ticks)
+        if watchdog is not None and watchdog.outcome is not None:
+            print(f"[SIM] Agents at stop: {[agent['position'] for agent in watchdog.diagnostics['agents']]}")
 
         end_time = time.time()
         run_time = end_time - start_time
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import sim_core
+
+# Metric name -> (type, help), in exposition order
+METRICS = {
+    'sim_ticks_total': ('counter', "Ticks simulated."),
+    'sim_ticks_per_second': ('gauge', "Ticks per wall-clock second since the previous snapshot."),
+    'sim_coverage_ratio': ('gauge', "Fraction of reachable cells explored."),
+    'sim_ticks_since_progress': ('gauge', "Ticks since coverage or the task count last changed."),
+    'sim_agents': ('gauge', "Agents by state."),
+    'sim_busy_ratio': ('gauge', "Fraction of working agents that are moving, planting or watering."),
+    'sim_agent_cells_travelled_total': ('counter', "Cells travelled per agent."),
+    'sim_agent_revisits_total': ('counter', "Revisited cells per agent."),
+    'sim_agent_reroutes_total': ('counter', "Detours and reroutes per agent."),
+}
+
+_runs = OrderedDict()  # Run label -> MetricsHook, most recently started last
+_max_runs = 32  # Finished runs stay visible until this many newer runs have started
+_server = None
+
+
+class MetricsHook:
+    """Tick hook that publishes a run's counters and gauges for the metrics endpoint.
+
+    Every `every` ticks it builds a new snapshot, a list of (name, labels, value) samples, and
+    swaps it in with a single assignment. The server thread only ever reads a complete
+    snapshot, so neither side takes a lock and the simulation never waits on a scrape.
+    Counting open tasks scans the whole field, so it only runs every `task_every` ticks and in
+    the final snapshot; the other samples cost O(agents).
+    """
+
+    def __init__(self, run='0', every=10, task_every=200):
+        self.run = str(run)
+        self.every = every
+        self.task_every = task_every
+        self.snapshot = []
+        self._last_wall = None
+        self._last_tick = 0
+        self._tasks = None
+        self._tasks_tick = None
+        self._progress = None
+        self._progress_tick = 0
+
+    def bind(self, grid, agents):
+        self.grid = grid
+        self.agents = agents
+        self.target_cells = max(sim_core.target_cell_count(grid, agents), 1)
+        _runs.pop(self.run, None)
+        _runs[self.run] = self
+        while len(_runs) > _max_runs:
+            _runs.popitem(last=False)
+
+    def __call__(self, tick):
+        if tick % self.every == 0:
+            self.publish(tick)
+
+    def publish(self, tick, final=False):
+        """Build and swap in a new snapshot; also called once more, with final set, when a run ends."""
+        now = time.perf_counter()
+        rate = (tick - self._last_tick) / (now - self._last_wall) if self._last_wall is not None and now > self._last_wall else 0.0
+        self._last_wall, self._last_tick = now, tick
+
+        explored = max((agent.global_explored_cells for agent in self.agents), key=len)
+        if final or self._tasks is None or tick - self._tasks_tick >= self.task_every:
+            cells = self.grid.grid
+            self._tasks = int((cells['moisture_level'] == 0).sum() + (cells['crop_status'] == 0).sum())
+            self._tasks_tick = tick
+        progress = (len(explored), self._tasks)
+        if progress != self._progress:
+            self._progress, self._progress_tick = progress, tick
+
+        frozen = sum(agent.is_frozen for agent in self.agents)
+        busy = sum(agent.busy and not agent.is_frozen for agent in self.agents)
+        idle = len(self.agents) - frozen - busy
+        run = {'run': self.run}
+        samples = [
+            ('sim_ticks_total', run, tick),
+            ('sim_ticks_per_second', run, rate),
+            ('sim_coverage_ratio', run, len(explored) / self.target_cells),
+            ('sim_ticks_since_progress', run, tick - self._progress_tick),
+            ('sim_agents', dict(run, state='busy'), busy),
+            ('sim_agents', dict(run, state='idle'), idle),
+            ('sim_agents', dict(run, state='frozen'), frozen),
+            ('sim_busy_ratio', run, busy / (busy + idle) if busy + idle else 0.0),
+        ]
+        for index, agent in enumerate(self.agents):
+            labels = dict(run, agent=str(index), color=agent.color)
+            samples.append(('sim_agent_cells_travelled_total', labels, agent.cells_travelled))
+            samples.append(('sim_agent_revisits_total', labels, agent.revisit_count))
+            samples.append(('sim_agent_reroutes_total', labels, agent.reroute_count))
+        self.snapshot = samples  # Atomic swap; readers see the old or the new list, never a mix
+
+
+def render():
+    """All registered runs' latest snapshots in the Prometheus text format."""
+    by_name = {name: [] for name in METRICS}
+    for hook in list(_runs.values()):
+        for name, labels, value in hook.snapshot:
+            by_name[name].append((labels, value))
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in by_name[name]:
+            label_text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are too frequent to log
+
+
+def serve(port=9108, host='127.0.0.1', attempts=64):
+    """Serve /metrics from a daemon thread, once per process; returns the port in use.
+
+    If port is taken, e.g. by another worker of the same sweep, the next ports are tried.
+    """
+    global _server
+    if _server is not None:
+        return _server.server_address[1]
+    for candidate in range(port, port + attempts):
+        try:
+            _server = ThreadingHTTPServer((host, candidate), _Handler)
+            break
+        except OSError:
+            continue
+    else:
+        raise OSError(f"No free port for metrics in {port}-{port + attempts - 1}")
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    print(f"[METRICS] Serving http://{host}:{_server.server_address[1]}/metrics")
+    return _server.server_address[1]
@@ -0,0 +1,312 @@
+import numpy as np
+from multiprocessing import Pipe, Process
+from grid import Grid
+from agent import Agent
+from coverage import CoverageMap
+from state_estimation import StateEstimator
+from reservation_table import ReservationTable
+from distance_maps import DistanceMapCache
+from behavior_planning import batched
+import simulation
+import sim_core
+
+COLORS = ["blue", "yellow", "purple", "orange", "pink", "cyan"]
+COLUMN_STATE = ('assigned_columns', 'assigned_columns_set', 'sweep_order', 'spawn_column', 'current_column',
+                'committed_column', 'helper_column', 'column_sweep_direction')  # Planner state holding column indices
+PLANNER_STATE = COLUMN_STATE + ('sweep_index', 'sweep_direction')
+
+
+def shift_planner_state(state, dx):
+    """Planner state with every column index moved by dx, e.g. between a strip's local and global columns."""
+    shifted = {}
+    for key, value in state.items():
+        if key not in COLUMN_STATE or value is None:
+            shifted[key] = value
+        elif isinstance(value, dict):
+            shifted[key] = {col + dx: item for col, item in value.items()}
+        elif isinstance(value, (list, set)):
+            shifted[key] = type(value)(col + dx for col in value)
+        else:
+            shifted[key] = value + dx
+    return shifted
+
+
+class GhostAgent:
+    """Stand-in for an agent of a neighboring strip standing in this strip's halo column.
+
+    Ghosts only occupy cells; planners assign no work to them (see WorldState.team).
+    """
+
+    is_ghost = True
+
+    def __init__(self, x, y, is_frozen):
+        self.x, self.y = x, y
+        self.is_frozen = is_frozen
+        self.busy = False
+        self.done = False
+        self.path_queue = []
+        self.waiting_on = None  # Never part of this strip's wait-for cycles
+        self.give_way_to = None
+        self.wait_until_frame = 0
+        self.color = "gray"
+
+    def is_idle(self):
+        return False
+
+
+class StripWorker:
+    """One vertical strip of the field with its own agents, stepped one tick at a time.
+
+    The local grid covers the owned columns plus a one-column halo on each side that has a
+    neighbor. Halo cells mirror the neighbor's edge column, and agents seen there are ghosts.
+    An owned agent that steps into a halo column is handed off to that neighbor, with its
+    planner state, so it keeps the columns it was assigned across the whole field. Agents may
+    briefly share a cell at a strip edge when both strips move into it on the same tick.
+    """
+
+    def __init__(self, cells, boundaries, offset, owned, planner, seed, targets):
+        self.offset = offset  # Global x of local column 0
+        self.owned = owned  # Global (first, last + 1) columns this strip owns
+        self.targets = targets  # Cells in the owned columns the agents can reach
+        self.grid = Grid(size=cells.shape, rng=seed)
+        self.grid.grid[:] = cells
+        self.grid.boundaries = boundaries
+        self.coverage = CoverageMap(self.grid.size)
+        planner_cls, self.reroute_threshold = simulation.PLANNERS[planner]
+        self.planner = planner_cls()
+        self.batched_planner = batched(self.planner)  # Agents ask it for their moves through the batched API
+        self.state_estimator = StateEstimator(self.grid)
+        self.reservation_table = ReservationTable(self.grid)
+        self.distance_maps = DistanceMapCache(self.grid)
+        self.agents = []
+
+    def _local(self, cells):
+        return [(x - self.offset, y) for x, y in cells]
+
+    def _global(self, cells):
+        return [(x + self.offset, y) for x, y in cells]
+
+    def adopt(self, state):
+        """Take over an agent from its exported state."""
+        x, y = state['position']
+        agent = Agent(self.grid, self.coverage, self.reroute_threshold, (x - self.offset, y), [],
+                      behavior_planner=self.planner, state_estimator=self.state_estimator,
+                      reservation_table=self.reservation_table, distance_maps=self.distance_maps)
+        Agent.used_colors.discard(agent.color)  # Colors are assigned once, globally
+        agent.agent_id, agent.color = state['agent_id'], state['color']
+        for key, value in shift_planner_state(state.get('planner_state', {}), -self.offset).items():
+            setattr(agent, key, value)
+        for key in ('committed_column', 'helper_column'):
+            if getattr(agent, key, None) is not None and not 0 <= getattr(agent, key) < self.grid.size[1]:
+                setattr(agent, key, None)  # A column left behind in the previous strip
+        if 'trail' in state:  # Handed off rather than just spawned
+            for key in ('cells_travelled', 'revisit_count', 'busy', 'wait_until_frame', 'done', 'is_frozen'):
+                setattr(agent, key, state[key])
+            agent.visited_cells = set(self._local(state['visited_cells']))
+            agent.agents_actual_visited_cells = self._local(state['trail'])
+            agent.visit_ticks = list(state['visit_ticks'])
+        self.agents.append(agent)
+
+    def export(self, agent):
+        """State of an agent leaving this strip, in global coordinates."""
+        self.reservation_table.release(agent)
+        state = {key: getattr(agent, key) for key in ('agent_id', 'color', 'cells_travelled', 'revisit_count', 'busy', 'wait_until_frame', 'done', 'is_frozen')}
+        state['planner_state'] = shift_planner_state({key: getattr(agent, key) for key in PLANNER_STATE if hasattr(agent, key)}, self.offset)
+        state['position'] = (agent.x + self.offset, agent.y)
+        state['visited_cells'] = self._global(agent.visited_cells)
+        state['trail'] = self._global(agent.agents_actual_visited_cells)
+        state['visit_ticks'] = list(agent.visit_ticks)
+        return state
+
+    def _column(self, x):
+        """Cells and coverage of global column x."""
+        local_x = x - self.offset
+        explored = np.array([(local_x, y) in self.coverage for y in range(self.grid.size[0])])
+        return self.grid.grid[:, local_x].copy(), explored
+
+    def step(self, tick, message):
+        """Apply the neighbors' halo data and immigrants, step owned agents one tick, and report."""
+        sim_core.viz_while_loop_counter = tick
+
+        for x, cells, explored in message['halo']:
+            local_x = x - self.offset
+            if not self.owned[0] <= x < self.owned[1]:
+                self.grid.grid[:, local_x] = cells  # The neighbor owns this column's cells
+            for y in np.flatnonzero(explored):
+                self.coverage.add((local_x, int(y)))
+        for state in message['immigrants']:
+            self.adopt(state)
+
+        ghosts = [GhostAgent(x - self.offset, y, frozen) for x, y, frozen in message['ghosts']]
+        everyone = self.agents + ghosts
+        for agent in self.agents:
+            agent.agents = everyone
+
+        perceptions = self.state_estimator.perceive_all(self.agents)
+        for agent, perception in zip(self.agents, perceptions):
+            agent.execute_action(agent.select_action(perception, self.batched_planner))
+
+        # Agents now in a halo column belong to the neighbor from the next tick on
+        emigrants = [agent for agent in self.agents if not self.owned[0] <= agent.x + self.offset < self.owned[1]]
+        self.agents = [agent for agent in self.agents if agent not in emigrants]
+
+        grid_w = self.grid.size[1]
+        edges = {}  # Neighbor side -> columns it needs: our edge column and its own edge column (our halo)
+        if self.offset < self.owned[0]:
+            edges['left'] = [self._column(self.owned[0]), self._column(self.owned[0] - 1)]
+        if self.offset + grid_w > self.owned[1]:
+            edges['right'] = [self._column(self.owned[1] - 1), self._column(self.owned[1])]
+        edge_columns = {self.owned[0], self.owned[1] - 1}
+
+        counts = self.coverage.column_counts()[self.owned[0] - self.offset:self.owned[1] - self.offset]
+        if hasattr(self.planner, 'mission_complete'):
+            complete = self.planner.mission_complete(self.grid)
+        else:
+            complete = counts.sum() >= self.targets
+        return {
+            'edges': {side: [(x, cells, explored) for x, (cells, explored) in zip(self._edge_xs(side), columns)]
+                      for side, columns in edges.items()},
+            'ghosts': [(agent.x + self.offset, agent.y, agent.is_frozen) for agent in self.agents
+                       if agent.x + self.offset in edge_columns],
+            'emigrants': [self.export(agent) for agent in emigrants],
+            'explored': int(counts.sum()),
+            'complete': bool(complete) and all(agent.done or agent.is_frozen for agent in self.agents),
+        }
+
+    def _edge_xs(self, side):
+        return (self.owned[0], self.owned[0] - 1) if side == 'left' else (self.owned[1] - 1, self.owned[1])
+
+    def finish(self):
+        """Owned cells and agent statistics at the end of the run."""
+        local = slice(self.owned[0] - self.offset, self.owned[1] - self.offset)
+        return {
+            'cells': self.grid.grid[:, local].copy(),
+            'agents': [{
+                'agent_id': agent.agent_id,
+                'color': agent.color,
+                'cells_travelled': agent.cells_travelled,
+                'revisit_count': agent.revisit_count,
+                'is_frozen': agent.is_frozen,
+            } for agent in self.agents],
+        }
+
+
+def _strip_process(connection, spec):
+    worker = StripWorker(*spec)
+    while True:
+        message = connection.recv()
+        if message is None:
+            connection.send(worker.finish())
+            return
+        connection.send(worker.step(*message))
+
+
+class _LocalConnection:
+    """Runs a StripWorker in this process behind the same send/recv interface as a Pipe."""
+
+    def __init__(self, spec):
+        self.worker = StripWorker(*spec)
+        self.reply = None
+
+    def send(self, message):
+        self.reply = self.worker.finish() if message is None else self.worker.step(*message)
+
+    def recv(self):
+        return self.reply
+
+
+def run_partitioned(config, num_strips=2, parallel=True):
+    """Run one mission with the field split into vertical strips, each stepped in its own process.
+
+    config is a simulation.run_headless config. Strips are cut between columns and run in
+    lockstep: every tick, each strip steps its own agents and the coordinator forwards edge
+    columns, ghosts and handed-off agents to the neighbors. parallel=False steps the strips
+    one after another in this process, with the same results.
+    """
+    planner = config.get('planner', 'LP')
+    seed = config.get('seed', 42)
+    grid = Grid(size=tuple(config.get('size', (7, 15))), rng=sim_core.run_streams(seed)['grid'])  # Same field as run_headless
+    grid_h, grid_w = grid.size
+    positions = config.get('agent_positions', ((0, 0), (1, 0), (2, 0)))
+    reachable = grid.reachable(positions).reshape(grid_h, grid_w)
+    max_ticks = config.get('max_ticks')
+
+    edges = np.linspace(0, grid_w, num_strips + 1).astype(int)
+    strips = [(int(first), int(last)) for first, last in zip(edges[:-1], edges[1:]) if last > first]
+    connections = []
+    processes = []
+    for index, (first, last) in enumerate(strips):
+        low, high = max(first - 1, 0), min(last + 1, grid_w)
+        spec = (grid.grid[:, low:high].copy(), grid.boundaries[:, low:high - 1].copy(), low, (first, last), planner, seed + index,
+                int(reachable[:, first:last].sum()))
+        if parallel:
+            parent, child = Pipe()
+            process = Process(target=_strip_process, args=(child, spec), daemon=True)
+            process.start()
+            connections.append(parent)
+            processes.append(process)
+        else:
+            connections.append(_LocalConnection(spec))
+
+    def strip_of(x):
+        return int(np.searchsorted(edges, x, side='right')) - 1
+
+    # Planners that split the columns among all agents do so here, over the whole field
+    planner_cls = simulation.PLANNERS[planner][0]
+    planner_states = planner_cls.assignments(grid, positions) if hasattr(planner_cls, 'assignments') else [{}] * len(positions)
+    inbox = [{'halo': [], 'immigrants': [], 'ghosts': []} for _ in strips]
+    for agent_id, ((x, y), planner_state) in enumerate(zip(positions, planner_states)):
+        inbox[strip_of(x)]['immigrants'].append({'agent_id': agent_id, 'color': COLORS[agent_id % len(COLORS)],
+                                                 'position': (x, y), 'planner_state': planner_state})
+
+    tick = 0
+    completed = False
+    explored = 0
+    try:
+        while max_ticks is None or tick < max_ticks:
+            for connection, message in zip(connections, inbox):
+                connection.send((tick, message))
+            reports = [connection.recv() for connection in connections]
+            tick += 1
+
+            inbox = [{'halo': [], 'immigrants': [], 'ghosts': []} for _ in strips]
+            for index, report in enumerate(reports):
+                for side, neighbor in (('left', index - 1), ('right', index + 1)):
+                    if side in report['edges']:
+                        inbox[neighbor]['halo'].extend(report['edges'][side])
+                for x, y, frozen in report['ghosts']:
+                    for neighbor in (index - 1, index + 1):
+                        if 0 <= neighbor < len(strips) and strips[neighbor][0] - 1 <= x <= strips[neighbor][1]:
+                            inbox[neighbor]['ghosts'].append((x, y, frozen))
+                for state in report['emigrants']:
+                    inbox[strip_of(state['position'][0])]['immigrants'].append(state)
+
+            explored = sum(report['explored'] for report in reports)
+            in_transit = any(message['immigrants'] for message in inbox)
+            if all(report['complete'] for report in reports) and not in_transit:
+                completed = True
+                break
+
+        for connection in connections:
+            connection.send(None)
+        finals = [connection.recv() for connection in connections]
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+
+    agents = [agent for final in finals for agent in final['agents']]
+    agents += [{key: state[key] for key in ('agent_id', 'color', 'cells_travelled', 'revisit_count', 'is_frozen')}
+               for message in inbox for state in message['immigrants'] if 'trail' in state]  # Still being handed off
+    agents.sort(key=lambda agent: agent['agent_id'])
+    return {
+        'planner': planner,
+        'num_agents': len(positions),
+        'seed': seed,
+        'strips': len(strips),
+        'completed': completed,
+        'ticks': tick,
+        'sim_time': tick * sim_core.time_step,
+        'coverage': explored / int(reachable.sum()),
+        'cells': np.concatenate([final['cells'] for final in finals], axis=1),
+        'agents': agents,
+    }
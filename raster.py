@@ -0,0 +1,233 @@
+import shutil
+import subprocess
+import numpy as np
+from PIL import Image
+from grid import OBSTACLE
+
+# Cell fills, as visualization.update_grid colors them: dry, empty, planted, obstacle
+DRY, EMPTY, PLANTED, BLOCKED = range(4)
+CELL_COLORS = np.array([(210, 105, 30), (211, 211, 211), (50, 205, 50), (74, 74, 74)], dtype=np.uint8)
+GRIDLINE_COLOR = (0, 0, 0)
+BOUNDARY_COLOR = (74, 74, 74)
+# Agent.assign_color names, as matplotlib draws them
+AGENT_COLORS = {
+    'blue': (0, 0, 255), 'yellow': (255, 255, 0), 'purple': (128, 0, 128), 'orange': (255, 165, 0),
+    'pink': (255, 192, 203), 'cyan': (0, 255, 255), 'white': (255, 255, 255),
+}
+SUPERSAMPLE = 4  # Sprite samples per pixel along each axis, for anti-aliased edges
+
+
+def _rounded_box(u, v, half_u, top, bottom, radius):
+    """Mask of a rectangle with rounded corners in sprite coordinates."""
+    du = np.maximum(np.abs(u) - (half_u - radius), 0)
+    center_v = (top + bottom) / 2
+    dv = np.maximum(np.abs(v - center_v) - ((bottom - top) / 2 - radius), 0)
+    return du ** 2 + dv ** 2 <= radius ** 2
+
+
+def _ellipse(u, v, center, axes, angle):
+    cos, sin = np.cos(angle), np.sin(angle)
+    du, dv = u - center[0], v - center[1]
+    return ((du * cos + dv * sin) / axes[0]) ** 2 + ((dv * cos - du * sin) / axes[1]) ** 2 <= 1
+
+
+def _rasterize(cell_px, scale, layers):
+    """An RGBA sprite (float, straight alpha) of cell_px pixels from (mask function, rgb, alpha) layers.
+
+    Masks are functions of sprite coordinates u, v in [-1, 1] across the cell, v pointing down,
+    evaluated on a supersampled grid and shrunk by scale about the cell centre. Layers are
+    painted in order and averaged down to pixels with premultiplied alpha.
+    """
+    samples = cell_px * SUPERSAMPLE
+    axis = ((np.arange(samples) + 0.5) / samples * 2 - 1) / scale
+    v, u = np.meshgrid(axis, axis, indexing='ij')
+    canvas = np.zeros((samples, samples, 4))
+    for mask_function, rgb, alpha in layers:
+        canvas[mask_function(u, v)] = (*(np.array(rgb) / 255 * alpha), alpha)  # Premultiplied
+    canvas = canvas.reshape(cell_px, SUPERSAMPLE, cell_px, SUPERSAMPLE, 4).mean(axis=(1, 3))
+    alpha = canvas[..., 3:]
+    return np.concatenate([np.divide(canvas[..., :3], alpha, out=np.zeros_like(canvas[..., :3]), where=alpha > 0) * 255,
+                           alpha], axis=-1)
+
+
+def robot_sprite(cell_px):
+    """A robot head, drawn in place of the 🤖 emoji."""
+    return _rasterize(cell_px, 0.6, [
+        (lambda u, v: (np.abs(u) < 0.06) & (v > -0.75) & (v < -0.4), (90, 96, 108), 1.0),
+        (lambda u, v: u ** 2 + (v + 0.78) ** 2 <= 0.12 ** 2, (230, 80, 80), 1.0),
+        (lambda u, v: (np.abs(u) > 0.6) & (np.abs(u) < 0.78) & (np.abs(v - 0.05) < 0.2), (120, 126, 138), 1.0),
+        (lambda u, v: _rounded_box(u, v, 0.66, -0.5, 0.6, 0.22), (60, 64, 72), 1.0),
+        (lambda u, v: _rounded_box(u, v, 0.58, -0.42, 0.52, 0.16), (225, 229, 235), 1.0),
+        (lambda u, v: (np.abs(u) - 0.27) ** 2 + (v + 0.02) ** 2 <= 0.14 ** 2, (40, 44, 52), 1.0),
+        (lambda u, v: (np.abs(u) - 0.27) ** 2 + (v + 0.02) ** 2 <= 0.07 ** 2, (60, 200, 230), 1.0),
+        (lambda u, v: (np.abs(u) < 0.3) & (np.abs(v - 0.3) < 0.06), (40, 44, 52), 1.0),
+    ])
+
+
+def plant_sprite(cell_px):
+    """A seedling, drawn in place of the 🌱 emoji."""
+    return _rasterize(cell_px, 0.6, [
+        (lambda u, v: (np.abs(u + 0.04 * v) < 0.07) & (v > -0.25) & (v < 0.85), (63, 114, 28), 1.0),
+        (lambda u, v: _ellipse(u, v, (-0.38, -0.3), (0.42, 0.2), np.pi / 6), (119, 178, 85), 1.0),
+        (lambda u, v: _ellipse(u, v, (0.36, -0.5), (0.46, 0.22), -np.pi / 5), (92, 145, 59), 1.0),
+    ])
+
+
+def disc_sprite(cell_px, rgb, alpha=0.6):
+    """The translucent agent-colored circle of radius 0.4 cells under each robot."""
+    return _rasterize(cell_px, 1.0, [(lambda u, v: u ** 2 + v ** 2 <= 0.8 ** 2, rgb, alpha)])
+
+
+def trail_sprite(cell_px, rgb, alpha=0.8):
+    """The small square marking each cell an agent has travelled through."""
+    return _rasterize(cell_px, 1.0, [(lambda u, v: (np.abs(u) < 0.16) & (np.abs(v) < 0.16), rgb, alpha)])
+
+
+def _blend(tiles, sprite):
+    """Alpha-blend an RGBA sprite over uint8 tiles of shape (..., cell_px, cell_px, 3)."""
+    alpha = sprite[..., 3:]
+    return (tiles * (1 - alpha) + sprite[..., :3] * alpha + 0.5).astype(np.uint8)
+
+
+class RasterRenderer:
+    """Renders the field and agents as NumPy RGB frames, without matplotlib or fonts.
+
+    Each cell is cell_px pixels square. Plants, agents and trails are sprites rasterized
+    once here. A cell's tile is a lookup on the cell-state arrays into tiles of each fill,
+    with and without the plant already blended in; trails and agents are blended into the
+    few cells that need them, within the sprite's bounding box. Gridlines and column walls
+    are fixed pixel masks, rebuilt only when the boundaries change. Layers, bottom to top:
+    fills, plants, trails, gridlines, walls, agents. Rows of the field run top to bottom, as
+    visualization.display_grid shows them.
+    """
+
+    def __init__(self, cell_px=32):
+        self.cell_px = cell_px
+        self.plant = plant_sprite(cell_px)
+        self.robot = robot_sprite(cell_px)
+        # Tile of fill kind k at index k, and with the plant over it at k + len(CELL_COLORS)
+        fills = np.broadcast_to(CELL_COLORS[:, None, None, :], (len(CELL_COLORS), cell_px, cell_px, 3))
+        self.cell_tiles = np.concatenate([fills, _blend(fills, self.plant)])
+        self.agent_sprites = {}  # Color -> disc sprite, trail sprite cropped to its box, and the box
+        self._lines_key = None
+
+    def _agent_sprites(self, color):
+        if color not in self.agent_sprites:
+            rgb = AGENT_COLORS.get(color, (255, 255, 255))
+            trail = trail_sprite(self.cell_px, rgb)
+            rows, cols = np.nonzero(trail[..., 3])
+            box = (slice(rows.min(), rows.max() + 1), slice(cols.min(), cols.max() + 1))
+            self.agent_sprites[color] = (disc_sprite(self.cell_px, rgb), trail[box], box)
+        return self.agent_sprites[color]
+
+    def _lines(self, boundaries, size):
+        """Flat pixel indices of the dashed gridlines and of the column walls."""
+        key = (size, boundaries.tobytes())
+        if key != self._lines_key:
+            grid_h, grid_w = size
+            c = self.cell_px
+            height, width = grid_h * c, grid_w * c
+            rows, cols = np.mgrid[0:height, 0:width]
+            on_line = (rows % c == 0) | (cols % c == 0) | (rows == height - 1) | (cols == width - 1)
+            dashes = ((rows + cols) // 4) % 2 == 0
+            gridlines = np.flatnonzero(on_line & dashes)
+
+            # Walls between column x and x + 1, first and last rows excepted, as update_grid draws them
+            walls = np.zeros((grid_h, grid_w - 1), dtype=bool)
+            walls[1:grid_h - 1] = boundaries[1:grid_h - 1]
+            thickness = max(2, c // 10)
+            wall_mask = np.zeros((height, width), dtype=bool)
+            offsets = np.arange(thickness) - thickness // 2
+            for y, x in zip(*np.nonzero(walls)):
+                pixel_cols = np.clip((x + 1) * c + offsets, 0, width - 1)
+                wall_mask[y * c:(y + 1) * c, pixel_cols] = True
+            self._lines_key = key
+            self._gridlines, self._walls = gridlines, np.flatnonzero(wall_mask)
+        return self._gridlines, self._walls
+
+    def render(self, grid, agents=()):
+        """The current frame as a uint8 array of shape (h * cell_px, w * cell_px, 3)."""
+        cells = grid.grid
+        grid_h, grid_w = grid.size
+        c = self.cell_px
+        obstacle = cells['soil_type'] == OBSTACLE
+        dry = cells['moisture_level'] == 0
+        planted = cells['crop_status'] >= 1
+        kind = np.where(obstacle, BLOCKED, np.where(dry, DRY, np.where(planted, PLANTED, EMPTY)))
+
+        # Tiles of shape (h, w, c, c, 3): one cell_px square per cell
+        tiles = self.cell_tiles[kind + len(CELL_COLORS) * (planted & ~obstacle)]
+        for agent in agents:
+            if agent.agents_actual_visited_cells:
+                _, sprite, (rows, cols) = self._agent_sprites(agent.color)
+                trail = np.unique(np.array(agent.agents_actual_visited_cells), axis=0)
+                ys, xs = trail[:, 1], trail[:, 0]
+                tiles[ys, xs, rows, cols] = _blend(tiles[ys, xs, rows, cols], sprite)
+
+        frame = tiles.transpose(0, 2, 1, 3, 4).reshape(grid_h * c, grid_w * c, 3)
+        gridlines, walls = self._lines(grid.boundaries, (grid_h, grid_w))
+        flat = frame.reshape(-1, 3)
+        flat[gridlines] = GRIDLINE_COLOR
+        flat[walls] = BOUNDARY_COLOR
+
+        for agent in agents:
+            rows, cols = slice(agent.y * c, (agent.y + 1) * c), slice(agent.x * c, (agent.x + 1) * c)
+            disc = self._agent_sprites(agent.color)[0]
+            frame[rows, cols] = _blend(_blend(frame[rows, cols], disc), self.robot)
+        return frame
+
+
+class FrameRecorder:
+    """Tick hook that renders a frame every `every` ticks and encodes them when closed.
+
+    A .gif path is written with PIL; frames are palette-quantized as they arrive, so a long
+    run holds one byte per pixel. Any other extension (.mp4, .webm, ...) streams raw frames
+    to an ffmpeg process, which must be on the PATH. Frames can also be added directly.
+    """
+
+    def __init__(self, path, every=1, cell_px=32, duration=100):
+        self.path = path
+        self.every = every
+        self.duration = duration  # Milliseconds per frame
+        self.renderer = RasterRenderer(cell_px)
+        self.frames = []
+        self.encoder = None
+        self.grid = None
+        self.agents = ()
+        if not path.endswith('.gif') and shutil.which('ffmpeg') is None:
+            raise RuntimeError(f"Recording {path} needs ffmpeg on the PATH; record a .gif instead")
+
+    def bind(self, grid, agents):
+        self.grid = grid
+        self.agents = agents
+
+    def __call__(self, tick):
+        if tick % self.every == 0:
+            self.add(self.renderer.render(self.grid, self.agents))
+
+    def add(self, frame):
+        if self.path.endswith('.gif'):
+            self.frames.append(Image.fromarray(frame).quantize(colors=255, method=Image.Quantize.FASTOCTREE,
+                                                              dither=Image.Dither.NONE))
+            return
+        if self.encoder is None:
+            height, width = frame.shape[:2]
+            self.encoder = subprocess.Popen(
+                ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{width}x{height}",
+                 '-r', str(1000 / self.duration), '-i', '-', '-pix_fmt', 'yuv420p',
+                 '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', self.path], stdin=subprocess.PIPE)
+        self.encoder.stdin.write(np.ascontiguousarray(frame).tobytes())
+
+    def close(self):
+        """Add a final frame of the bound run, if any, and write the file; returns its path or None."""
+        if self.grid is not None:
+            self.add(self.renderer.render(self.grid, self.agents))
+        if self.encoder is not None:
+            self.encoder.stdin.close()
+            self.encoder.wait()
+        elif self.frames:
+            self.frames[0].save(self.path, save_all=True, append_images=self.frames[1:], duration=self.duration, loop=0)
+        else:
+            return None
+        print(f"[VIDEO] Saved simulation to {self.path}")
+        return self.path
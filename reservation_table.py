@@ -0,0 +1,186 @@
+import heapq
+import sim_core
+
+MOVES = {'left': (-1, 0), 'right': (1, 0), 'up': (0, -1), 'down': (0, 1)}
+
+
+class ReservationTable:
+    """Shared space-time reservations of cells by agents, for cooperative A* routing.
+
+    A reservation (cell, tick) -> agent means the agent stands on the cell during that tick.
+    Agents plan against the table with plan() and write their route back with reserve_path(),
+    so later routes avoid earlier ones ahead of time instead of meeting them in a corridor.
+    """
+
+    def __init__(self, grid, hold_ticks=2, max_expansions=None):
+        self.grid = grid
+        self.hold_ticks = hold_ticks  # Ticks the last cell of a route stays reserved after the agent is free
+        self.max_expansions = max_expansions  # Search budget per plan(), None for 20 states per cell
+        self.slots = {}  # tick -> {(x, y): agent}
+        self.by_agent = {}  # agent -> [(tick, (x, y))]
+        self.last_tick = -1  # Latest reserved tick; beyond it the table is empty
+        self._pruned_to = 0
+
+    def owner(self, cell, tick):
+        slot = self.slots.get(tick)
+        return slot.get(cell) if slot else None
+
+    def owner_during(self, cell, first_tick, last_tick, agent):
+        """First agent other than agent holding cell between first_tick and last_tick, or None."""
+        for tick in range(first_tick, last_tick + 1):
+            owner = self.owner(cell, tick)
+            if owner is not None and owner is not agent:
+                return owner
+        return None
+
+    def reserve(self, agent, cell, first_tick, last_tick):
+        """Reserve cell for agent over a tick range, leaving slots another agent already holds."""
+        entries = self.by_agent.setdefault(agent, [])
+        for tick in range(first_tick, last_tick + 1):
+            slot = self.slots.setdefault(tick, {})
+            if slot.setdefault(cell, agent) is agent:
+                entries.append((tick, cell))
+        self.last_tick = max(self.last_tick, last_tick)
+
+    def release(self, agent):
+        """Drop all of agent's reservations."""
+        for tick, cell in self.by_agent.pop(agent, ()):
+            slot = self.slots.get(tick)
+            if slot is not None and slot.get(cell) is agent:
+                del slot[cell]
+                if not slot:
+                    del self.slots[tick]
+
+    def shift(self, agent, delta):
+        """Move agent's reservations delta ticks later (or earlier), when it runs off its schedule."""
+        entries = self.by_agent.get(agent)
+        if not entries or delta == 0:
+            return
+        self.release(agent)
+        for tick, cell in entries:
+            self.reserve(agent, cell, tick + delta, tick + delta)
+
+    def prune(self, now):
+        """Forget reservations for ticks that have passed; runs at most once per tick."""
+        if now <= self._pruned_to:
+            return
+        self._pruned_to = now
+        for tick in [tick for tick in self.slots if tick < now]:
+            del self.slots[tick]
+        for agent in list(self.by_agent):
+            entries = [entry for entry in self.by_agent[agent] if entry[0] >= now]
+            if entries:
+                self.by_agent[agent] = entries
+            else:
+                del self.by_agent[agent]
+        self.last_tick = max(self.slots, default=-1)
+
+    def work_ticks(self, cell):
+        """Ticks an agent will spend farming on cell when it steps onto it."""
+        x, y = cell
+        cell = self.grid.get_cell_info(x, y)
+        moisture, crop = cell['moisture_level'], cell['crop_status']
+        ticks = 0
+        if crop == 0:
+            ticks += sim_core.PLANTING_FRAMES
+        if moisture == 0:
+            ticks += sim_core.WATERING_FRAMES
+        return ticks
+
+    def agent_blocks(self, agent, now):
+        """Last tick each other agent's cell is blocked, for agents not covered by reservations.
+
+        Frozen and idle agents block their cell indefinitely, busy agents until they finish
+        farming, and moving agents without a route for the next tick only.
+        """
+        blocks = {}
+        for other in agent.agents:
+            if other is agent:
+                continue
+            cell = (other.x, other.y)
+            if other.is_frozen:
+                blocks[cell] = float('inf')
+            elif self.owner(cell, now) is other:
+                continue
+            elif other.is_idle():
+                blocks[cell] = float('inf')
+            elif other.busy and other.wait_until_frame > now:
+                blocks[cell] = other.wait_until_frame
+            else:
+                blocks[cell] = now + 1
+        return blocks
+
+    def plan(self, agent, start, start_tick, is_goal, heuristic=None):
+        """Space-time A* from start, first moving at start_tick, to the nearest cell passing is_goal.
+
+        Returns [(cell, tick), ...], the cell occupied after each step and the tick the step is
+        taken, with waits as repeated cells; [] if start is already a goal, None if unreachable.
+        """
+        grid_h, grid_w = self.grid.size
+        now = sim_core.viz_while_loop_counter
+        self.prune(now)
+        if is_goal(start):
+            return []
+        heuristic = heuristic or (lambda cell: 0)
+        blocks = self.agent_blocks(agent, now)
+        finite_blocks = [tick for tick in blocks.values() if tick != float('inf')]
+        horizon = max([self.last_tick, start_tick] + finite_blocks) + 1  # Time stops mattering past here
+        budget = self.max_expansions or 20 * grid_h * grid_w
+
+        def free(cell, first_tick, last_tick):
+            if blocks.get(cell, -1) >= first_tick:
+                return False
+            return first_tick > self.last_tick or self.owner_during(cell, first_tick, last_tick, agent) is None
+
+        start_key = (start, min(start_tick, horizon))
+        came_from = {start_key: None}
+        frontier = [(start_tick + heuristic(start), start_tick, 0, start)]
+        counter = 0
+        while frontier and budget > 0:
+            _, tick, _, cell = heapq.heappop(frontier)
+            key = (cell, min(tick, horizon))
+            if key != start_key and is_goal(cell):
+                steps = []
+                while came_from[key] is not None:
+                    previous, step_tick = came_from[key]
+                    steps.append((key[0], step_tick))
+                    key = previous
+                return steps[::-1]
+            budget -= 1
+
+            x, y = cell
+            successors = []
+            if tick < horizon and free(cell, tick, tick):
+                successors.append((cell, tick + 1))  # Wait in place
+            for direction, (dx, dy) in MOVES.items():
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < grid_w and 0 <= ny < grid_h) or self.grid.is_boundary(x, y, direction) or self.grid.is_obstacle(nx, ny):
+                    continue
+                work = self.work_ticks((nx, ny))
+                if not free((nx, ny), tick, tick + work):
+                    continue
+                swapping = self.owner((nx, ny), tick - 1)
+                if swapping is not None and swapping is not agent and swapping is self.owner(cell, tick):
+                    continue  # Would swap cells with another agent
+                successors.append(((nx, ny), tick + 1 + work))
+
+            for successor, next_tick in successors:
+                successor_key = (successor, min(next_tick, horizon))
+                if successor_key in came_from:
+                    continue
+                came_from[successor_key] = (key, tick)
+                counter += 1
+                heapq.heappush(frontier, (next_tick + heuristic(successor), next_tick, counter, successor))
+        return None
+
+    def reserve_path(self, agent, start, steps):
+        """Replace agent's reservations with its current cell and the route from plan()."""
+        now = sim_core.viz_while_loop_counter
+        self.release(agent)
+        cell = start
+        for next_cell, tick in steps:
+            self.reserve(agent, cell, now, tick - 1)
+            cell = next_cell
+            now = tick
+        last_free = steps[-1][1] + self.work_ticks(cell) if steps else now
+        self.reserve(agent, cell, now, last_free + self.hold_ticks)
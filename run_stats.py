@@ -0,0 +1,469 @@
+import argparse
+import itertools
+import json
+import math
+import re
+from statistics import NormalDist
+import matplotlib.pyplot as plt
+import numpy as np
+
+# Per-run metrics kept for every group: name -> (label, function of a run record)
+METRICS = {
+    'sim_time': ('Simulation Time (units)', lambda record: record['sim_time']),
+    'travel': ('Total Cells Travelled', lambda record: sum(agent['cells_travelled'] for agent in record['agents'])),
+    'revisits': ('Total Revisits', lambda record: sum(agent['revisit_count'] for agent in record['agents'])),
+}
+# Per-agent series, for the multi-agent plots: metric -> agent record field
+AGENT_FIELDS = {'travel': 'cells_travelled', 'revisits': 'revisit_count'}
+
+# Same look as the paper figures in IMECEanalysis.py
+PLOT_STYLE = {
+    'font.size': 13,
+    'axes.labelweight': 'bold',
+    'axes.titlesize': 14,
+    'axes.titleweight': 'bold',
+    'lines.linewidth': 2,
+    'legend.fontsize': 13,
+}
+agent_colors = {1: 'b', 2: 'y', 3: 'm'}
+
+
+class RunningStats:
+    """Count, mean, variance, min and max of a stream, updated a batch at a time.
+
+    Each batch's moments come from numpy and are merged into the running ones with the
+    pairwise form of Welford's update, which stays accurate however long the stream.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values):
+            mean = float(values.mean())
+            self._merge(len(values), mean, float(((values - mean) ** 2).sum()), values.min(), values.max())
+
+    def merge(self, other):
+        if other.count:
+            self._merge(other.count, other.mean, other.m2, other.min, other.max)
+
+    def _merge(self, count, mean, m2, low, high):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, float(low))
+        self.max = max(self.max, float(high))
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def interval(self, confidence=0.95):
+        """Normal-approximation confidence interval of the mean."""
+        half = NormalDist().inv_cdf(0.5 + confidence / 2) * self.std / math.sqrt(max(self.count, 1))
+        return self.mean - half, self.mean + half
+
+
+class QuantileSketch:
+    """Quantiles of a stream to within relative_accuracy, in logarithmic buckets.
+
+    A value x > 0 is counted in bucket ceil(log(x) / log(gamma)), gamma = (1 + a) / (1 - a),
+    whose midpoint is within a of every value in it; negative values use a mirrored store and
+    values within min_value of zero are counted apart. When the buckets exceed max_buckets the
+    smallest magnitudes are folded together, so memory stays bounded and upper quantiles exact
+    to the stated accuracy.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048, min_value=1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self.positive = {}  # Bucket index -> count
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+
+    def _add(self, store, magnitudes):
+        keys, counts = np.unique(np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64), return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+        if len(store) > self.max_buckets:
+            keys = sorted(store)
+            folded = sum(store.pop(key) for key in keys[:len(keys) - self.max_buckets])
+            store[keys[len(keys) - self.max_buckets]] += folded
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        self.count += len(values)
+        small = np.abs(values) <= self.min_value
+        self.zeros += int(small.sum())
+        if (values > self.min_value).any():
+            self._add(self.positive, values[values > self.min_value])
+        if (values < -self.min_value).any():
+            self._add(self.negative, -values[values < -self.min_value])
+
+    def merge(self, other):
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, q):
+        if not self.count:
+            return math.nan
+        # Buckets in ascending value order: negatives by falling magnitude, zeros, positives
+        negative_keys = sorted(self.negative, reverse=True)
+        positive_keys = sorted(self.positive)
+        values = np.concatenate([-self._midpoints(negative_keys), [0.0], self._midpoints(positive_keys)])
+        counts = np.array([self.negative[key] for key in negative_keys] + [self.zeros]
+                          + [self.positive[key] for key in positive_keys])
+        rank = q * (self.count - 1)
+        return float(values[np.searchsorted(np.cumsum(counts), rank, side='right')])
+
+    def _midpoints(self, keys):
+        return 2 * self.gamma ** np.array(keys, dtype=float) / (self.gamma + 1)
+
+
+class Reservoir:
+    """Uniform random sample of at most size rows from a stream of rows (algorithm R)."""
+
+    def __init__(self, size, width, rng):
+        self.size = size
+        self.rows = np.empty((size, width))
+        self.seen = 0
+        self.rng = rng
+
+    def update(self, rows):
+        rows = np.asarray(rows, dtype=float)
+        fill = max(0, min(self.size - self.seen, len(rows)))
+        self.rows[self.seen:self.seen + fill] = rows[:fill]
+        # Row t of the stream replaces a random slot with probability size / (t + 1)
+        positions = np.arange(self.seen + fill, self.seen + len(rows))
+        slots = (self.rng.random(len(positions)) * (positions + 1)).astype(np.int64)
+        keep = slots < self.size
+        self.rows[slots[keep]] = rows[fill:][keep]  # Later rows win repeated slots, as in the sequential form
+        self.seen += len(rows)
+
+    @property
+    def sample(self):
+        return self.rows[:min(self.seen, self.size)]
+
+
+class BlockSeries:
+    """A stream of per-run values reduced to at most capacity block means, for plotting.
+
+    Blocks start one run long; whenever capacity blocks are full, neighbours are merged in
+    pairs and the block length doubles, so any number of runs fits in the same memory.
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity - capacity % 2
+        self.block = 1
+        self.sums = []
+        self.open_sum = 0.0
+        self.open_count = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        start = 0
+        while start < len(values):
+            take = min(self.block - self.open_count, len(values) - start)
+            self.open_sum += float(values[start:start + take].sum())
+            self.open_count += take
+            start += take
+            if self.open_count == self.block:
+                self.sums.append(self.open_sum)
+                self.open_sum, self.open_count = 0.0, 0
+                if len(self.sums) == self.capacity:
+                    self.sums = [self.sums[i] + self.sums[i + 1] for i in range(0, self.capacity, 2)]
+                    self.block *= 2
+
+    def points(self):
+        """Run number at each block's centre (runs counted from 1) and the block's mean."""
+        sums = self.sums + ([self.open_sum] if self.open_count else [])
+        counts = np.array([self.block] * len(self.sums) + ([self.open_count] if self.open_count else []))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        return starts + (counts + 1) / 2, np.array(sums) / np.maximum(counts, 1)
+
+
+class GroupStats:
+    """Online statistics of one config group's runs."""
+
+    def __init__(self, key, reservoir_size, rng, series_capacity=256):
+        self.key = key
+        self.outcomes = {}  # Outcome -> runs
+        self.stats = {metric: RunningStats() for metric in METRICS}
+        self.sketches = {metric: QuantileSketch() for metric in METRICS}
+        self.series = {metric: BlockSeries(series_capacity) for metric in METRICS}
+        self.agent_series = {metric: {} for metric in AGENT_FIELDS}  # Metric -> agent number -> BlockSeries
+        self.reservoir = Reservoir(reservoir_size, len(METRICS), rng)  # Whole runs, for bootstrap tests
+        self.series_capacity = series_capacity
+
+    @property
+    def runs(self):
+        return self.stats['sim_time'].count
+
+    def update(self, records):
+        """Fold in a batch of completed runs' records."""
+        columns = np.array([[extract(record) for _, extract in METRICS.values()] for record in records], dtype=float)
+        for column, metric in enumerate(METRICS):
+            self.stats[metric].update(columns[:, column])
+            self.sketches[metric].update(columns[:, column])
+            self.series[metric].update(columns[:, column])
+        self.reservoir.update(columns)
+        for metric, field in AGENT_FIELDS.items():
+            per_agent = itertools.zip_longest(*[[agent[field] for agent in record['agents']] for record in records],
+                                              fillvalue=0)
+            for number, values in enumerate(per_agent, start=1):
+                series = self.agent_series[metric].setdefault(number, BlockSeries(self.series_capacity))
+                series.update(np.array(values, dtype=float))
+
+    def summary(self, confidence=0.95):
+        rows = {}
+        for metric in METRICS:
+            stats, sketch = self.stats[metric], self.sketches[metric]
+            rows[metric] = {
+                'mean': stats.mean, 'std': stats.std, 'interval': stats.interval(confidence),
+                'min': stats.min, 'median': sketch.quantile(0.5), 'p90': sketch.quantile(0.9),
+                'p99': sketch.quantile(0.99), 'max': stats.max,
+            }
+        return rows
+
+
+def _bootstrap_means(sample, resamples, rng, chunk):
+    """Means of resamples bootstrap resamples of sample, drawn chunk resamples at a time."""
+    means = np.empty(resamples)
+    for start in range(0, resamples, chunk):
+        count = min(chunk, resamples - start)
+        means[start:start + count] = sample[rng.integers(0, len(sample), size=(count, len(sample)))].mean(axis=1)
+    return means
+
+
+class RunStats:
+    """Streaming statistics of run records, grouped by config, for comparing planners.
+
+    Records are run_headless result dicts, consumed in batches from any iterable, so a file
+    of any length is read once in bounded memory. Per group it keeps Welford moments,
+    quantile sketches, per-run series reduced for plotting and a reservoir sample of whole
+    runs; only completed runs enter the statistics, other outcomes are just counted.
+    """
+
+    def __init__(self, group_by=('planner', 'num_agents'), batch_size=4096, reservoir_size=4096, seed=0):
+        self.group_by = group_by
+        self.batch_size = batch_size
+        self.reservoir_size = reservoir_size
+        self.rng = np.random.default_rng(seed)
+        self.groups = {}  # Group key (tuple of group_by values) -> GroupStats
+        self.records = 0
+
+    def group(self, key):
+        if key not in self.groups:
+            self.groups[key] = GroupStats(key, self.reservoir_size, self.rng)
+        return self.groups[key]
+
+    def consume(self, records):
+        records = iter(records)
+        while True:
+            batch = list(itertools.islice(records, self.batch_size))
+            if not batch:
+                return self
+            self.records += len(batch)
+            by_group = {}
+            for record in batch:
+                key = tuple(record.get(field) for field in self.group_by)
+                outcome = record.get('outcome', 'completed' if record.get('completed', True) else 'interrupted')
+                outcomes = self.group(key).outcomes
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                if outcome == 'completed':
+                    by_group.setdefault(key, []).append(record)
+            for key, group_records in by_group.items():
+                self.groups[key].update(group_records)
+
+    def compare(self, key_a, key_b, metric, resamples=2000, confidence=0.95, chunk=256):
+        """Bootstrap test of the difference in a metric's mean between two groups (a - b).
+
+        The groups' reservoir samples are resampled independently and the spread of the
+        resampled means is scaled from the sample size to the group's run count, since the
+        standard error of a mean falls with the square root of the runs. The interval is a
+        percentile interval around the exact streaming difference; p_value is two-sided.
+        """
+        column = list(METRICS).index(metric)
+        observed = self.groups[key_a].stats[metric].mean - self.groups[key_b].stats[metric].mean
+        differences = observed
+        for sign, key in ((1, key_a), (-1, key_b)):
+            group = self.groups[key]
+            sample = group.reservoir.sample[:, column]
+            means = _bootstrap_means(sample, resamples, self.rng, chunk)
+            differences = differences + sign * (means - sample.mean()) * math.sqrt(len(sample) / group.runs)
+        low, high = np.quantile(differences, [(1 - confidence) / 2, (1 + confidence) / 2])
+        tail = int(min((differences <= 0).sum(), (differences >= 0).sum()))
+        return {
+            'metric': metric, 'a': key_a, 'b': key_b, 'difference': observed,
+            'interval': (float(low), float(high)), 'p_value': min(1.0, 2 * (tail + 1) / (resamples + 1)),
+            'runs': (self.groups[key_a].runs, self.groups[key_b].runs),
+        }
+
+
+def read_records(path):
+    """Run records from a JSON list (as job_server writes) or a JSON lines file, one at a time."""
+    with open(path) as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == '[':
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_log(path, planner):
+    """Run records from a main.py console log like IMECE_LP_20grids.txt, read line by line."""
+    run_pattern = re.compile(r"--- [Rr]un (\d+) ---")
+    agent_pattern = re.compile(r"Agent (\d) \((\w+)\) stats:")
+    cells_pattern = re.compile(r"Total cells travelled: (\d+)")
+    revisits_pattern = re.compile(r"Total revisits: (\d+)")
+    time_pattern = re.compile(r"Sim time: ['\"]?([\d\.]+)['\"]? units")
+    record = None
+    with open(path) as f:
+        for line in f:
+            if run_pattern.search(line):
+                if record is not None and 'sim_time' in record:
+                    yield record
+                record = {'planner': planner, 'run': int(run_pattern.search(line).group(1)), 'agents': []}
+            elif record is not None:
+                if agent_pattern.search(line):
+                    record['agents'].append({'color': agent_pattern.search(line).group(2)})
+                elif cells_pattern.search(line) and record['agents']:
+                    record['agents'][-1]['cells_travelled'] = int(cells_pattern.search(line).group(1))
+                elif revisits_pattern.search(line) and record['agents']:
+                    record['agents'][-1]['revisit_count'] = int(revisits_pattern.search(line).group(1))
+                elif time_pattern.search(line):
+                    record['sim_time'] = float(time_pattern.search(line).group(1))
+                    record['num_agents'] = len(record['agents'])
+    if record is not None and 'sim_time' in record:
+        yield record
+
+
+def _label(key):
+    return '/'.join(str(part) for part in key)
+
+
+def plot_metric(run_stats, key, metric, title, ylabel, filename, is_multi_agent=False, confidence=0.95):
+    """IMECEanalysis.plot_metric for a streamed group: per-run values and their average.
+
+    Beyond a few hundred runs each point is the mean of a block of consecutive runs. The
+    average line carries a shaded confidence interval of the mean.
+    """
+    group = run_stats.groups[key]
+    stats = group.stats[metric]
+    with plt.rc_context(PLOT_STYLE):
+        plt.figure(figsize=(9, 4))
+        if is_multi_agent:
+            for agent, series in group.agent_series[metric].items():
+                color = agent_colors.get(agent, f"C{agent}")
+                plt.plot(*series.points(), marker='o', color=color, markerfacecolor=color, label=f"Agent {agent}")
+        else:
+            plt.plot(*group.series[metric].points(), marker='o', color='g', label=title.split(" per")[0])
+        plt.axhline(y=stats.mean, color='r', linestyle='--', linewidth=2, label=f"Avg: {stats.mean:.2f}")
+        for bound, label in zip(stats.interval(confidence), (f"{confidence:.0%} CI", None)):
+            plt.axhline(y=bound, color='r', linestyle=':', linewidth=1.5, label=label)  # EPS has no transparency
+        plt.xlabel('Run' if group.series[metric].block == 1 else f"Run (means of {group.series[metric].block})")
+        plt.ylabel(ylabel)
+        plt.title(title)
+        plt.grid(True)
+        plt.legend()
+        plt.tight_layout()
+        plt.savefig(filename, format='eps')
+        plt.close()
+
+
+def plot_comparison(run_stats, keys, metric, title, ylabel, filename, confidence=0.95):
+    """The combined LP vs. PCP plot of IMECEanalysis.py for any groups and metric."""
+    styles = [('blue', 'o'), ('orange', 's'), ('green', '^'), ('purple', 'D')]
+    with plt.rc_context(PLOT_STYLE):
+        plt.figure(figsize=(9, 4))
+        for key, (color, marker) in zip(keys, itertools.cycle(styles)):
+            group = run_stats.groups[key]
+            stats = group.stats[metric]
+            plt.plot(*group.series[metric].points(), marker=marker, color=color, label=f"{_label(key)} {ylabel.split(' (')[0]}")
+            plt.axhline(y=stats.mean, color=color, linestyle='--', linewidth=2, label=f"{_label(key)} Avg: {stats.mean:.2f}")
+            for bound in stats.interval(confidence):
+                plt.axhline(y=bound, color=color, linestyle=':', linewidth=1.5)
+        plt.xlabel('Run')
+        plt.ylabel(ylabel)
+        plt.title(title)
+        plt.grid(True)
+        plt.legend(loc='upper right')
+        plt.tight_layout()
+        plt.savefig(filename, format='eps')
+        plt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming statistics and LP vs. PCP tests over run records.")
+    parser.add_argument('paths', nargs='*', help="JSON or JSON lines files of run records")
+    parser.add_argument('--log', action='append', default=[], metavar='PLANNER=PATH',
+                        help="a main.py console log of the given planner's runs")
+    parser.add_argument('--compare', nargs=2, default=('LP', 'PCP'), metavar=('A', 'B'))
+    parser.add_argument('--resamples', type=int, default=2000)
+    parser.add_argument('--plots', default=None, metavar='PREFIX', help="write plot_metric figures as PREFIX_*.eps")
+    args = parser.parse_args()
+
+    run_stats = RunStats()
+    for path in args.paths:
+        run_stats.consume(read_records(path))
+    for spec in args.log:
+        planner, path = spec.split('=', 1)
+        run_stats.consume(read_log(path, planner))
+
+    for key, group in sorted(run_stats.groups.items(), key=lambda item: _label(item[0])):
+        print(f"[STATS] {_label(key)}: {group.runs} completed runs, outcomes {group.outcomes}")
+        for metric, row in group.summary().items():
+            low, high = row['interval']
+            print(f"  {metric:9s} mean {row['mean']:10.2f} [{low:.2f}, {high:.2f}]  std {row['std']:9.2f}  "
+                  f"median {row['median']:9.2f}  p90 {row['p90']:9.2f}  p99 {row['p99']:9.2f}")
+
+    planner_a, planner_b = args.compare
+    pairs = [(key, (planner_b,) + key[1:]) for key in run_stats.groups if key[0] == planner_a]
+    for key_a, key_b in pairs:
+        if key_b not in run_stats.groups or not run_stats.groups[key_a].runs or not run_stats.groups[key_b].runs:
+            continue
+        for metric in METRICS:
+            result = run_stats.compare(key_a, key_b, metric, args.resamples)
+            low, high = result['interval']
+            print(f"[STATS] {_label(key_a)} - {_label(key_b)} {metric}: {result['difference']:+.2f} "
+                  f"[{low:+.2f}, {high:+.2f}], p = {result['p_value']:.4f}")
+        if args.plots:
+            plot_comparison(run_stats, (key_a, key_b), 'sim_time',
+                            f"Simulation Time per Run ({planner_a} vs. {planner_b})",
+                            'Simulation Time (units)', f"{args.plots}_{_label(key_a).replace('/', '_')}_combined_simtime.eps")
+
+    if args.plots:
+        for key, group in run_stats.groups.items():
+            if not group.runs:
+                continue
+            name = _label(key).replace('/', '_')
+            for metric, (ylabel, _) in METRICS.items():
+                plot_metric(run_stats, key, metric, f"{ylabel.split(' (')[0]} per Run ({_label(key)})", ylabel,
+                            f"{args.plots}_{name}_{metric}.eps", is_multi_agent=metric in AGENT_FIELDS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+from grid import Grid, CELL_DTYPE, OBSTACLE
+import sim_core
+
+
+class Scenario:
+    """A field, its boundaries and agent spawn cells, identified by a hash of that content."""
+
+    def __init__(self, cells, boundaries, spawns, params=None):
+        self.cells = np.asarray(cells, dtype=CELL_DTYPE)
+        self.boundaries = np.asarray(boundaries, dtype=bool)
+        self.spawns = np.asarray(spawns, dtype=np.int64).reshape(-1, 2)  # (x, y) rows
+        self.params = params or {}  # How it was generated; not part of the id
+        digest = hashlib.sha256()
+        for array in (np.array(self.cells.shape), self.cells, self.boundaries, self.spawns):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        self.id = digest.hexdigest()[:16]
+
+    @property
+    def agent_positions(self):
+        return [tuple(map(int, spawn)) for spawn in self.spawns]
+
+    def to_grid(self):
+        return Grid.from_arrays(self.cells, self.boundaries)
+
+
+def _smooth_field(rng, size, patch_size, fraction):
+    """Mask with the given fraction of True cells, in blobs about patch_size cells across.
+
+    Uniform noise is box-blurred along each axis with cumulative sums, then thresholded at
+    its quantile, so the fraction is met exactly whatever the blur.
+    """
+    noise = rng.random(size)
+    if patch_size > 1:
+        for axis in (0, 1):
+            padded = np.concatenate([np.take(noise, [0] * patch_size, axis=axis), noise,
+                                     np.take(noise, [-1] * patch_size, axis=axis)], axis=axis)
+            sums = np.cumsum(padded, axis=axis)
+            length = noise.shape[axis]
+            noise = (np.take(sums, range(patch_size, patch_size + length), axis=axis)
+                     - np.take(sums, range(0, length), axis=axis))
+    if fraction <= 0:
+        return np.zeros(size, dtype=bool)
+    return noise >= np.quantile(noise, 1 - fraction)
+
+
+def _spawn_cells(rng, size, num_agents, layout, free):
+    grid_h, grid_w = size
+    if layout == 'row':  # Along the top row from the left, like main.py
+        xs = np.arange(num_agents) % grid_w
+        return np.column_stack([xs, np.arange(num_agents) // grid_w])
+    if layout == 'spread':  # Evenly spaced along the top row
+        xs = np.linspace(0, grid_w - 1, num_agents).round().astype(np.int64)
+        return np.column_stack([xs, np.zeros(num_agents, dtype=np.int64)])
+    if layout == 'random':
+        cells = rng.choice(np.flatnonzero(free), size=num_agents, replace=False)
+        return np.column_stack([cells % grid_w, cells // grid_w])
+    raise ValueError(f"Unknown spawn layout {layout!r}")
+
+
+def generate_scenario(size=(7, 15), seed=0, num_agents=3, spawn='row', wall_gap_probability=0.0,
+                      wall_drop_probability=0.0, obstacle_clusters=0, obstacle_radius=(1, 2),
+                      wet_fraction=0.5, planted_fraction=0.5, patch_size=1):
+    """Generate a scenario from the seed's grid stream.
+
+    Boundaries start as Grid's column walls; single wall cells open as gaps with
+    wall_gap_probability and whole walls are dropped with wall_drop_probability. Obstacle
+    clusters are discs of random radius. Moisture and crops cover the given fractions of the
+    free cells, in patches about patch_size cells across. spawn is 'row', 'spread' or
+    'random'. Free cells that cannot be reached from a spawn become obstacles, so the whole
+    free field can be covered.
+    """
+    params = dict(size=list(size), seed=seed, num_agents=num_agents, spawn=spawn,
+                  wall_gap_probability=wall_gap_probability, wall_drop_probability=wall_drop_probability,
+                  obstacle_clusters=obstacle_clusters, obstacle_radius=list(obstacle_radius),
+                  wet_fraction=wet_fraction, planted_fraction=planted_fraction, patch_size=patch_size)
+    rng = sim_core.run_streams(seed)['grid']
+    grid_h, grid_w = size
+
+    # Column walls except the first and last rows, with gaps and dropped walls
+    boundaries = np.zeros((grid_h, grid_w - 1), dtype=bool)
+    boundaries[1:grid_h - 1] = True
+    boundaries &= rng.random(boundaries.shape) >= wall_gap_probability
+    boundaries &= (rng.random(grid_w - 1) >= wall_drop_probability)[None, :]
+
+    obstacles = np.zeros(size, dtype=bool)
+    centers_y = rng.integers(grid_h, size=obstacle_clusters)
+    centers_x = rng.integers(grid_w, size=obstacle_clusters)
+    radii = rng.integers(obstacle_radius[0], obstacle_radius[1] + 1, size=obstacle_clusters)
+    for cy, cx, radius in zip(centers_y, centers_x, radii):
+        top, left = max(cy - radius, 0), max(cx - radius, 0)
+        ys, xs = np.ogrid[top:min(cy + radius + 1, grid_h), left:min(cx + radius + 1, grid_w)]
+        obstacles[top:top + ys.shape[0], left:left + xs.shape[1]] |= (ys - cy) ** 2 + (xs - cx) ** 2 <= radius ** 2
+
+    spawns = _spawn_cells(rng, size, num_agents, spawn, ~obstacles)
+    obstacles[spawns[:, 1], spawns[:, 0]] = False
+    cells = np.zeros(size, dtype=CELL_DTYPE)
+    cells['soil_type'][obstacles] = OBSTACLE
+    obstacles |= ~Grid.from_arrays(cells, boundaries).reachable(spawns.tolist()).reshape(size)
+
+    cells['moisture_level'] = _smooth_field(rng, size, patch_size, wet_fraction)
+    cells['crop_status'] = _smooth_field(rng, size, patch_size, planted_fraction)
+    # Obstacles hold no work: wet and marked as planted
+    cells['soil_type'][obstacles] = OBSTACLE
+    cells['moisture_level'][obstacles] = 1
+    cells['crop_status'][obstacles] = 1
+    return Scenario(cells, boundaries, spawns, params)
+
+
+class ScenarioStore:
+    """Directory of scenarios as compressed .npz files named by scenario id.
+
+    Files are written once through a temporary name, so concurrent writers of the same
+    scenario and readers never see a partial file. Loaded scenarios are kept in memory.
+    """
+
+    def __init__(self, root='scenarios'):
+        self.root = root
+        self.loaded = {}
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, scenario_id):
+        return os.path.join(self.root, f"{scenario_id}.npz")
+
+    def __contains__(self, scenario_id):
+        return scenario_id in self.loaded or os.path.exists(self.path(scenario_id))
+
+    def ids(self):
+        return sorted(name[:-4] for name in os.listdir(self.root) if name.endswith('.npz'))
+
+    def put(self, scenario):
+        """Store a scenario unless it is already present; returns its id."""
+        if scenario.id not in self:
+            temporary = os.path.join(self.root, f".{scenario.id}.{os.getpid()}.npz")
+            np.savez_compressed(temporary, cells=scenario.cells, boundaries=scenario.boundaries,
+                                spawns=scenario.spawns, params=np.array(json.dumps(scenario.params)))
+            os.replace(temporary, self.path(scenario.id))
+        self.loaded[scenario.id] = scenario
+        return scenario.id
+
+    def get(self, scenario_id):
+        scenario = self.loaded.get(scenario_id)
+        if scenario is None:
+            with np.load(self.path(scenario_id)) as data:
+                scenario = Scenario(data['cells'], data['boundaries'], data['spawns'], json.loads(str(data['params'])))
+            if scenario.id != scenario_id:
+                raise ValueError(f"Scenario file {self.path(scenario_id)} does not match its id")
+            self.loaded[scenario_id] = scenario
+        return scenario
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate scenarios into a scenario store.")
+    parser.add_argument('--store', default='scenarios')
+    parser.add_argument('--count', type=int, default=10)
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--size', type=int, nargs=2, default=(7, 15), metavar=('H', 'W'))
+    parser.add_argument('--agents', type=int, default=3)
+    parser.add_argument('--spawn', default='row', choices=('row', 'spread', 'random'))
+    parser.add_argument('--wall-gaps', type=float, default=0.0)
+    parser.add_argument('--wall-drops', type=float, default=0.0)
+    parser.add_argument('--obstacles', type=int, default=0)
+    parser.add_argument('--patch-size', type=int, default=1)
+    args = parser.parse_args()
+
+    store = ScenarioStore(args.store)
+    for seed in range(args.first_seed, args.first_seed + args.count):
+        scenario = generate_scenario(tuple(args.size), seed, args.agents, args.spawn, args.wall_gaps,
+                                     args.wall_drops, args.obstacles, patch_size=args.patch_size)
+        print(store.put(scenario))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import numpy as np
+
+simulation_time = round(0.00, 2)
+time_step = round(0.1, 2)
+
+# Number of visualization frames (iterations) required per action
+MOVEMENT_FRAMES = 1
+PLANTING_FRAMES = 10
+WATERING_FRAMES = 4
+viz_while_loop_counter = 0  # Current tick, shared by agents, planners and reservation tables
+
+# Simulated time spent per action, as returned by Agent.execute_action
+movement_time_step = MOVEMENT_FRAMES * time_step
+planting_time_step = PLANTING_FRAMES * time_step
+watering_time_step = WATERING_FRAMES * time_step
+waiting_time_step = time_step
+
+
+# Named random streams of a run, in spawn order; append new names so existing streams keep their values
+STREAMS = ('grid', 'dynamics', 'faults')
+
+
+def run_streams(seed):
+    """Independent random Generators for one run's stochastic components, keyed by name.
+
+    All are spawned from SeedSequence(seed) and depend on nothing else, so any run of a sweep
+    can be reproduced alone, in any process, without replaying the runs before it.
+    """
+    children = np.random.SeedSequence(seed).spawn(len(STREAMS))
+    return {name: np.random.default_rng(child) for name, child in zip(STREAMS, children)}
+
+
+def reset_clock():
+    """Start a new run at tick 0; call before creating its agents, which stamp their spawn cell with the tick."""
+    global simulation_time, viz_while_loop_counter
+    simulation_time = 0.00
+    viz_while_loop_counter = 0
+
+
+class RunStopped(Exception):
+    """Raised by a tick hook to end a run early, e.g. by stall_watchdog.Watchdog.
+
+    outcome names the reason ('stalled', 'wall_time', ...); diagnostics is a plain-data snapshot.
+    """
+
+    def __init__(self, outcome, diagnostics=None):
+        super().__init__(outcome)
+        self.outcome = outcome
+        self.diagnostics = diagnostics
+
+
+def target_cell_count(grid, agents=()):
+    """Cells the agents can reach: those in the components of their cells, or all passable cells without agents."""
+    if not agents:
+        return int(grid.passable().sum())
+    return grid.reachable_count([(agent.x, agent.y) for agent in agents])
+
+
+def check_all_cells_visited(grid, global_explored_cells, agents=()):
+    """Stops only when all cells the agents can reach have been visited at least once."""
+    return len(global_explored_cells) >= target_cell_count(grid, agents)
+
+
+def check_mission_complete(grid, agents, behavior_planner):
+    """Use the planner's own completion rule if it has one, otherwise require full coverage of the reachable cells."""
+    if hasattr(behavior_planner, 'mission_complete'):
+        return behavior_planner.mission_complete(grid, agents)
+    # Agents may hold their own maps (see coverage_sync); the best informed one decides
+    return check_all_cells_visited(grid, max((agent.global_explored_cells for agent in agents), key=len), agents)
+
+
+def run_simulation(grid, agents, state_estimator, behavior_planner, max_ticks=None, tick_hooks=(), verbose=True):
+    """Runs the simulation headless, without plotting, until the mission completes or max_ticks is reached."""
+    global simulation_time, viz_while_loop_counter
+    if not isinstance(agents, list):
+        agents = [agents]
+
+    from behavior_planning import batched  # Planners import this module
+    planner = batched(behavior_planner)  # Agents ask it for their moves through the batched API
+
+    # SIGINT is left to KeyboardInterrupt so this also runs inside worker processes and threads
+    reset_clock()
+
+    try:
+        while max_ticks is None or viz_while_loop_counter < max_ticks:
+            # Hooks (fault injection, field dynamics, ...) see the tick before agents act
+            for hook in tick_hooks:
+                hook(viz_while_loop_counter)
+
+            perceptions = state_estimator.perceive_all(agents)
+
+            for agent, perception in zip(agents, perceptions):
+                agent.execute_action(agent.select_action(perception, planner))  # Execute each agent's action
+
+            viz_while_loop_counter += 1
+            simulation_time = viz_while_loop_counter * time_step
+
+            if check_mission_complete(grid, agents, behavior_planner):  # Stop if all cells are planted
+                if all(agent.done or agent.is_frozen for agent in agents):
+                    if verbose:
+                        print("[SIM] Grid fully explored. All agents have completed final tasks.")
+                    break
+    except RunStopped as stop:
+        if verbose:
+            print(f"[SIM] Run stopped at tick {viz_while_loop_counter}: {stop.outcome}")
+    except KeyboardInterrupt:
+        print("\nSimulation stopped by user.")
+    return simulation_time
@@ -0,0 +1,186 @@
+from multiprocessing import Pool
+from grid import Grid, TiledGrid
+from agent import Agent
+from state_estimation import StateEstimator
+from reservation_table import ReservationTable
+from distance_maps import DistanceMapCache
+from coverage import CoverageMap
+from coverage_sync import CoverageNetwork
+import metrics
+import scenarios
+from stall_watchdog import Watchdog
+from behavior_planning import LocalPlanner, PreassignedPlanner, PreassignedSweepFromSpawnPlanner, TaskAwarePlanner, MakespanColumnPlanner
+import sim_core
+
+# Planner name -> (planner class, reroute threshold), matching the choices in main.py
+PLANNERS = {
+    'LP': (LocalPlanner, 3),
+    'PCP': (PreassignedPlanner, 200),
+    'PCP-block': (PreassignedSweepFromSpawnPlanner, 200),
+    'TA': (TaskAwarePlanner, 3),
+    'MCP': (MakespanColumnPlanner, 200),
+}
+
+
+def build_run(planner='LP', agent_positions=((0, 0), (1, 0), (2, 0)), size=(7, 15), seed=42, reservations=True, grid_path=None, scenario=None):
+    """Create the grid, planner and agents for one run, seeded like main.create_seeded_grid.
+
+    With grid_path the field is opened from a TiledGrid directory instead; the run's changes
+    stay in memory, the files on disk are left as they are, and no distance maps are built.
+    With a scenarios.Scenario the field is a copy of the scenario's, and size and seed are
+    not used for it.
+    """
+    if scenario is not None:
+        grid = scenario.to_grid()
+    elif grid_path is not None:
+        grid = TiledGrid(grid_path, mode='c')
+    else:
+        grid = Grid(size=size, rng=sim_core.run_streams(seed)['grid'])
+
+    planner_cls, reroute_threshold = PLANNERS[planner]
+    behavior_planner = planner_cls()
+    state_estimator = StateEstimator(grid)
+    if grid_path is None:
+        reservation_table = ReservationTable(grid) if reservations else None
+        distance_maps = DistanceMapCache(grid)
+    else:
+        # Distance fields span the whole field; on a TiledGrid agents route with searches bounded to about a tile
+        reservation_table = ReservationTable(grid, max_expansions=20 * grid.tile_shape[0] * grid.tile_shape[1]) if reservations else None
+        distance_maps = None
+
+    sim_core.reset_clock()  # Agents stamp their spawn cell with the current tick
+    Agent.used_colors.clear()
+    global_explored_cells = CoverageMap(grid.size)
+    agents = [Agent(grid, global_explored_cells, reroute_threshold, tuple(pos), [], behavior_planner=behavior_planner, state_estimator=state_estimator, reservation_table=reservation_table, distance_maps=distance_maps) for pos in agent_positions]
+    for agent in agents:
+        agent.agents = agents  # Share reference to all agents
+    return grid, agents, state_estimator, behavior_planner
+
+
+def run_headless(config, tick_hooks=()):
+    """Run one simulation without plotting and return its results as a plain dict.
+
+    config keys: planner, agent_positions, size, seed, max_ticks, reservations, grid_path, comms, a dict of
+    CoverageNetwork arguments that gives each agent its own coverage map, runtime, 'lockstep' or 'async',
+    metrics_port, which publishes live metrics from this process (see metrics.serve), and scenario, the id of a
+    field in the scenario_store directory (default 'scenarios'); agents then spawn at the scenario's spawn cells
+    unless agent_positions is given. max_wall_time (seconds) and stall_ticks budget the run through a
+    stall_watchdog.Watchdog. The result's outcome is 'completed', 'max_ticks', 'wall_time' or 'stalled'; runs
+    the watchdog stopped also carry its diagnostics. With trails set, the result also holds the grid size and
+    each agent's trail as flat cell indices (y * width + x) with the tick of each entry, for visit_heatmaps.
+    record is a .gif (or, with ffmpeg, video) path to render the run to with raster.FrameRecorder, a frame
+    every record_every ticks. faults, a dict of fault_injection.FaultModel arguments, samples breakdowns from
+    the run's own 'faults' stream; the result then lists them as faults, and the ones that fired as fault_log.
+    grid_seed, if given, seeds the field instead of seed, so runs can share a field but differ in their other
+    streams.
+    Hooks with a bind(grid, agents) method are bound to this run first, so they can be built before the run and
+    sent to workers; hooks with a result() method add the dict it returns to the run's result, which is how what
+    a hook saw in a worker process gets back to the caller.
+    """
+    scenario = None
+    if config.get('scenario') is not None:
+        scenario = scenarios.ScenarioStore(config.get('scenario_store', 'scenarios')).get(config['scenario'])
+    default_positions = scenario.agent_positions if scenario is not None else ((0, 0), (1, 0), (2, 0))
+    grid, agents, state_estimator, behavior_planner = build_run(
+        config.get('planner', 'LP'), config.get('agent_positions', default_positions),
+        config.get('size', (7, 15)), config.get('grid_seed', config.get('seed', 42)), config.get('reservations', True),
+        config.get('grid_path'), scenario)
+    fault_events = None
+    if config.get('faults') is not None:
+        from fault_injection import FaultModel, FaultInjector
+        fault_model = FaultModel(**config['faults'])
+        fault_events = fault_model.sample(sim_core.run_streams(config.get('seed', 42))['faults'], len(agents))
+        tick_hooks = list(tick_hooks) + [FaultInjector(fault_events)]
+    for hook in tick_hooks:
+        if hasattr(hook, 'bind'):
+            hook.bind(grid, agents)
+    reporting_hooks = [hook for hook in tick_hooks if hasattr(hook, 'result')]
+    network = None
+    if config.get('comms') is not None:
+        network = CoverageNetwork(**config['comms'])
+        network.bind(grid, agents)
+        tick_hooks = list(tick_hooks) + [network]
+    watchdog = None
+    if config.get('max_wall_time') is not None or config.get('stall_ticks') is not None:
+        watchdog = Watchdog(config.get('max_wall_time'), config.get('stall_ticks'))
+        watchdog.bind(grid, agents)
+        tick_hooks = list(tick_hooks) + [watchdog]
+    recorder = None
+    if config.get('record') is not None:
+        from raster import FrameRecorder
+        recorder = FrameRecorder(config['record'], config.get('record_every', 1))
+        recorder.bind(grid, agents)
+        tick_hooks = list(tick_hooks) + [recorder]
+    metrics_hook = None
+    if config.get('metrics_port') is not None:
+        metrics.serve(config['metrics_port'])
+        metrics_hook = metrics.MetricsHook(f"{config.get('planner', 'LP')}-{len(agents)}-{config.get('seed', 42)}")
+        metrics_hook.bind(grid, agents)
+        tick_hooks = list(tick_hooks) + [metrics_hook]
+
+    run = sim_core.run_simulation
+    if config.get('runtime', 'lockstep') == 'async':
+        from async_runtime import run_simulation_async as run
+    sim_time = run(grid, agents, state_estimator, behavior_planner,
+                   max_ticks=config.get('max_ticks'), tick_hooks=tick_hooks, verbose=False)
+    ticks = sim_core.viz_while_loop_counter
+    if metrics_hook is not None:
+        metrics_hook.publish(ticks, final=True)
+    if recorder is not None:
+        recorder.close()
+
+    explored = network.union() if network is not None else agents[0].global_explored_cells
+    total_cells = sim_core.target_cell_count(grid, agents)
+    completed = sim_core.check_mission_complete(grid, agents, behavior_planner) and all(agent.done or agent.is_frozen for agent in agents)
+    if completed:
+        outcome = 'completed'
+    elif watchdog is not None and watchdog.outcome is not None:
+        outcome = watchdog.outcome
+    elif config.get('max_ticks') is not None and ticks >= config['max_ticks']:
+        outcome = 'max_ticks'
+    else:
+        outcome = 'interrupted'
+    return {
+        'planner': config.get('planner', 'LP'),
+        'num_agents': len(agents),
+        'seed': config.get('seed', 42),
+        **({'scenario': scenario.id} if scenario is not None else {}),
+        'completed': bool(completed),
+        'outcome': outcome,
+        'ticks': ticks,
+        'sim_time': sim_time,
+        'coverage': len(explored) / total_cells,
+        'agents': [{
+            'color': agent.color,
+            'cells_travelled': agent.cells_travelled,
+            'revisit_count': agent.revisit_count,
+            'is_frozen': agent.is_frozen,
+            **({'trail': [y * grid.size[1] + x for x, y in agent.agents_actual_visited_cells],
+                'visit_ticks': list(agent.visit_ticks)} if config.get('trails') else {}),
+        } for agent in agents],
+        **({'size': list(grid.size)} if config.get('trails') else {}),
+        **({'faults': [(event.agent_index, event.tick, event.recover_after) for event in fault_events]}
+           if fault_events is not None else {}),
+        **({'comms': network.stats()} if network is not None else {}),
+        **({'diagnostics': watchdog.diagnostics} if watchdog is not None and watchdog.outcome is not None else {}),
+        **{key: value for hook in reporting_hooks for key, value in hook.result().items()},
+    }
+
+
+def _run_job(job):
+    config, tick_hooks = job
+    return run_headless(config, tick_hooks)
+
+
+def run_many(configs, tick_hooks=None, processes=None, chunksize=8):
+    """Run many headless simulations in a process pool, preserving input order.
+
+    tick_hooks, if given, is a list with one sequence of picklable hooks per config.
+    """
+    if tick_hooks is None:
+        tick_hooks = [()] * len(configs)
+    jobs = list(zip(configs, tick_hooks))
+    if processes == 1:
+        return [_run_job(job) for job in jobs]
+    with Pool(processes) as pool:
+        return pool.map(_run_job, jobs, chunksize=chunksize)
@@ -0,0 +1,77 @@
+import time
+from collections import deque
+import sim_core
+
+
+class Watchdog:
+    """Tick hook that ends a run on a wall-time budget or when its progress stalls.
+
+    Progress is the best-informed agent's explored cell count plus the tasks done. Every
+    check_every ticks the gain over the last stall_ticks ticks is measured; a gain below
+    min_progress stops the run as 'stalled'. max_wall_time (seconds) stops it as 'wall_time'.
+    Either way sim_core.RunStopped ends the loop and outcome and diagnostics are kept here.
+    """
+
+    def __init__(self, max_wall_time=None, stall_ticks=500, min_progress=1, check_every=10):
+        self.max_wall_time = max_wall_time
+        self.stall_ticks = stall_ticks
+        self.min_progress = min_progress
+        self.check_every = check_every
+        self.outcome = None
+        self.diagnostics = None
+
+    def bind(self, grid, agents):
+        self.grid = grid
+        self.agents = agents
+        self.started = time.perf_counter()
+        self.history = deque()  # (tick, progress) of the checks within the stall window
+        self.outcome = None
+        self.diagnostics = None
+
+    def progress(self):
+        explored = max((agent.global_explored_cells for agent in self.agents), key=len)
+        cells = self.grid.grid
+        open_tasks = int((cells['moisture_level'] == 0).sum() + (cells['crop_status'] == 0).sum())
+        return len(explored) - open_tasks
+
+    def __call__(self, tick):
+        if self.max_wall_time is not None and time.perf_counter() - self.started > self.max_wall_time:
+            self.stop('wall_time', tick)
+        if self.stall_ticks is None or tick % self.check_every:
+            return
+        progress = self.progress()
+        self.history.append((tick, progress))
+        # Keep the latest check at least stall_ticks old as the baseline
+        while len(self.history) > 1 and self.history[1][0] <= tick - self.stall_ticks:
+            self.history.popleft()
+        first_tick, first_progress = self.history[0]
+        if first_tick <= tick - self.stall_ticks and progress - first_progress < self.min_progress:
+            self.stop('stalled', tick)
+
+    def stop(self, outcome, tick):
+        self.outcome = outcome
+        self.diagnostics = self.snapshot(tick)
+        raise sim_core.RunStopped(outcome, self.diagnostics)
+
+    def snapshot(self, tick):
+        """Plain-data picture of the run for post-mortems: where each agent is and what it waits on."""
+        explored = max((agent.global_explored_cells for agent in self.agents), key=len)
+        return {
+            'tick': tick,
+            'wall_time': time.perf_counter() - self.started,
+            'explored': len(explored),
+            'target_cells': sim_core.target_cell_count(self.grid, self.agents),
+            'recent_progress': [list(entry) for entry in self.history],
+            'agents': [{
+                'index': index,
+                'color': agent.color,
+                'position': [agent.x, agent.y],
+                'path': [list(cell) for cell in agent.path_queue[:20]],
+                'path_length': len(agent.path_queue),
+                'busy': agent.busy,
+                'done': agent.done,
+                'is_frozen': agent.is_frozen,
+                'waiting_on': self.agents.index(agent.waiting_on) if agent.waiting_on in self.agents else None,
+                'blocked_cells': [[x, y, attempts] for (x, y), attempts in agent.blocked_cell_attempts.items()],
+            } for index, agent in enumerate(self.agents)],
+        }
@@ -1,12 +1,88 @@
 import numpy as np
+from grid import CELL_DTYPE
 
 class StateEstimator:
-    def __init__(self, grid):
+    def __init__(self, grid, sensor_radius=0):
         self.grid = grid
-    
+        self.sensor_radius = sensor_radius  # Radius-k square window around each agent
+
+        # Window offsets, shape (2k+1, 2k+1); window cells are indexed from them per tick, so
+        # nothing here grows with the field
+        k = sensor_radius
+        span = np.arange(-k, k + 1)
+        self._dy = np.repeat(span[:, None], 2 * k + 1, axis=1)
+        self._dx = self._dy.T.copy()
+
+        # Perception buffers are reused across ticks and only reallocated when the agent count changes
+        self._num_agents = None
+        self._views = []
+
+    def _allocate(self, num_agents):
+        """Allocate the batched perception buffers and the per-agent views into them."""
+        window_shape = (num_agents,) + self._dx.shape
+        self.positions = np.zeros((num_agents, 2), dtype=np.intp)  # (x, y) per agent
+        self.current = np.zeros(num_agents, dtype=CELL_DTYPE)
+        if self.sensor_radius == 0:
+            self.window = self.current.reshape(window_shape)  # The window is the current cell
+        else:
+            self.window = np.zeros(window_shape, dtype=CELL_DTYPE)
+        self._raw_dtype = np.dtype((np.void, CELL_DTYPE.itemsize))
+        self._raw_current = self.current.view(self._raw_dtype)
+        self._raw_window = self.window.view(self._raw_dtype)
+        self.in_bounds = np.ones(window_shape, dtype=bool)
+        self.needs_water = np.zeros(window_shape, dtype=bool)
+        self.needs_planting = np.zeros(window_shape, dtype=bool)
+
+        # Per-agent dicts of views; they stay valid because the buffers are filled in place
+        self._views = [{
+            'current': self.current[i],
+            'window': self.window[i],
+            'in_bounds': self.in_bounds[i],
+            'needs_water': self.needs_water[i],
+            'needs_planting': self.needs_planting[i],
+        } for i in range(num_agents)]
+        self._num_agents = num_agents
+
+    def perceive_all(self, agents):
+        """Perceive every agent's current cell and sensor window in one vectorized gather."""
+        if self._num_agents != len(agents):
+            self._allocate(len(agents))
+
+        k = self.sensor_radius
+        grid_h, grid_w = self.grid.size
+        self.positions.reshape(-1)[:] = np.fromiter(
+            (coord for agent in agents for coord in (agent.x, agent.y)), dtype=np.intp, count=2 * len(agents))
+        xs = self.positions[:, 0]
+        ys = self.positions[:, 1]
+
+        if k > 0:
+            # Out-of-field window cells read cell 0 and are masked out afterwards
+            window_xs = xs[:, None, None] + self._dx
+            window_ys = ys[:, None, None] + self._dy
+            np.logical_and((window_xs >= 0) & (window_xs < grid_w), (window_ys >= 0) & (window_ys < grid_h), out=self.in_bounds)
+            window_index = np.where(self.in_bounds, window_ys * grid_w + window_xs, 0)
+
+        if hasattr(self.grid, 'cells_at'):
+            # A TiledGrid: read only the tiles around the agents, through its cache
+            self.current[:] = self.grid.cells_at(ys * grid_w + xs)
+            if k > 0:
+                self.window[:] = self.grid.cells_at(window_index)
+        else:
+            # Gather whole records as raw bytes; structured fancy indexing is several times slower
+            raw_cells = self.grid.grid.reshape(-1).view(self._raw_dtype)
+            np.take(raw_cells, ys * grid_w + xs, out=self._raw_current)
+            if k > 0:
+                np.take(raw_cells, window_index, out=self._raw_window)
+
+        np.equal(self.window['moisture_level'], 0, out=self.needs_water)
+        np.equal(self.window['crop_status'], 0, out=self.needs_planting)
+        if k > 0:
+            self.needs_water &= self.in_bounds
+            self.needs_planting &= self.in_bounds
+        return self._views
+
     def perceive_environment(self, agent):
         """Perceive the current cell and its surroundings."""
         x, y = agent.x, agent.y
         perception = {'current': self.grid.get_cell_info(x, y)}
         return perception
-    
\ No newline at end of file
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from partitioned import run_partitioned
+from simulation import run_headless
+
+
+@pytest.mark.parametrize('planner', ['PCP', 'PCP-block', 'MCP'])
+def test_partitioned_preassigned_planners_complete(planner):
+    """Agents keep their columns across strips, and ghosts in the halo take none of them."""
+    config = {'planner': planner, 'size': (7, 40), 'seed': 3, 'max_ticks': 3000,
+              'agent_positions': [(i, 0) for i in range(8)]}
+    result = run_partitioned(config, num_strips=3, parallel=False)
+    assert result['completed']
+    assert result['coverage'] == 1.0
+    assert sorted(agent['agent_id'] for agent in result['agents']) == list(range(8))
+    assert result['ticks'] <= 2 * run_headless(dict(config))['ticks']
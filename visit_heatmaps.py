@@ -0,0 +1,179 @@
+import argparse
+import time
+import matplotlib.pyplot as plt
+import numpy as np
+from grid import Grid
+import scenarios
+import simulation
+
+# Per-cell layers: name -> (title, colormap)
+LAYERS = {
+    'visits': ("Visits per run", 'viridis'),
+    'revisits': ("Own revisits per run", 'magma'),
+    'redundant': ("Redundant visits per run", 'magma'),
+    'first_visit': ("Mean first-visit tick", 'cividis'),
+}
+
+
+class VisitHeatmaps:
+    """Grid-shaped visit statistics of many runs' agent trails, per group (e.g. planner).
+
+    Each batch of trails is flattened to cell indices and counted with np.bincount in one
+    pass. Revisits are entries into a cell the same agent had entered before, as
+    Agent.revisit_count counts them; redundant visits are entries into a cell any agent of
+    the run had entered before, the moves a perfect split of the field would not make. The
+    first-visit tick of a cell is the earliest tick any agent of a run entered it.
+    """
+
+    def __init__(self, size):
+        self.size = tuple(size)
+        self.num_cells = self.size[0] * self.size[1]
+        self.groups = {}  # Group key -> dict of flat per-cell arrays and the run count
+
+    def group(self, key):
+        if key not in self.groups:
+            self.groups[key] = {
+                'runs': 0,
+                'visits': np.zeros(self.num_cells, dtype=np.int64),
+                'revisits': np.zeros(self.num_cells, dtype=np.int64),
+                'redundant': np.zeros(self.num_cells, dtype=np.int64),
+                'first_visit_sum': np.zeros(self.num_cells),
+                'first_visit_runs': np.zeros(self.num_cells, dtype=np.int64),
+            }
+        return self.groups[key]
+
+    def add_runs(self, records, group_by='planner'):
+        """Fold in run records made with config['trails'] set, batched per group."""
+        batches = {}  # Group key -> ([cells], [ticks], [trail ids], [run ids], runs)
+        for record in records:
+            if 'size' not in record:
+                raise ValueError("Run records carry no trails; run them with config['trails'] = True")
+            if tuple(record['size']) != self.size:
+                raise ValueError(f"Run of size {tuple(record['size'])} does not match heatmaps of size {self.size}")
+            cells, ticks, trails, runs, count = batches.setdefault(record.get(group_by), ([], [], [], [], [0]))
+            for agent in record['agents']:
+                cells.append(np.asarray(agent['trail'], dtype=np.int64))
+                ticks.append(np.asarray(agent['visit_ticks'], dtype=np.int64))
+                trails.append(np.full(len(agent['trail']), len(trails), dtype=np.int64))
+                runs.append(np.full(len(agent['trail']), count[0], dtype=np.int64))
+            count[0] += 1
+        for key, (cells, ticks, trails, runs, count) in batches.items():
+            self._add(self.group(key), np.concatenate(cells), np.concatenate(ticks),
+                      np.concatenate(trails), np.concatenate(runs), count[0])
+        return self
+
+    def add_agents(self, key, agents):
+        """Fold in one finished in-process run from its agents."""
+        width = self.size[1]
+        return self.add_runs([{
+            'planner': key, 'size': self.size,
+            'agents': [{'trail': [y * width + x for x, y in agent.agents_actual_visited_cells],
+                        'visit_ticks': agent.visit_ticks} for agent in agents],
+        }])
+
+    def _add(self, group, cells, ticks, trails, runs, num_runs):
+        n = self.num_cells
+        visits = np.bincount(cells, minlength=n)
+        # First entry of each cell per trail, and per run (earliest tick across its agents)
+        own_first = np.unique(trails * n + cells) % n
+        run_keys = runs * n + cells
+        order = np.lexsort((ticks, run_keys))
+        sorted_keys = run_keys[order]
+        run_first = order[np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))]
+        first_counts = np.bincount(cells[run_first], minlength=n)
+
+        group['runs'] += num_runs
+        group['visits'] += visits
+        group['revisits'] += visits - np.bincount(own_first, minlength=n)
+        group['redundant'] += visits - first_counts
+        group['first_visit_sum'] += np.bincount(cells[run_first], weights=ticks[run_first], minlength=n)
+        group['first_visit_runs'] += first_counts
+
+    def layer(self, key, name):
+        """A layer as an (h, w) array: per-run means, or the mean first-visit tick (nan if never visited)."""
+        group = self.groups[key]
+        if name == 'first_visit':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = group['first_visit_sum'] / group['first_visit_runs']
+        else:
+            values = group[name] / max(group['runs'], 1)
+        return values.reshape(self.size)
+
+    def hot_spots(self, key, name='redundant', top=5):
+        """The top cells of a layer as (x, y, value), highest first."""
+        values = np.nan_to_num(self.layer(key, name).ravel(), nan=-np.inf)
+        cells = np.argsort(values)[::-1][:top]
+        return [(int(cell % self.size[1]), int(cell // self.size[1]), float(values[cell])) for cell in cells]
+
+
+def plot_heatmaps(heatmaps, filename, keys=None, layers=('visits', 'redundant', 'first_visit'), boundaries=None, obstacles=None):
+    """One row of heatmaps per group, one column per layer, on a shared scale per layer.
+
+    Row 0 of the field is drawn at the top, as in visualization.py; boundaries, an (h, w - 1)
+    array of column walls, are drawn as lines and obstacle cells, an (h, w) mask, in grey.
+    """
+    keys = list(heatmaps.groups) if keys is None else keys
+    grid_h, grid_w = heatmaps.size
+    figure, axes = plt.subplots(len(keys), len(layers), squeeze=False,
+                                figsize=(4.5 * len(layers), (3.6 * grid_h / grid_w + 0.6) * len(keys)))
+    for column, name in enumerate(layers):
+        title, colormap = LAYERS[name]
+        values = {key: heatmaps.layer(key, name) for key in keys}
+        if obstacles is not None:
+            for key in keys:
+                values[key] = np.where(obstacles, np.nan, values[key])
+        vmax = max(np.nanmax(layer) if np.isfinite(layer).any() else 0 for layer in values.values()) or 1
+        cmap = plt.get_cmap(colormap).copy()
+        cmap.set_bad('#9e9e9e')
+        for row, key in enumerate(keys):
+            ax = axes[row, column]
+            image = ax.imshow(values[key], cmap=cmap, vmin=0, vmax=vmax, origin='upper', interpolation='nearest')
+            if boundaries is not None:
+                for y, x in zip(*np.nonzero(boundaries)):
+                    ax.plot([x + 0.5, x + 0.5], [y - 0.5, y + 0.5], color='white', linewidth=1.5)
+            ax.set_title(f"{key}: {title}", fontsize=10)
+            ax.set_xticks([])
+            ax.set_yticks([])
+        figure.colorbar(image, ax=axes[:, column].tolist(), shrink=0.8)
+    figure.savefig(filename, dpi=150, bbox_inches='tight')
+    plt.close(figure)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Visit, revisit and first-visit heatmaps over many runs.")
+    parser.add_argument('--planners', nargs='+', default=['LP', 'PCP'])
+    parser.add_argument('--runs', type=int, default=200, help="runs per planner, seeded 0, 1, ...")
+    parser.add_argument('--agents', type=int, default=3, help="agents spawned at (i, 0); a scenario brings its own spawns")
+    parser.add_argument('--size', type=int, nargs=2, default=(7, 15), metavar=('H', 'W'))
+    parser.add_argument('--scenario', default=None, help="id of a field in the scenario store")
+    parser.add_argument('--scenario-store', default='scenarios')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--out', default='visit_heatmaps.png')
+    args = parser.parse_args()
+
+    size, boundaries, obstacles = tuple(args.size), Grid(tuple(args.size), rng=0).boundaries, None
+    if args.scenario is not None:
+        field = scenarios.ScenarioStore(args.scenario_store).get(args.scenario).to_grid()
+        size, boundaries, obstacles = field.size, field.boundaries, ~field.passable()
+    configs = [{'planner': planner, 'size': size, 'seed': seed,
+                'scenario': args.scenario, 'scenario_store': args.scenario_store, 'trails': True}
+               for planner in args.planners for seed in range(args.runs)]
+    if args.scenario is None:
+        for config in configs:
+            config['agent_positions'] = [(i, 0) for i in range(args.agents)]
+    results = simulation.run_many(configs, processes=args.processes)
+
+    start = time.perf_counter()
+    heatmaps = VisitHeatmaps(size).add_runs(results)
+    print(f"[HEAT] Aggregated {sum(len(result['agents']) for result in results)} trails in {time.perf_counter() - start:.3f}s")
+    for planner in args.planners:
+        rows = heatmaps.layer(planner, 'redundant').sum(axis=1)
+        print(f"[HEAT] {planner}: redundant visits per run by row {np.round(rows, 2).tolist()}")
+        print(f"[HEAT] {planner}: hot spots (x, y, redundant visits per run) "
+              f"{[(x, y, round(value, 2)) for x, y, value in heatmaps.hot_spots(planner)]}")
+    plot_heatmaps(heatmaps, args.out, args.planners, boundaries=boundaries, obstacles=obstacles)
+    print(f"[HEAT] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,47 +2,60 @@ import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
 import numpy as np
 import time
-import signal
-import sys
 import os
 from PIL import Image
 import shutil
 import warnings
-warnings.filterwarnings("ignore", category=UserWarning)
-
-simulation_time = round(0.00, 2)
-time_step = round(0.1, 2)
-
-# Number of visualization frames (iterations) required per action
-MOVEMENT_FRAMES = 1     
-PLANTING_FRAMES = 10    
-WATERING_FRAMES = 4    
-viz_while_loop_counter = 0
+import sim_core
+from behavior_planning import batched
+from raster import RasterRenderer, FrameRecorder
+# The clock, frame constants and headless loop live in sim_core, which imports without
+# matplotlib; they are re-exported here for existing callers. Read the tick counter and
+# simulation time from sim_core, since these copies do not follow it.
+from sim_core import (time_step, MOVEMENT_FRAMES, PLANTING_FRAMES, WATERING_FRAMES, movement_time_step,
+                      planting_time_step, watering_time_step, waiting_time_step, check_all_cells_visited,
+                      check_mission_complete, run_simulation)
+warnings.filterwarnings("ignore", category=UserWarning, module="matplotlib")  # Missing emoji glyphs
 
 # Load the Twemoji font for emojis
 emoji_font_path = "/home/isr-lab/.local/share/fonts/TwitterColorEmoji-SVGinOT.ttf"
 # emoji_font_path = "D:/UWF Study/Spring 2025/Foundations of IS/Project3_LP/TwitterColorEmoji-SVGinOT-15.1.0/TwitterColorEmoji-SVGinOT-15.1.0/TwitterColorEmoji-SVGinOT.ttf"
-
-emoji_font = fm.FontProperties(fname=emoji_font_path)
+_emoji_font = None
 
 # standard font for non-emoji text
 standard_font = "DejaVu Sans"
 
+
+def emoji_font():
+    """Emoji font, loaded on first use; falls back to the standard font if the file is missing."""
+    global _emoji_font
+    if _emoji_font is None:
+        if os.path.exists(emoji_font_path):
+            _emoji_font = fm.FontProperties(fname=emoji_font_path)
+        else:
+            print(f"[WARN] Emoji font not found at {emoji_font_path}, using {standard_font}")
+            _emoji_font = fm.FontProperties(family=standard_font)
+    return _emoji_font
+
 # def display_grid(grid, agents):
-def display_grid(grid, agents, state_estimator, behavior_planner, record=False):
+def display_grid(grid, agents, state_estimator, behavior_planner, record=False, tick_hooks=(), max_ticks=None, renderer='raster'):
 
 
-    """Displays the grid with an animated Matplotlib plot."""
+    """Displays the grid with an animated Matplotlib plot, for at most max_ticks ticks if given.
+
+    renderer 'raster' shows and records frames from raster.RasterRenderer, which needs no emoji
+    font; 'matplotlib' draws every cell as patches and emoji text, as before.
+    """
     size = grid.size
     fig, ax = plt.subplots(figsize=(15, 6))
 
     if record:
-        os.makedirs("sim_videos/frames", exist_ok=True)
+        os.makedirs("sim_videos", exist_ok=True)
 
     frame_dir = "sim_videos/frames"
     video_path = "sim_videos/1_agent_15x7.gif"
 
-    if record:
+    if record and renderer == 'matplotlib':  # Raster frames go straight to the recorder
         if os.path.exists(frame_dir):
             shutil.rmtree(frame_dir)
         os.makedirs(frame_dir)
@@ -59,16 +72,30 @@ def display_grid(grid, agents, state_estimator, behavior_planner, record=False):
     if not isinstance(agents, list):
         agents = [agents]
 
-
-    def check_all_cells_visited(grid, global_explored_cells):
-        """Stops only when all cells have been visited at least once."""
-        total_cells = grid.size[0] * grid.size[1]
-        return len(global_explored_cells) >= total_cells
-
-
+    raster = RasterRenderer() if renderer == 'raster' else None
+    recorder = FrameRecorder(video_path) if raster is not None and record else None
+    image = None
+
+    def update_raster():
+        """Shows a raster frame in a single image artist, and records it."""
+        nonlocal image
+        frame = raster.render(grid, agents)
+        if image is None:
+            ax.clear()
+            image = ax.imshow(frame, interpolation='nearest')
+            ax.set_axis_off()
+            fig.tight_layout(pad=0.9, rect=[0, 0, 1, 1])
+        else:
+            image.set_data(frame)
+        plt.pause(0.001)
+        if recorder is not None:
+            recorder.add(frame)
 
     def update_grid(simulation_time, frame_id=None):
         """Updates the grid visualization."""
+        if raster is not None:
+            update_raster()
+            return
         ax.clear()  # Clear the axis for the new frame
 
         # Go over each cell
@@ -81,7 +108,7 @@ def display_grid(grid, agents, state_estimator, behavior_planner, record=False):
                     color = "#4a4a4a"  # Dark gray barriers
                 elif cell["moisture_level"] == 0:  # Dry soil
                     color = color_map["dry"]
-                elif cell["crop_status"] == 1 and cell["moisture_level"] > 0:  # Planted & hydrated
+                elif cell["crop_status"] >= 1 and cell["moisture_level"] > 0:  # Planted & hydrated
                     color = color_map["planted"]
                 else:  # Empty cell
                     color = color_map["empty"]
@@ -93,11 +120,11 @@ def display_grid(grid, agents, state_estimator, behavior_planner, record=False):
                 for agent in agents:
                     if (x, y) == (agent.x, agent.y):  # If the agent is in this cell
                         ax.add_patch(plt.Circle((x + 0.5, size[0] - y - 0.5), 0.4, color=agent.color, alpha=0.6))
-                        ax.text(x + 0.5, size[0] - y - 0.5, "🤖", fontsize=16, ha="center", va="center", fontproperties=emoji_font)
+                        ax.text(x + 0.5, size[0] - y - 0.5, "🤖", fontsize=16, ha="center", va="center", fontproperties=emoji_font())
 
                 # Overlay the plant emoji if crop status is planted
-                if cell["crop_status"] == 1:  # If the plant is in this cell
-                    ax.text(x + 0.5, size[0] - y - 0.5, "🌱", fontsize=16, ha="center", va="center", fontproperties=emoji_font)
+                if cell["crop_status"] >= 1 and cell["soil_type"] != 2:  # If the plant is in this cell, at any growth stage
+                    ax.text(x + 0.5, size[0] - y - 0.5, "🌱", fontsize=16, ha="center", va="center", fontproperties=emoji_font())
 
         # Draw boundaries
         for y in range(1, size[0] - 1):  # Exclude first and last row
@@ -141,92 +168,54 @@ def display_grid(grid, agents, state_estimator, behavior_planner, record=False):
         shutil.rmtree(frame_dir)
 
 
-    def signal_handler(sig, frame):
-        """Handles Ctrl+C to exit cleanly."""
-        print("\nSimulation stopped by user.")
-        plt.close(fig)  # Close the Matplotlib figure properly
-        sys.exit(0)  # Exit the program safely
-
-    signal.signal(signal.SIGINT, signal_handler)  # Handle Ctrl+C
-
     # Initial grid display
-    import visualization 
-    visualization.simulation_time = 0.00   
+    # Ctrl+C raises KeyboardInterrupt below, so the figure is closed and frames are stitched
+    sim_core.simulation_time = 0.00
     frame_counter = 0
-    
-    visualization.viz_while_loop_counter = 0
 
-    update_grid(visualization.simulation_time, frame_counter if record else None)
+    sim_core.viz_while_loop_counter = 0
+    planner = batched(behavior_planner)  # Agents ask it for their moves through the batched API
+
+    update_grid(sim_core.simulation_time, frame_counter if record else None)
 
     plt.ion()  
     sim_time_while_loop = 0
     try:
-        while True:
+        while max_ticks is None or sim_core.viz_while_loop_counter < max_ticks:
             plt.savefig("7x15grid.eps", dpi=300)
 
-            for agent in agents:
+            for hook in tick_hooks:
+                hook(sim_core.viz_while_loop_counter)
+
+            perceptions = state_estimator.perceive_all(agents)  # One gather for all agents per tick
+
+            for agent, perception in zip(agents, perceptions):
                 time.sleep(4)    
-                action = agent.select_action()
+                action = agent.select_action(perception, planner)
                 step_time = agent.execute_action(action)  # ← pass it in
-                update_grid(visualization.simulation_time, frame_counter if record else None)
+                update_grid(sim_core.simulation_time, frame_counter if record else None)
 
-            visualization.viz_while_loop_counter +=1
-            visualization.simulation_time = visualization.viz_while_loop_counter * time_step
+            sim_core.viz_while_loop_counter +=1
+            sim_core.simulation_time = sim_core.viz_while_loop_counter * time_step
             
             sim_time_while_loop += 1
 
-            if check_all_cells_visited(grid, agents[0].global_explored_cells):
+            if check_mission_complete(grid, agents, behavior_planner):
                 if all(agent.done or agent.is_frozen for agent in agents):
                     print("[SIM] Grid fully explored. All agents completed final tasks.")
                     print(f"sim_time_while_loop: \033[92m'{sim_time_while_loop:.2f}\033[0m' units")
 
                     time.sleep(2)
                     break
+    except sim_core.RunStopped as stop:
+        print(f"[SIM] Run stopped at tick {sim_core.viz_while_loop_counter}: {stop.outcome}")
     except KeyboardInterrupt:
         print("\nSimulation stopped manually.")
 
     plt.close(fig)
-    if record:
+    if recorder is not None:
+        recorder.close()
+    elif record:
         stitch_frames_to_gif()
 
-    return visualization.simulation_time
-
-def check_all_cells_visited(grid, global_explored_cells):
-    """Stops only when all cells have been visited at least once."""
-    total_cells = grid.size[0] * grid.size[1]
-    return len(global_explored_cells) >= total_cells
-
-
-def run_simulation(grid, agents, state_estimator, behavior_planner):
-    """Displays the grid with an animated Matplotlib plot."""
-    size = grid.size
-
-    if not isinstance(agents, list):
-        agents = [agents]
-
-
-    def signal_handler(sig, frame):
-        """Handles Ctrl+C to exit cleanly."""
-        print("\nSimulation stopped by user.")
-        sys.exit(0)  # Exit the program safely
-
-    signal.signal(signal.SIGINT, signal_handler)  # Handle Ctrl+C
-    import visualization
-    visualization.simulation_time = 0
-    visualization.time_step = 1  # in seconds or arbitrary units
-
-    try:
-        while True:
-            visualization.simulation_time += visualization.time_step
-
-            for agent in agents:
-                agent.execute_action(agent.select_action())  # Execute each agent's action
-            
-            if check_all_cells_visited(grid, agents[0].global_explored_cells):  # Stop if all cells are planted
-                if all(agent.done or agent.is_frozen for agent in agents):
-                    print("[SIM] Grid fully explored. All agents have completed final tasks.")
-                    time.sleep(2)
-                    break
-    except KeyboardInterrupt:
-        print("\nSimulation stopped by user.")
-    return visualization.simulation_time
+    return sim_core.simulation_time
@@ -0,0 +1,141 @@
+import numpy as np
+import sim_core
+
+
+def explored_mask(explored, size):
+    """Flat mask of the cells in a CoverageMap, or in a set of (x, y) cells."""
+    grid_h, grid_w = size
+    mask = np.zeros(grid_h * grid_w, dtype=bool)
+    if hasattr(explored, 'indices'):
+        mask[explored.indices()] = True
+    elif explored:
+        cells = np.array(list(explored))
+        mask[cells[:, 1] * grid_w + cells[:, 0]] = True
+    return mask
+
+
+class WorldState:
+    """Facts that every agent's movement decision in a tick needs, computed once and shared.
+
+    For each coverage map and field component it keeps the cells still needing a visit and
+    their count per column; it also counts the agents in each column. Agents act one after
+    another within a tick, and moving into a cell is the only way cells get explored then,
+    so each query first folds in the cells agents now stand on. If the map grew some other
+    way the summary is rebuilt, so a decision always sees what a fresh scan would.
+
+    On a TiledGrid, which is one component without obstacles, only the counts per column are
+    kept and a column's cells are read from the coverage map when asked for, so no query
+    builds an array the size of the field.
+    """
+
+    def __init__(self, grid, agents):
+        self.grid = grid
+        self.agents = agents  # Everyone standing in the field, for occupancy
+        self.team = [agent for agent in agents if not getattr(agent, 'is_ghost', False)]  # Agents planners assign work to
+        self.tick = sim_core.viz_while_loop_counter
+        self.tiled = hasattr(grid, 'cells_at')
+        self.labels = None if self.tiled else grid.components()
+        self.perceptions = {}  # Agent -> its perception this tick, for planners that use one
+        self._maps = {}  # id of a coverage map -> summary of the cells it lacks
+        self._covered = {}  # ids of the column owners -> (h, w) mask of cells an owner can reach in its column
+
+    def _summary(self, explored):
+        summary = self._maps.get(id(explored))
+        if self.tiled:
+            if summary is None or summary['explored'] is not explored or not self._sync_columns(summary):
+                summary = self._maps[id(explored)] = {
+                    'explored': explored,
+                    'counts': self.grid.size[0] - explored.column_counts(),
+                    'positions': {agent: (agent.x, agent.y) for agent in self.agents},
+                }
+            return summary
+        if summary is None or summary['explored'] is not explored:
+            summary = self._maps[id(explored)] = {
+                'explored': explored,
+                'count': len(explored),
+                'unexplored': self.grid.passable().reshape(-1) & ~explored_mask(explored, self.grid.size),
+                'components': {},  # Label -> ((h, w) mask of cells needing work, count per column)
+            }
+        elif summary['count'] != len(explored):
+            summary = self._sync(summary)
+        return summary
+
+    def _sync(self, summary):
+        explored = summary['explored']
+        grid_w = self.grid.size[1]
+        for agent in self.agents:
+            cell = agent.y * grid_w + agent.x
+            if summary['unexplored'][cell] and (agent.x, agent.y) in explored:
+                summary['unexplored'][cell] = False
+                summary['count'] += 1
+                component = summary['components'].get(self.labels[cell])
+                if component is not None:
+                    component[0][agent.y, agent.x] = False
+                    component[1][agent.x] -= 1
+        if summary['count'] != len(explored):
+            del self._maps[id(explored)]  # Cells were explored away from the agents; rescan
+            return self._summary(explored)
+        return summary
+
+    def _sync_columns(self, summary):
+        """Recount the columns agents moved into; False if the map grew some other way."""
+        explored = summary['explored']
+        for agent in self.agents:
+            cell = (agent.x, agent.y)
+            if summary['positions'].get(agent) != cell:
+                summary['positions'][agent] = cell
+                if cell in explored:
+                    summary['counts'][agent.x] = self.grid.size[0] - np.count_nonzero(explored.column(agent.x))
+        return self.grid.size[0] * self.grid.size[1] - summary['counts'].sum() == len(explored)
+
+    def work(self, agent):
+        """Cells the agent can reach that its map lacks, as an (h, w) mask, and their count per column.
+
+        On a TiledGrid the mask is None; see cells_needing_work.
+        """
+        summary = self._summary(agent.global_explored_cells)
+        if self.tiled:
+            return None, summary['counts']
+        label = self.labels[agent.y * self.grid.size[1] + agent.x]
+        component = summary['components'].get(label)
+        if component is None:
+            mask = (summary['unexplored'] & (self.labels == label)).reshape(self.grid.size)
+            component = summary['components'][label] = (mask, np.count_nonzero(mask, axis=0))
+        return component
+
+    def cells_needing_work(self, agent, col_x):
+        """The agent's unexplored, reachable cells in a column, top to bottom."""
+        if self.tiled:
+            return [(col_x, int(y)) for y in np.flatnonzero(~agent.global_explored_cells.column(col_x))]
+        mask = self.work(agent)[0]
+        return [(col_x, int(y)) for y in np.flatnonzero(mask[:, col_x])]
+
+    def occupied_columns(self, agent=None, interior=False):
+        """Columns holding an agent other than the given one; interior skips the first and last rows."""
+        grid_h, grid_w = self.grid.size
+        xs = np.array([other.x for other in self.agents if other is not agent and
+                       not (interior and other.y in (0, grid_h - 1))], dtype=np.intp)
+        return np.bincount(xs, minlength=grid_w) > 0
+
+    def orphaned(self, agent, column_owners):
+        """The agent's unexplored, reachable (x, y) cells whose column's owner cannot reach them, row by row.
+
+        column_owners holds the owning agent of each column, or None. Agents never leave their
+        component, so which cells the owners cover is worked out once per tick for each
+        assignment, as the cells sharing a component with their column's owner. On a TiledGrid
+        owners reach all of their columns.
+        """
+        if self.tiled:
+            work = self.work(agent)[1]
+            cells = [cell for col, owner in enumerate(column_owners) if owner is None and work[col]
+                     for cell in self.cells_needing_work(agent, col)]
+            return sorted(cells, key=lambda cell: (cell[1], cell[0]))
+        key = tuple(map(id, column_owners))
+        covered = self._covered.get(key)
+        if covered is None:
+            grid_w = self.grid.size[1]
+            owner_labels = np.array([-2 if owner is None else self.labels[owner.y * grid_w + owner.x]
+                                     for owner in column_owners])
+            covered = self._covered[key] = self.labels.reshape(self.grid.size) == owner_labels
+        ys, xs = np.nonzero(self.work(agent)[0] & ~covered)
+        return list(zip(xs.tolist(), ys.tolist()))